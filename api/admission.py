@@ -0,0 +1,196 @@
+"""
+api/admission.py — Admission control for new scans
+====================================================
+A scan only produces good vitals if its frames are processed in real
+time.  Accepting more scans than the CPU can keep up with degrades every
+one of them, so `/scan/start` asks an `AdmissionController` first.
+
+Capacity model
+--------------
+    load of a scan    = upload rate (frames/s) × CPU cost (ms/frame, all stages) / 1000
+    capacity          = CPU cores × ADMISSION_TARGET_UTILISATION
+
+Both the rate and the per-frame cost are *measured*: every running scan
+registers a probe that reports its live stage timings.  Running scans
+count with their live readings; when a scan ends its final reading is
+folded, once, into a moving average that prices new scans and outlives
+the scan.  The config defaults are only priors for a cold process.
+
+Decisions
+---------
+    accept   the new scan fits next to the running ones.
+    queue    it would fit once enough running scans end, within
+             ADMISSION_MAX_WAIT_SECONDS — the client is told when to retry.
+    reject   no room within that horizon; the client gets a Retry-After.
+"""
+
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+from utils.logger import get_logger
+from config import (
+    ADMISSION_TARGET_UTILISATION,
+    ADMISSION_MAX_WAIT_SECONDS,
+    ADMISSION_DEFAULT_FRAME_MS,
+    ADMISSION_EXPECTED_FPS,
+)
+
+logger = get_logger("api.admission")
+
+# Weight of each finished scan's reading in the moving averages
+_EMA_ALPHA = 0.2
+
+# A probe returns (frames per second, CPU ms per frame) or None if it has
+# no measurements yet.
+LoadProbe = Callable[[], tuple[float, float] | None]
+
+
+@dataclass
+class AdmissionDecision:
+    action: str                  # "accept" | "queue" | "reject"
+    load: float                  # Cores in use, including the new scan
+    capacity: float              # Cores available to scans
+    wait_seconds: float = 0.0    # Until the scan would fit ("queue" / "reject")
+
+    @property
+    def retry_after(self) -> int:
+        """Whole seconds for a Retry-After header."""
+        return max(1, math.ceil(self.wait_seconds))
+
+    def to_dict(self) -> dict:
+        return {
+            "action": self.action,
+            "load_cores": round(self.load, 3),
+            "capacity_cores": round(self.capacity, 3),
+            "estimated_wait_seconds": round(self.wait_seconds, 1),
+        }
+
+
+@dataclass
+class _ActiveScan:
+    ends_at: float               # time.monotonic() deadline of frame intake
+    probe: LoadProbe
+
+
+class AdmissionController:
+    """
+    Parameters
+    ----------
+    cores              : int     CPU cores to budget (default: os.cpu_count()).
+    target_utilisation : float   Fraction of those cores scans may fill.
+    max_wait           : float   Longest wait (s) answered with "queue".
+    """
+
+    def __init__(
+        self,
+        cores: int | None = None,
+        target_utilisation: float = ADMISSION_TARGET_UTILISATION,
+        max_wait: float = ADMISSION_MAX_WAIT_SECONDS,
+    ):
+        self._capacity = (cores or os.cpu_count() or 1) * target_utilisation
+        self._max_wait = max_wait
+        self._frame_ms = ADMISSION_DEFAULT_FRAME_MS
+        self._fps = ADMISSION_EXPECTED_FPS
+        self._measured = False
+        self._active: dict[object, _ActiveScan] = {}
+        self._lock = threading.Lock()
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def decide(self, duration_seconds: float) -> AdmissionDecision:
+        """Decide whether a new scan of `duration_seconds` may start now."""
+        with self._lock:
+            now = time.monotonic()
+            loads = self._refresh(now)
+            new_load = self._per_scan_load()
+            current = sum(load for _, load in loads)
+
+            if current + new_load <= self._capacity:
+                return AdmissionDecision("accept", current + new_load, self._capacity)
+
+            # Walk the running scans in end-time order until enough load frees up
+            wait = math.inf
+            freed = current
+            for ends_at, load in sorted(loads):
+                freed -= load
+                if freed + new_load <= self._capacity:
+                    wait = max(0.0, ends_at - now)
+                    break
+            if wait <= self._max_wait:
+                return AdmissionDecision("queue", current + new_load, self._capacity, wait)
+            if math.isinf(wait):
+                wait = self._max_wait      # A single scan exceeds capacity; retry later anyway
+            return AdmissionDecision("reject", current + new_load, self._capacity, wait)
+
+    def admit(self, key: object, duration_seconds: float, probe: LoadProbe) -> None:
+        """Register a started scan and the probe reporting its live load."""
+        with self._lock:
+            self._active[key] = _ActiveScan(time.monotonic() + duration_seconds, probe)
+
+    def release(self, key: object) -> None:
+        """The scan's frame intake has ended; fold in its final measurements."""
+        with self._lock:
+            scan = self._active.pop(key, None)
+            if scan is not None:
+                self._observe(scan.probe())
+
+    def snapshot(self) -> dict:
+        """Current model parameters, for diagnostics."""
+        with self._lock:
+            loads = self._refresh(time.monotonic())
+            return {
+                "capacity_cores": round(self._capacity, 3),
+                "load_cores": round(sum(load for _, load in loads), 3),
+                "active_scans": len(loads),
+                "frame_ms": round(self._frame_ms, 2),
+                "fps": round(self._fps, 2),
+                "measured": self._measured,
+            }
+
+    # ── Private ──────────────────────────────────────────────────────────────
+
+    def _per_scan_load(self) -> float:
+        return self._fps * self._frame_ms / 1000.0
+
+    def _observe(self, reading: tuple[float, float] | None) -> None:
+        if reading is None:
+            return
+        fps, frame_ms = reading
+        if fps <= 0 or frame_ms <= 0:
+            return
+        if not self._measured:
+            self._fps, self._frame_ms, self._measured = fps, frame_ms, True
+            return
+        self._fps += _EMA_ALPHA * (fps - self._fps)
+        self._frame_ms += _EMA_ALPHA * (frame_ms - self._frame_ms)
+
+    def _refresh(self, now: float) -> list[tuple[float, float]]:
+        """
+        Poll every active scan; return (ends_at, load) pairs.  Read-only:
+        live readings are cumulative and polled at the callers' rate, so
+        only `release()` folds a scan's final reading into the model.
+        """
+        loads = []
+        for scan in self._active.values():
+            reading = scan.probe()
+            load = reading[0] * reading[1] / 1000.0 if reading else self._per_scan_load()
+            loads.append((max(now, scan.ends_at), load))
+        return loads
+
+
+# ── Shared instance ──────────────────────────────────────────────────────────
+
+_shared: AdmissionController | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_admission() -> AdmissionController:
+    """Process-wide controller used by every `ScanSession` by default."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = AdmissionController()
+        return _shared
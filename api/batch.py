@@ -0,0 +1,284 @@
+"""
+api/batch.py — Vitals from precomputed RGB traces
+===================================================
+Integrations that already extract skin-colour traces (on-device, or in
+another system) send them here instead of running one scan per trace.
+Each trace is a ``(T, 3)`` array of per-sample mean R, G, B with its own
+sampling rate and, optionally, its own demographics.  The chain is the
+one `compute_vitals` runs for a scan —
+
+    RGB trace → rPPG algorithm → bandpass → HR → HRV → BP → stress
+
+— but executed across the batch:
+
+* traces with the same valid length and rate are stacked into one
+  ``(B, T, 3)`` array, so the rPPG projection, the bandpass filter and
+  the HR spectra each run as a single array operation per group;
+* HRV is one NaN-padded reduction over every trace's RR intervals;
+* BP is one model call for the whole batch.
+
+Only beat picking and the stress heuristic remain per trace.
+
+Traces are taken as-is: rows containing NaN are dropped, but no warm-up
+is trimmed (the sender decides where its trace starts).  A trace that
+cannot be analysed gets an `error` entry instead of failing the batch.
+
+Input formats
+-------------
+    JSON                 {"algorithm", "metadata"?, "traces": [{"id"?, "fps",
+                          "metadata"?, one of "rgb" (nested lists),
+                          "rgb_f32" (base64 little-endian float32, T×3) or
+                          "rgb_npy" (base64 .npy)}]}
+    application/x-npy    one ``(B, T, 3)`` or ``(T, 3)`` array; rate and
+                         demographics come from the query string.
+"""
+
+import base64
+import binascii
+import io
+from typing import AsyncIterator
+import numpy as np
+from rppg.algorithms import get_algorithm
+from rppg.filters import bandpass_filter
+from features.hr import estimate_hr_batch
+from features.hrv import compute_hrv_batch
+from model.bp_model import BPEstimator
+from model.stress import estimate_stress
+from api.schemas import UserMetadata
+from api.session import DISCLAIMER
+from utils.logger import get_logger
+from config import BATCH_MAX_TRACES, BATCH_MAX_SAMPLES
+
+logger = get_logger("api.batch")
+
+# Same floor as `RPPGPipeline.extract_pulse`
+_MIN_VALID_SAMPLES = 15
+
+
+class BatchTooLargeError(Exception):
+    """The request body exceeded `BATCH_MAX_BYTES`."""
+
+
+# ── Parsing ──────────────────────────────────────────────────────────────────
+
+
+async def read_body(chunks: AsyncIterator[bytes], max_bytes: int) -> bytes:
+    """Collect a request body, raising `BatchTooLargeError` past `max_bytes`."""
+    body = bytearray()
+    async for chunk in chunks:
+        body += chunk
+        if len(body) > max_bytes:
+            raise BatchTooLargeError(f"Request exceeds {max_bytes // (1024 * 1024)} MB.")
+    return bytes(body)
+
+
+def load_npy(data: bytes) -> np.ndarray:
+    """Parse `.npy` bytes (never unpickles)."""
+    try:
+        return np.load(io.BytesIO(data), allow_pickle=False)
+    except (OSError, EOFError) as e:
+        raise ValueError(f"Invalid .npy payload: {e}") from e
+
+
+def _b64(text: str) -> bytes:
+    try:
+        return base64.b64decode(text, validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid base64 trace data: {e}") from e
+
+
+def _trace_array(entry: dict) -> np.ndarray:
+    """The RGB array of one JSON trace entry."""
+    if "rgb" in entry:
+        try:
+            return np.asarray(entry["rgb"], dtype=np.float64)
+        except TypeError:
+            raise ValueError("'rgb' must be a list of [R, G, B] rows.") from None
+    if "rgb_f32" in entry:
+        raw = _b64(entry["rgb_f32"])
+        if len(raw) % 4:
+            raise ValueError("rgb_f32 length is not a multiple of 4 bytes.")
+        return np.frombuffer(raw, dtype="<f4").reshape(-1, 3)
+    if "rgb_npy" in entry:
+        return load_npy(_b64(entry["rgb_npy"]))
+    raise ValueError("Trace needs one of 'rgb', 'rgb_f32' or 'rgb_npy'.")
+
+
+def _metadata(fields) -> UserMetadata:
+    if not isinstance(fields, dict):
+        raise ValueError("'metadata' must be an object.")
+    return UserMetadata(**fields)
+
+
+def parse_json_batch(body: dict, default_meta: UserMetadata | None) -> tuple[list[dict], str]:
+    """
+    Validate a JSON batch request.
+
+    Returns
+    -------
+    (traces, algorithm)
+        `traces` holds {"id", "rgb", "fps", "metadata"} per entry; any
+        entry that fails validation carries an "error" instead.
+
+    Raises
+    ------
+    ValueError  If the request as a whole is malformed.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("The request body must be a JSON object.")
+    algorithm = body.get("algorithm", "pos")
+    get_algorithm(algorithm)                    # Raises ValueError if unknown
+    entries = body.get("traces")
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("'traces' must be a non-empty list.")
+    if len(entries) > BATCH_MAX_TRACES:
+        raise ValueError(f"At most {BATCH_MAX_TRACES} traces per request.")
+    if body.get("metadata") is not None:
+        default_meta = _metadata(body["metadata"])
+
+    traces = []
+    for index, entry in enumerate(entries):
+        trace = {"id": index}
+        try:
+            if not isinstance(entry, dict):
+                raise ValueError("Trace entries must be objects.")
+            trace["id"] = entry.get("id", index)
+            trace["rgb"] = _trace_array(entry)
+            try:
+                trace["fps"] = float(entry.get("fps", 0))
+            except TypeError:
+                raise ValueError("'fps' must be a number.") from None
+            meta = entry.get("metadata")
+            trace["metadata"] = _metadata(meta) if meta is not None else default_meta
+        except ValueError as e:
+            trace["error"] = str(e)
+        traces.append(trace)
+    return traces, algorithm
+
+
+def traces_from_array(rgb: np.ndarray, fps: float, meta: UserMetadata | None) -> list[dict]:
+    """Split a ``(B, T, 3)`` (or single ``(T, 3)``) array into trace entries."""
+    if rgb.ndim == 2:
+        rgb = rgb[None]
+    if rgb.ndim != 3 or rgb.shape[-1] != 3:
+        raise ValueError(f"Expected an array of shape (B, T, 3), got {rgb.shape}.")
+    if rgb.shape[0] > BATCH_MAX_TRACES:
+        raise ValueError(f"At most {BATCH_MAX_TRACES} traces per request.")
+    return [{"id": i, "rgb": trace, "fps": fps, "metadata": meta} for i, trace in enumerate(rgb)]
+
+
+# ── Analysis ─────────────────────────────────────────────────────────────────
+
+
+def _valid_samples(trace: dict) -> np.ndarray:
+    """The trace's non-NaN rows, after shape / rate / metadata checks."""
+    rgb = np.asarray(trace["rgb"], dtype=np.float64)
+    if rgb.ndim != 2 or rgb.shape[-1] != 3:
+        raise ValueError(f"Trace must have shape (T, 3), got {rgb.shape}.")
+    if rgb.shape[0] > BATCH_MAX_SAMPLES:
+        raise ValueError(f"Trace exceeds {BATCH_MAX_SAMPLES} samples.")
+    if not 0 < trace["fps"] <= 240:
+        raise ValueError(f"fps must be in (0, 240], got {trace['fps']}.")
+    if trace["metadata"] is None:
+        raise ValueError("No metadata for this trace (send 'metadata' or POST /metadata).")
+    valid = rgb[~np.isnan(rgb).any(axis=1)]
+    if valid.shape[0] < _MIN_VALID_SAMPLES:
+        raise ValueError(
+            f"Only {valid.shape[0]} valid samples — need at least {_MIN_VALID_SAMPLES}."
+        )
+    return valid
+
+
+def analyze_traces(traces: list[dict], bp_estimator: BPEstimator, algorithm: str = "pos") -> dict:
+    """
+    Run the vitals chain over a batch of traces.
+
+    Parameters
+    ----------
+    traces : list of {"id", "rgb" (T, 3), "fps", "metadata"} — as returned
+             by `parse_json_batch` / `traces_from_array`.  Entries that
+             already carry an "error" are passed through.
+
+    Returns
+    -------
+    dict
+        {"disclaimer", "algorithm_used", "count", "failed", "results"}
+        where each result has the `/scan/result` fields (minus the
+        disclaimer) plus its "id" and "samples", or "id" and "error".
+    """
+    spec = get_algorithm(algorithm)
+    results: list[dict] = [{"id": t["id"], "error": t["error"]} if "error" in t else None
+                           for t in traces]
+
+    # ── Validate and group equally long traces at the same rate ─────────
+    samples: dict[int, np.ndarray] = {}
+    groups: dict[tuple[int, float], list[int]] = {}
+    for i, trace in enumerate(traces):
+        if results[i] is not None:
+            continue
+        try:
+            samples[i] = _valid_samples(trace)
+        except ValueError as e:
+            results[i] = {"id": trace["id"], "error": str(e)}
+            continue
+        groups.setdefault((samples[i].shape[0], trace["fps"]), []).append(i)
+
+    # ── rPPG → bandpass → HR, one stacked pass per group ────────────────
+    hr: dict[int, dict] = {}
+    for (length, fps), members in groups.items():
+        try:
+            spec.check_window(length, fps)
+            stack = np.stack([samples[i] for i in members])      # (B, T, 3)
+            pulses = bandpass_filter(spec.run(stack, fps), fps)   # (B, T)
+        except ValueError as e:
+            for i in members:
+                results[i] = {"id": traces[i]["id"], "error": str(e)}
+            continue
+        for i, hr_result in zip(members, estimate_hr_batch(pulses, fps)):
+            hr[i] = hr_result
+
+    # ── HRV and BP across the whole batch ───────────────────────────────
+    order = list(hr)
+    hrv = dict(zip(order, compute_hrv_batch([hr[i]["rr_intervals"] for i in order])))
+    if order:
+        meta = [traces[i]["metadata"] for i in order]
+        height_m = np.array([m.height_cm for m in meta]) / 100.0
+        features = np.column_stack([
+            [hr[i]["hr_bpm"] for i in order],
+            [hrv[i]["rmssd_ms"] or 30.0 for i in order],   # fallbacks as in compute_vitals
+            [hrv[i]["sdnn_ms"] or 20.0 for i in order],
+            [hrv[i]["pnn50"] or 10.0 for i in order],
+            [m.age for m in meta],
+            [1 if m.gender == "male" else 0 for m in meta],
+            np.array([m.weight_kg for m in meta]) / height_m ** 2,
+        ])
+        bp = dict(zip(order, bp_estimator.predict_batch(features)))
+
+    # ── Stress and assembly ─────────────────────────────────────────────
+    for i in order:
+        hr_result, hrv_result = hr[i], hrv[i]
+        results[i] = {
+            "id": traces[i]["id"],
+            "hr": {key: hr_result[key] for key in
+                   ("hr_bpm", "hr_fft", "hr_peaks", "confidence_fft", "confidence_peaks")},
+            "hrv": hrv_result,
+            "blood_pressure": bp[i],
+            "stress": estimate_stress(
+                hr_bpm=hr_result["hr_bpm"],
+                rmssd_ms=hrv_result["rmssd_ms"],
+                sdnn_ms=hrv_result["sdnn_ms"],
+            ),
+            "scan_duration_seconds": round(samples[i].shape[0] / traces[i]["fps"], 1),
+            "samples": samples[i].shape[0],
+        }
+
+    failed = sum("error" in r for r in results)
+    logger.info("Batch analysed: %d traces in %d groups, %d failed.",
+                len(traces), len(groups), failed)
+    return {
+        "disclaimer": DISCLAIMER,
+        "algorithm_used": algorithm,
+        "count": len(results),
+        "failed": failed,
+        "results": results,
+    }
@@ -0,0 +1,227 @@
+"""
+api/clip.py — Whole-clip analysis for `/analyze`
+=================================================
+Clients that record locally upload the finished clip in one streamed
+request instead of one POST per frame.  The clip goes through the same
+chain as a live scan:
+
+    frames → FaceDetector (ROIs) → RPPGPipeline → HR / HRV / BP / stress
+
+and the response is the `/scan/result` payload.  A clip whose face
+disappears for long or that carries no pulse is abandoned part-way
+(rppg/monitor.py) instead of being decoded to the end.
+
+Frames are processed by a `StagedPipeline` (utils/stages.py) — decode in
+threads, detection on a shared detect lane — exactly like frontend mode.
+MJPEG uploads are analysed while they stream in; other containers are
+spooled to disk and decoded frame by frame (camera/clip.py).  The
+pipeline's sampling rate is measured from the frame timestamps.
+"""
+
+import asyncio
+import tempfile
+from functools import partial
+from typing import AsyncIterator
+import numpy as np
+from camera.clip import MJPEGSplitter, is_mjpeg, iter_video_frames
+from camera.decode import FrameDecoder
+from face.detector import detect_in_worker, detect_lane, new_stream_id, preferred_input_order, release_stream
+from rppg.pipeline import RPPGPipeline
+from rppg.monitor import ScanMonitor
+from model.bp_model import BPEstimator
+from api.schemas import UserMetadata
+from api.session import archive_trace, compute_vitals
+from utils.stages import StagedPipeline, StageSpec
+from utils.logger import get_logger
+from config import (
+    CAMERA_FPS,
+    CLIP_MAX_BYTES,
+    CLIP_SPOOL_DIR,
+    PIPELINE_DECODE_WORKERS,
+    PIPELINE_DETECT_EXECUTOR,
+    PIPELINE_QUEUE_SIZE,
+    SCAN_ABORT_ENABLED,
+)
+
+logger = get_logger("api.clip")
+
+
+class ClipTooLargeError(Exception):
+    """The upload exceeded `CLIP_MAX_BYTES`."""
+
+
+class ClipAnalyzer:
+    """
+    Accumulates one clip's frames into an `RPPGPipeline`.
+
+    Parameters
+    ----------
+    algorithm : str    rPPG algorithm (a name in `ALGORITHMS`).
+    encoded   : bool   True if `submit()` receives JPEG bytes (decoded in
+                       a stage), False for decoded BGR frames.
+    """
+
+    def __init__(self, algorithm: str = "pos", encoded: bool = True):
+        self.pipeline = RPPGPipeline(fps=CAMERA_FPS, algorithm=algorithm)
+        # Clip length is unknown up front: gap and SNR checks only
+        self._monitor = ScanMonitor(None, algorithm) if SCAN_ABORT_ENABLED else None
+        self._decoder = FrameDecoder(colour_order=preferred_input_order()) if encoded else None
+        self._timestamps: list[float] = []
+        self._faces = 0
+        self._stream = new_stream_id()
+
+        specs = []
+        if self._decoder is not None:
+            specs.append(StageSpec("decode", self._decode, workers=PIPELINE_DECODE_WORKERS, kind="thread"))
+        specs.append(StageSpec(
+            "detect",
+            partial(detect_in_worker, colour_order=self._decoder.colour_order if encoded else "bgr",
+                    stream=self._stream),
+            kind=PIPELINE_DETECT_EXECUTOR,
+            executor=detect_lane(self._stream),
+        ))
+        self._stages = StagedPipeline(specs, sink=self._accumulate, queue_size=PIPELINE_QUEUE_SIZE)
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def submit(self, timestamp: float, data: bytes | np.ndarray) -> None:
+        """Queue one frame (blocks while the stages are saturated)."""
+        if self._decoder is None:
+            self._stages.submit(((timestamp, 1.0), data, None, self.pipeline.active_rois))
+        else:
+            self._stages.submit((timestamp, data))
+
+    def feed_file(self, path: str, fallback_fps: float = CAMERA_FPS) -> None:
+        """Decode a video file frame by frame and submit every frame."""
+        for timestamp, frame in iter_video_frames(path, fallback_fps):
+            self.submit(timestamp, frame)
+
+    def finish(self) -> tuple[float, dict]:
+        """
+        Wait for every frame, set the measured sampling rate and return
+        `(duration_seconds, extra result fields)`.
+
+        Raises
+        ------
+        ValueError  If the clip contained no decodable frames, or was
+                    abandoned (`ScanAborted`).
+        """
+        self._stages.close()
+        timestamps = self._timestamps
+        if not timestamps:
+            raise ValueError("The clip contained no decodable frames.")
+
+        duration = timestamps[-1] - timestamps[0]
+        effective_fps = CAMERA_FPS
+        if len(timestamps) >= 2 and duration > 0:
+            effective_fps = (len(timestamps) - 1) / duration
+        self.pipeline.fps = effective_fps
+
+        logger.info("Clip analysed: %d frames (%d with a face) over %.1f s at %.2f FPS.",
+                    len(timestamps), self._faces, duration, effective_fps)
+        return round(duration, 1), {
+            "effective_fps": round(effective_fps, 2),
+            "frames": len(timestamps),
+            "frames_with_face": self._faces,
+            "stages": self._stages.stats(),
+            "quality": self._monitor.summary() if self._monitor is not None else None,
+        }
+
+    def cancel(self) -> None:
+        """Stop and release the stage executors (safe after `finish()`)."""
+        self._stages.cancel()
+        try:
+            self._stages.close()
+        except Exception:
+            pass        # Already surfaced by finish()
+        release_stream(self._stream)
+
+    # ── Private ──────────────────────────────────────────────────────────────
+
+    def _decode(self, entry: tuple[float, bytes]):
+        timestamp, jpeg = entry
+        frame, scale = self._decoder.decode(jpeg)      # Atomic: the sink may rescale concurrently
+        # The view key restarts landmark tracking when the decode scale changes
+        return None if frame is None else ((timestamp, scale), frame, (scale,), self.pipeline.active_rois)
+
+    def _accumulate(self, detected) -> None:
+        (timestamp, scale), rois, face_size = detected
+        if self._decoder is not None:
+            face_px = None if face_size is None else face_size / scale
+            self._decoder.update_face_size(None if face_px is None else face_px * self._decoder.scale)
+        self.pipeline.add_frame(rois, timestamp)
+        self._timestamps.append(timestamp)
+        self._faces += rois.face_detected
+        if self._monitor is not None:
+            self._monitor.update(self.pipeline, rois)   # ScanAborted fails the next submit
+
+
+async def _limited(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    """Pass chunks through, raising `ClipTooLargeError` past `max_bytes`."""
+    total = 0
+    async for chunk in chunks:
+        total += len(chunk)
+        if total > max_bytes:
+            raise ClipTooLargeError(f"Clip exceeds {max_bytes // (1024 * 1024)} MB.")
+        if chunk:
+            yield chunk
+
+
+async def analyze_upload(
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    meta: UserMetadata,
+    bp_estimator: BPEstimator,
+    algorithm: str = "pos",
+    mjpeg_fps: float = CAMERA_FPS,
+) -> dict:
+    """
+    Analyse a streamed clip and return the `/scan/result` payload.
+
+    Parameters
+    ----------
+    chunks       : async iterator of the request body.
+    content_type : the request's Content-Type (used with sniffing to
+                   tell MJPEG from containers).
+    mjpeg_fps    : frame rate of an MJPEG stream, which has no timestamps.
+
+    Raises
+    ------
+    ClipTooLargeError  Upload larger than `CLIP_MAX_BYTES`.
+    ValueError         Empty / undecodable clip, or no usable pulse.
+    """
+    body = _limited(chunks, CLIP_MAX_BYTES)
+    head = await anext(body, b"")
+    if not head:
+        raise ValueError("Empty upload.")
+
+    mjpeg = is_mjpeg(content_type, head)
+    # The first scan on a lane starts its worker — keep it off the event loop
+    analyzer = await asyncio.to_thread(ClipAnalyzer, algorithm, mjpeg)
+    try:
+        if mjpeg:
+            splitter = MJPEGSplitter()
+            index = 0
+            chunk = head
+            while chunk:
+                for jpeg in splitter.feed(chunk):
+                    await asyncio.to_thread(analyzer.submit, index / mjpeg_fps, jpeg)
+                    index += 1
+                chunk = await anext(body, b"")
+        else:
+            with tempfile.NamedTemporaryFile(prefix="clip-", dir=CLIP_SPOOL_DIR) as spool:
+                spool.write(head)
+                async for chunk in body:
+                    spool.write(chunk)
+                spool.flush()
+                logger.info("Clip spooled (%d bytes, %s).", spool.tell(), content_type or "no type")
+                await asyncio.to_thread(analyzer.feed_file, spool.name)
+
+        duration, extra = await asyncio.to_thread(analyzer.finish)
+        extra["source"] = "mjpeg" if mjpeg else "container"
+        extra["trace_id"] = await asyncio.to_thread(archive_trace, analyzer.pipeline)
+        return await asyncio.to_thread(
+            compute_vitals, analyzer.pipeline, meta, bp_estimator, duration, extra,
+        )
+    finally:
+        await asyncio.to_thread(analyzer.cancel)
@@ -0,0 +1,155 @@
+"""
+api/hints.py — Server-chosen capture settings for the browser
+==============================================================
+In frontend mode the browser decides how often, how large and at what
+JPEG quality frames are uploaded — and that decides most of a scan's
+server cost (decode and detection scale with pixels, and everything
+scales with frame rate).  `/scan/start` and every `/scan/frame` response
+therefore carry a `hints` object the client applies to its next upload:
+
+    frame_interval_ms   Upload period.  Fixed for the scan at
+                        `/scan/start`: the rPPG trace assumes a steady
+                        sampling rate, so only `slow_down` stretches it.
+    jpeg_quality        `toDataURL` quality, 0–1.
+    max_width           Canvas width to downscale to (aspect kept), or
+                        None to keep the camera size.  Sized so the face
+                        still spans CLIENT_TARGET_FACE_PX upload pixels.
+    crop                {x, y, width, height} of the camera frame to
+                        upload — the last face box plus padding — or None
+                        to upload the whole frame (no face yet, or the
+                        face fills most of it).  The crop is kept while
+                        the face stays comfortably inside it, so uploads
+                        keep a stable geometry.
+
+All three knobs relax from their idle to their busy value as the
+admission load (api/admission.py) rises past CLIENT_HINT_BUSY_FROM of
+capacity, trading per-scan cost for room to admit more scans.
+"""
+
+from config import (
+    CLIENT_HINT_BUSY_FROM,
+    CLIENT_FRAME_INTERVAL_MS,
+    CLIENT_JPEG_QUALITY,
+    CLIENT_TARGET_FACE_PX,
+    CLIENT_WIDTH_RANGE,
+    CLIENT_CROP_PADDING,
+    CLIENT_CROP_MAX_AREA,
+    BP_HIGH_HZ,
+)
+
+# Stretch applied to the interval while the ingest queue asks to slow down
+_SLOW_DOWN_FACTOR = 1.5
+
+# Keep the width hint on a coarse grid so it changes rarely
+_WIDTH_STEP = 32
+
+# Crop edges snap to this grid (JPEG blocks are 8–16 px)
+_CROP_STEP = 16
+
+# A crop is kept while the face stays this fraction of its size inside
+# every edge, and while it is at most this many times the area needed.
+_CROP_KEEP_MARGIN = 0.1
+_CROP_MAX_SLACK = 2.0
+
+
+def busy_factor(load_ratio: float) -> float:
+    """Map load / capacity to 0 (idle) … 1 (at capacity)."""
+    span = 1.0 - CLIENT_HINT_BUSY_FROM
+    if span <= 0:
+        return 1.0 if load_ratio >= CLIENT_HINT_BUSY_FROM else 0.0
+    return min(1.0, max(0.0, (load_ratio - CLIENT_HINT_BUSY_FROM) / span))
+
+
+def _lerp(pair: tuple[float, float], t: float) -> float:
+    idle, busy = pair
+    return idle + t * (busy - idle)
+
+
+def frame_interval_ms(load_ratio: float) -> int:
+    """Upload period for a scan starting at this load."""
+    return int(round(_lerp(CLIENT_FRAME_INTERVAL_MS, busy_factor(load_ratio))))
+
+
+def crop_window(
+    face_box: tuple[int, int, int, int] | None,
+    frame_size: tuple[int, int] | None,
+    previous: dict | None = None,
+) -> dict | None:
+    """
+    Padded crop around `face_box` (camera-frame pixels), or None.
+
+    Returns `previous` unchanged while it still frames the face well.
+    """
+    if face_box is None or frame_size is None:
+        return None
+    x0, y0, x1, y1 = face_box
+    frame_w, frame_h = frame_size
+    side = max(x1 - x0, y1 - y0)
+    if side <= 0:
+        return None
+    pad = CLIENT_CROP_PADDING * side
+    needed = (x1 - x0 + 2 * pad) * (y1 - y0 + 2 * pad)
+
+    if previous is not None:
+        margin = _CROP_KEEP_MARGIN * side
+        px, py = previous["x"], previous["y"]
+        pw, ph = previous["width"], previous["height"]
+        if (x0 - margin >= px and y0 - margin >= py
+                and x1 + margin <= px + pw and y1 + margin <= py + ph
+                and pw * ph <= _CROP_MAX_SLACK * needed):
+            return previous
+
+    left = max(0, int((x0 - pad) // _CROP_STEP) * _CROP_STEP)
+    top = max(0, int((y0 - pad) // _CROP_STEP) * _CROP_STEP)
+    right = min(frame_w, -int(-(x1 + pad) // _CROP_STEP) * _CROP_STEP)
+    bottom = min(frame_h, -int(-(y1 + pad) // _CROP_STEP) * _CROP_STEP)
+    if right <= left or bottom <= top:
+        return None
+    if (right - left) * (bottom - top) > CLIENT_CROP_MAX_AREA * frame_w * frame_h:
+        return None
+    return {"x": left, "y": top, "width": right - left, "height": bottom - top}
+
+
+def client_hints(
+    load_ratio: float,
+    interval_ms: int,
+    face_px: float | None = None,
+    upload_width: int | None = None,
+    slow_down: bool = False,
+    crop: dict | None = None,
+) -> dict:
+    """
+    Capture hints for the client's next upload.
+
+    Parameters
+    ----------
+    load_ratio   : float   Admission load / capacity.
+    interval_ms  : int     The scan's upload period (see `frame_interval_ms`).
+    face_px      : float   Longest face-box side in the last uploaded frame
+                           (upload pixels), None if unknown or no face.
+    upload_width : int     Width of the whole camera frame in upload pixels.
+    slow_down    : bool    Ingest back-pressure flag for this upload.
+    crop         : dict    Crop to suggest (see `crop_window`).
+    """
+    busy = busy_factor(load_ratio)
+
+    if slow_down:
+        # Never below 2 samples per cycle of the highest pulse frequency
+        ceiling = 1000.0 / (2.0 * BP_HIGH_HZ)
+        interval_ms = max(interval_ms, int(round(min(interval_ms * _SLOW_DOWN_FACTOR, ceiling))))
+
+    max_width = None
+    if face_px and upload_width:
+        # Scale the upload so the face lands on the target size
+        target = _lerp(CLIENT_TARGET_FACE_PX, busy)
+        width = upload_width * target / face_px
+        low, high = CLIENT_WIDTH_RANGE
+        width = min(high, max(low, width))
+        max_width = int(round(width / _WIDTH_STEP) * _WIDTH_STEP)
+
+    return {
+        "frame_interval_ms": interval_ms,
+        "jpeg_quality": round(_lerp(CLIENT_JPEG_QUALITY, busy), 2),
+        "max_width": max_width,
+        "crop": crop,
+    }
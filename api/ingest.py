@@ -0,0 +1,189 @@
+"""
+api/ingest.py — Bounded frame-ingestion queue
+==============================================
+In frontend mode the client uploads frames faster than — or at least
+independently of — the scan worker that decodes and analyses them.
+`FrameQueue` sits between the two:
+
+    POST /scan/frame  →  FrameQueue.put()  →  scan worker  →  FrameQueue.get()
+
+* The queue is bounded, so a burst of uploads or a slow detector can
+  never grow memory without limit.
+* What happens when it is full is an explicit policy
+  (`INGEST_DROP_POLICY`): evict the oldest frame, reject the newest, or
+  decimate the stream to `INGEST_TARGET_FPS` first.
+* Every frame keeps its arrival timestamp so the worker can measure the
+  true sampling rate after drops.
+* Drop counters are kept per reason and `should_slow_down()` gives the
+  client a back-pressure hint for its next upload.
+"""
+
+import threading
+import time
+from collections import deque
+from utils.logger import get_logger
+from config import (
+    INGEST_QUEUE_SIZE,
+    INGEST_DROP_POLICY,
+    INGEST_TARGET_FPS,
+    INGEST_SLOW_DOWN_FILL,
+    INGEST_DECIMATE_TOLERANCE,
+)
+
+logger = get_logger("api.ingest")
+
+POLICIES = ("drop_oldest", "drop_newest", "decimate")
+
+
+class FrameQueue:
+    """
+    Thread-safe bounded FIFO of `(timestamp, item)` pairs.
+
+    Parameters
+    ----------
+    maxsize    : int     Capacity in frames.
+    policy     : str     One of `POLICIES`.
+    target_fps : float   Rate kept by the "decimate" policy.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = INGEST_QUEUE_SIZE,
+        policy: str = INGEST_DROP_POLICY,
+        target_fps: float = INGEST_TARGET_FPS,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown ingest policy '{policy}'. Choose from {list(POLICIES)}.")
+        self._maxsize = max(1, maxsize)
+        self._policy = policy
+        self._min_interval = (1.0 - INGEST_DECIMATE_TOLERANCE) / target_fps if target_fps > 0 else 0.0
+        self._items: deque = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._cancelled = False
+        self._last_accepted: float | None = None
+        self._last_dropped = False
+
+        # Metrics
+        self._received = 0
+        self._accepted = 0
+        self._dropped_oldest = 0
+        self._dropped_newest = 0
+        self._decimated = 0
+        self._peak_depth = 0
+
+    # ── Producer side ────────────────────────────────────────────────────────
+
+    def put(self, item, timestamp: float | None = None) -> bool:
+        """
+        Offer one frame.  Never blocks.
+
+        Returns
+        -------
+        bool   True if the frame was queued, False if the policy dropped
+               it or the queue is closed.
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        with self._cond:
+            if self._closed:
+                return False
+            self._received += 1
+
+            if (self._policy == "decimate" and self._last_accepted is not None
+                    and now - self._last_accepted < self._min_interval):
+                self._decimated += 1
+                self._last_dropped = True
+                return False
+
+            self._last_dropped = False
+            if len(self._items) >= self._maxsize:
+                if self._policy == "drop_newest":
+                    self._dropped_newest += 1
+                    self._last_dropped = True
+                    return False
+                self._items.popleft()
+                self._dropped_oldest += 1
+                self._last_dropped = True
+
+            self._items.append((now, item))
+            self._accepted += 1
+            self._last_accepted = now
+            self._peak_depth = max(self._peak_depth, len(self._items))
+            self._cond.notify()
+            return True
+
+    def close(self) -> None:
+        """No more frames will arrive; the consumer drains what is queued."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def cancel(self) -> None:
+        """Close and discard everything queued (e.g. on session reset)."""
+        with self._cond:
+            self._closed = True
+            self._cancelled = True
+            self._items.clear()
+            self._cond.notify_all()
+
+    # ── Consumer side ────────────────────────────────────────────────────────
+
+    def get(self, timeout: float | None = None) -> tuple[float, object] | None:
+        """
+        Next `(timestamp, item)` pair, blocking until one is available.
+
+        Returns None once the queue is closed and drained, or on timeout.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    # ── State / metrics ──────────────────────────────────────────────────────
+
+    @property
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    @property
+    def fill(self) -> float:
+        """Queue depth as a fraction of capacity."""
+        with self._cond:
+            return len(self._items) / self._maxsize
+
+    @property
+    def closed(self) -> bool:
+        with self._cond:
+            return self._closed
+
+    @property
+    def cancelled(self) -> bool:
+        with self._cond:
+            return self._cancelled
+
+    def should_slow_down(self) -> bool:
+        """
+        Back-pressure hint for the client: True while the queue is above
+        `INGEST_SLOW_DOWN_FILL` or the last frame offered was dropped.
+        """
+        with self._cond:
+            return self._last_dropped or len(self._items) >= INGEST_SLOW_DOWN_FILL * self._maxsize
+
+    def stats(self) -> dict:
+        """Snapshot of the ingestion counters."""
+        with self._cond:
+            return {
+                "policy": self._policy,
+                "capacity": self._maxsize,
+                "depth": len(self._items),
+                "peak_depth": self._peak_depth,
+                "received": self._received,
+                "accepted": self._accepted,
+                "dropped_oldest": self._dropped_oldest,
+                "dropped_newest": self._dropped_newest,
+                "decimated": self._decimated,
+                "dropped_total": self._dropped_oldest + self._dropped_newest + self._decimated,
+            }
@@ -0,0 +1,197 @@
+"""
+api/jobs.py — Bounded executor for scan post-processing
+=========================================================
+Once a scan's frames are in, the remaining work — pulse extraction,
+HR / HRV, BP and stress — is CPU-bound.  Instead of a fresh thread per
+scan, finished scans submit that work to a shared `JobExecutor`:
+
+* At most `SCAN_JOB_WORKERS` jobs run at once, so a burst of scans
+  finishing together queues up instead of oversubscribing the CPU and
+  slowing every one of them down.
+* The queue is FIFO, or ordered by a per-job priority when
+  `SCAN_JOB_QUEUE = "priority"` (lower value runs first; FIFO among
+  equals).
+* Queued jobs can be cancelled outright; a running job sees its
+  `cancelled` flag and its owner discards the result.
+* Every job reports its queue position and an ETA derived from a moving
+  average of recent job run times.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable
+from utils.logger import get_logger
+from config import SCAN_JOB_WORKERS, SCAN_JOB_QUEUE
+
+logger = get_logger("api.jobs")
+
+# Weight of the newest run time in the moving average used for ETAs
+_RUNTIME_EMA_ALPHA = 0.3
+
+
+class Job:
+    """Handle for one submitted job."""
+
+    def __init__(self, executor: "JobExecutor", job_id: int, name: str, fn: Callable, args: tuple):
+        self.id = job_id
+        self.name = name
+        self.state = "queued"            # queued | running | done | failed | cancelled
+        self.submitted_at = time.monotonic()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._executor = executor
+        self._fn = fn
+        self._args = args
+        self._cancelled = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> bool:
+        """Cancel the job; returns False if it had already finished."""
+        return self._executor.cancel(self)
+
+    def describe(self) -> dict:
+        """JSON-ready state, queue position and ETA (seconds to completion)."""
+        position, eta = self._executor.estimate(self)
+        return {
+            "id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "queue_position": position,
+            "eta_seconds": None if eta is None else round(eta, 1),
+        }
+
+
+class JobExecutor:
+    """
+    Fixed pool of worker threads draining a FIFO or priority queue.
+
+    Parameters
+    ----------
+    max_workers  : int   Jobs allowed to run concurrently.
+    queue_policy : str   "fifo" or "priority".
+    """
+
+    def __init__(self, max_workers: int = SCAN_JOB_WORKERS, queue_policy: str = SCAN_JOB_QUEUE):
+        if queue_policy not in ("fifo", "priority"):
+            raise ValueError(f"Unknown job queue policy '{queue_policy}'. Choose 'fifo' or 'priority'.")
+        self._max_workers = max(1, max_workers)
+        self._policy = queue_policy
+        self._heap: list[tuple[int, int, Job]] = []
+        self._running: set[Job] = set()
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._avg_runtime: float | None = None
+        self._completed = 0
+        self._workers = [
+            threading.Thread(target=self._work, daemon=True, name=f"scan-job-{i}")
+            for i in range(self._max_workers)
+        ]
+        for thread in self._workers:
+            thread.start()
+        logger.info("JobExecutor started (%d workers, %s queue).", self._max_workers, queue_policy)
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def submit(self, fn: Callable[..., Any], *args, priority: int = 0, name: str = "job") -> Job:
+        """Queue `fn(*args)`.  `priority` is ignored by a FIFO queue."""
+        with self._cond:
+            job_id = next(self._ids)
+            job = Job(self, job_id, name, fn, args)
+            key = priority if self._policy == "priority" else 0
+            heapq.heappush(self._heap, (key, job_id, job))
+            self._cond.notify()
+        logger.debug("Job %d (%s) queued at position %d.", job_id, name, len(self._heap) - 1)
+        return job
+
+    def cancel(self, job: Job) -> bool:
+        with self._cond:
+            if job.state in ("done", "failed", "cancelled"):
+                return False
+            job._cancelled = True
+            if job.state == "queued":
+                self._heap = [entry for entry in self._heap if entry[2] is not job]
+                heapq.heapify(self._heap)
+                job.state = "cancelled"
+                job.finished_at = time.monotonic()
+        logger.info("Job %d (%s) cancelled.", job.id, job.name)
+        return True
+
+    def estimate(self, job: Job) -> tuple[int | None, float | None]:
+        """
+        (queue position, ETA in seconds) for `job`.  Position 0 runs next;
+        both are None once the job has left the queue / finished.  The
+        ETA is None until a first job has completed.
+        """
+        with self._cond:
+            avg = self._avg_runtime
+            if job.state == "running":
+                eta = None if avg is None else max(0.0, avg - (time.monotonic() - job.started_at))
+                return None, eta
+            if job.state != "queued":
+                return None, None
+            ahead = sorted(self._heap)
+            position = next(i for i, entry in enumerate(ahead) if entry[2] is job)
+            if avg is None:
+                return position, None
+            # Jobs are served in waves of `max_workers`
+            waves = (position + len(self._running)) // self._max_workers
+            return position, avg * (waves + 1)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self._max_workers,
+                "queue_policy": self._policy,
+                "queued": len(self._heap),
+                "running": len(self._running),
+                "completed": self._completed,
+                "avg_runtime_seconds": None if self._avg_runtime is None else round(self._avg_runtime, 3),
+            }
+
+    # ── Private ──────────────────────────────────────────────────────────────
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._heap)
+                _, _, job = heapq.heappop(self._heap)
+                job.state = "running"
+                job.started_at = time.monotonic()
+                self._running.add(job)
+
+            try:
+                job._fn(*job._args)
+                state = "done"
+            except Exception:
+                logger.exception("Job %d (%s) failed:", job.id, job.name)
+                state = "failed"
+
+            with self._cond:
+                job.finished_at = time.monotonic()
+                job.state = "cancelled" if job._cancelled else state
+                self._running.discard(job)
+                self._completed += 1
+                runtime = job.finished_at - job.started_at
+                self._avg_runtime = runtime if self._avg_runtime is None else (
+                    _RUNTIME_EMA_ALPHA * runtime + (1.0 - _RUNTIME_EMA_ALPHA) * self._avg_runtime
+                )
+
+
+# ── Shared instance ──────────────────────────────────────────────────────────
+
+_shared: JobExecutor | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_executor() -> JobExecutor:
+    """Process-wide executor used by every `ScanSession` by default."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = JobExecutor()
+        return _shared
@@ -0,0 +1,222 @@
+"""
+api/preview.py — Encode-once, broadcast-to-many preview streams
+================================================================
+The `/video_feed` endpoint used to run an independent render-and-encode
+loop for every viewer.  The broadcasters here replace that with a single
+producer per stream type, shared by all its viewers:
+
+    ScanSession (frame + seq)  →  render (once per seq)
+                               →  per-viewer queues  →  streaming responses
+
+Two stream types exist:
+
+* `PreviewBroadcaster` — MJPEG, with the overlay burnt in or untouched.
+* `OverlayBroadcaster` — Server-Sent Events carrying only the overlay
+  *geometry* (face box, ROI rectangles, a landmark subset) per frame
+  sequence number.  Clients that already show their own camera feed
+  draw the overlay themselves and need no server-side JPEG at all.
+
+Both share the same producer mechanics:
+
+* Work happens only when a *new* frame sequence number appears — an
+  idle scan or a stalled camera costs nothing beyond a cheap seq check.
+* The producer task starts with the first viewer and exits after the
+  last one disconnects.
+* Each viewer has a small queue with *drop-oldest* semantics, so a slow
+  client only ever skips frames; it never delays the others.
+"""
+
+import asyncio
+import json
+import cv2
+import numpy as np
+from api.session import ScanSession
+from face.detector import FaceROIs
+from utils.logger import get_logger
+
+logger = get_logger("api.preview")
+
+_POLL_INTERVAL = 0.033     # Seconds between seq checks (~30 FPS ceiling)
+_CLIENT_QUEUE_SIZE = 2     # Frames buffered per viewer before dropping the oldest
+_JPEG_QUALITY = 85
+_LANDMARK_STEP = 5         # Draw / ship every N-th landmark only
+_FACE_PADDING = 20         # Pixels added around the landmark bbox
+
+
+def overlay_payload(seq: int, frame_shape: tuple[int, int], rois: FaceROIs | None) -> dict:
+    """
+    Compact, JSON-ready overlay geometry for one frame.
+
+    Boxes are `[x_min, y_min, x_max, y_max]` in pixels of the frame the
+    server processed; landmarks are a flat `[x0, y0, x1, y1, ...]` list.
+    """
+    h, w = frame_shape
+    payload = {"seq": seq, "width": w, "height": h, "face_detected": False}
+    if rois is None or not rois.face_detected or rois.landmarks is None:
+        return payload
+
+    x_min, y_min, x_max, y_max = rois.face_bbox
+    payload.update({
+        "face_detected": True,
+        "tracked": rois.tracked,
+        "face_bbox": [
+            max(0, x_min - _FACE_PADDING), max(0, y_min - _FACE_PADDING),
+            min(w, x_max + _FACE_PADDING), min(h, y_max + _FACE_PADDING),
+        ],
+        "rois": {
+            name: list(stats.bbox) if stats is not None else None
+            for name, stats in (
+                ("forehead", rois.forehead),
+                ("cheek_left", rois.cheek_left),
+                ("cheek_right", rois.cheek_right),
+            )
+        },
+        "landmarks": rois.landmarks[::_LANDMARK_STEP].ravel().tolist(),
+    })
+    return payload
+
+
+def _draw_overlay(frame: np.ndarray, rois: FaceROIs | None) -> None:
+    """Draw landmarks, face box and status text onto `frame` in place."""
+    h, w = frame.shape[:2]
+    if rois is None or not rois.face_detected or rois.landmarks is None:
+        # No face detected - show warning
+        cv2.putText(frame, "No Face Detected", (w // 2 - 150, h // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 3)
+        return
+
+    # Every 5th mesh point as a 2×2 green dot — one vectorised write
+    # instead of a cv2.circle call per point.
+    pts = rois.landmarks[::_LANDMARK_STEP].astype(np.intp)
+    xs = np.clip(pts[:, 0], 0, w - 2)
+    ys = np.clip(pts[:, 1], 0, h - 2)
+    for dy in (0, 1):
+        for dx in (0, 1):
+            frame[ys + dy, xs + dx] = (0, 255, 0)
+
+    # Purple frame around the face, padded by 20 px
+    x_min, y_min, x_max, y_max = rois.face_bbox
+    x_min = max(0, x_min - _FACE_PADDING)
+    y_min = max(0, y_min - _FACE_PADDING)
+    x_max = min(w, x_max + _FACE_PADDING)
+    y_max = min(h, y_max + _FACE_PADDING)
+    cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), (255, 0, 255), 3)
+    cv2.putText(frame, "Face Detected", (x_min, y_min - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+
+def _render_jpeg(frame: np.ndarray, rois: FaceROIs | None, draw: bool) -> bytes | None:
+    """(Optionally) overlay + encode one frame as a ready-to-send multipart chunk."""
+    if draw:
+        _draw_overlay(frame, rois)
+    ret, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, _JPEG_QUALITY])
+    if not ret:
+        return None
+    return (b"--frame\r\n"
+            b"Content-Type: image/jpeg\r\n\r\n" + buffer.tobytes() + b"\r\n")
+
+
+class _Broadcaster:
+    """
+    Shared producer / fan-out machinery.  Subclasses implement `_next()`,
+    which returns the next chunk to publish or None when nothing is new.
+
+    Parameters
+    ----------
+    session : ScanSession   Source of preview frames.
+    """
+
+    def __init__(self, session: ScanSession):
+        self._session = session
+        self._subscribers: set[asyncio.Queue] = set()
+        self._task: asyncio.Task | None = None
+        self._last_seq = -1
+        self.chunks_produced = 0
+
+    @property
+    def viewer_count(self) -> int:
+        return len(self._subscribers)
+
+    async def subscribe(self):
+        """
+        Async generator of chunks for one viewer.  Pass it straight to a
+        `StreamingResponse`.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_CLIENT_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._produce())
+        logger.info("%s viewer connected (%d watching).", type(self).__name__, self.viewer_count)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.discard(queue)
+            logger.info("%s viewer disconnected (%d watching).", type(self).__name__, self.viewer_count)
+
+    async def _next(self) -> bytes | None:
+        raise NotImplementedError
+
+    # ── Private ──────────────────────────────────────────────────────────────
+
+    async def _produce(self) -> None:
+        """Render each new frame once and fan it out; exit with no viewers."""
+        while self._subscribers:
+            chunk = await self._next()
+            if chunk is not None:
+                self.chunks_produced += 1
+                self._publish(chunk)
+            await asyncio.sleep(_POLL_INTERVAL)
+        logger.debug("%s producer stopped — no viewers.", type(self).__name__)
+
+    def _publish(self, chunk: bytes) -> None:
+        """Offer `chunk` to every viewer, dropping their oldest item if full."""
+        for queue in self._subscribers:
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(chunk)
+
+
+class PreviewBroadcaster(_Broadcaster):
+    """
+    MJPEG preview shared by all `/video_feed` viewers.
+
+    Parameters
+    ----------
+    session      : ScanSession   Source of preview frames.
+    draw_overlay : bool          Burn landmarks / face box into the JPEG.
+                                 False streams the frame untouched.
+    """
+
+    def __init__(self, session: ScanSession, draw_overlay: bool = True):
+        super().__init__(session)
+        self._draw_overlay = draw_overlay
+
+    async def _next(self) -> bytes | None:
+        preview = self._session.get_preview_frame(after_seq=self._last_seq)
+        if preview is None:
+            return None
+        seq, frame, rois = preview
+        self._last_seq = seq
+        # Encoding is CPU-bound — keep it off the event loop.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _render_jpeg, frame, rois, self._draw_overlay)
+
+
+class OverlayBroadcaster(_Broadcaster):
+    """
+    Server-Sent Events stream of overlay geometry, one event per new
+    frame sequence number.  No frame is copied or encoded.
+    """
+
+    async def _next(self) -> bytes | None:
+        overlay = self._session.get_overlay(after_seq=self._last_seq)
+        if overlay is None:
+            return None
+        seq, frame_shape, rois = overlay
+        self._last_seq = seq
+        body = json.dumps(overlay_payload(seq, frame_shape, rois), separators=(",", ":"))
+        return f"id: {seq}\ndata: {body}\n\n".encode()
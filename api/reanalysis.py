@@ -0,0 +1,136 @@
+"""
+api/reanalysis.py — Every algorithm over one trace, concurrently
+=================================================================
+A scan runs the single algorithm it was started with.  Re-analysis takes
+a finished trace — the session's last scan or one from the trace archive
+(rppg/archive.py) — and runs every algorithm in `ALGORITHMS` on it:
+
+    valid samples → normalise_channels (once, shared)
+                  → per algorithm, in parallel:  project → bandpass → HR
+
+The per-algorithm work is NumPy / SciPy array code that releases the
+GIL, so it runs on a shared thread pool and the total latency is close
+to that of the slowest algorithm rather than the sum.
+
+The ensemble HR is the average of the algorithms' HRs weighted by their
+spectral SNR (`confidence_fft`: peak power / cardiac-band power), so an
+algorithm that found a clean spectral peak outweighs one that did not.
+An algorithm whose `min_seconds` the trace does not reach reports an
+`error` and is left out of the ensemble.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from rppg.algorithms import ALGORITHMS, normalise_channels
+from rppg.filters import bandpass_filter
+from rppg.pipeline import RPPGPipeline
+from features.hr import estimate_hr
+from utils.logger import get_logger
+from config import REANALYSIS_WORKERS
+
+logger = get_logger("api.reanalysis")
+
+
+def _run_algorithm(name: str, normalised: np.ndarray, fps: float) -> dict:
+    start = time.perf_counter()
+    spec = ALGORITHMS[name]
+    try:
+        spec.check_window(len(normalised), fps)
+    except ValueError as e:
+        return {"error": str(e)}
+    pulse = bandpass_filter(spec.run(normalised, fps, normalised=True), fps)
+    hr = estimate_hr(pulse, fps)
+    return {
+        "hr_bpm": hr["hr_bpm"],
+        "hr_fft": hr["hr_fft"],
+        "hr_peaks": hr["hr_peaks"],
+        "confidence_fft": hr["confidence_fft"],
+        "confidence_peaks": hr["confidence_peaks"],
+        "num_beats": len(hr["rr_intervals"]) + 1 if hr["rr_intervals"] else 0,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000.0, 2),
+    }
+
+
+def reanalyse(
+    pipeline: RPPGPipeline,
+    algorithms: list[str] | None = None,
+    executor: ThreadPoolExecutor | None = None,
+) -> dict:
+    """
+    Run several algorithms concurrently over the pipeline's trace.
+
+    Parameters
+    ----------
+    pipeline   : RPPGPipeline   Filled pipeline (its own algorithm is ignored).
+    algorithms : list[str]      Names from `ALGORITHMS` (default: all).
+    executor   : thread pool    Default: the shared re-analysis pool.
+
+    Returns
+    -------
+    dict
+        {"algorithms": {name: HR, confidences, beats, elapsed_ms | error},
+         "ensemble": {"hr_bpm", "weights"}, "samples", "fps", "elapsed_ms"}
+
+    Raises
+    ------
+    ValueError  Unknown algorithm, too few valid samples, or a trace too
+                short for every requested algorithm.
+    """
+    names = list(ALGORITHMS) if algorithms is None else list(dict.fromkeys(algorithms))
+    unknown = [name for name in names if name not in ALGORITHMS]
+    if unknown or not names:
+        raise ValueError(f"Unknown algorithms {unknown}. Choose from {list(ALGORITHMS)}.")
+
+    start = time.perf_counter()
+    samples = pipeline.valid_samples()          # May raise ValueError
+    fps = pipeline.fps
+    normalised = normalise_channels(samples)
+    normalised.flags.writeable = False          # Shared by every worker
+
+    pool = executor or shared_reanalysis_pool()
+    futures = {name: pool.submit(_run_algorithm, name, normalised, fps) for name in names}
+    per_algorithm = {name: future.result() for name, future in futures.items()}
+
+    # ── SNR-weighted ensemble ───────────────────────────────────────────
+    used = [name for name in names if "error" not in per_algorithm[name]]
+    if not used:
+        raise ValueError(per_algorithm[names[0]]["error"])
+    hrs = np.array([per_algorithm[name]["hr_bpm"] for name in used])
+    snr = np.array([per_algorithm[name]["confidence_fft"] for name in used])
+    weights = snr / snr.sum() if snr.sum() > 0 else np.full(len(used), 1.0 / len(used))
+    ensemble_hr = float(weights @ hrs)
+
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    logger.info(
+        "Re-analysed %d samples with %s: ensemble %.1f BPM in %.1f ms (slowest algorithm %.1f ms).",
+        len(samples), used, ensemble_hr, elapsed_ms,
+        max(per_algorithm[name]["elapsed_ms"] for name in used),
+    )
+    return {
+        "algorithms": per_algorithm,
+        "ensemble": {
+            "hr_bpm": round(ensemble_hr, 1),
+            "weights": {name: round(float(w), 3) for name, w in zip(used, weights)},
+        },
+        "samples": len(samples),
+        "fps": round(fps, 2),
+        "elapsed_ms": round(elapsed_ms, 2),
+    }
+
+
+# ── Shared instance ──────────────────────────────────────────────────────────
+
+_shared: ThreadPoolExecutor | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_reanalysis_pool() -> ThreadPoolExecutor:
+    """Process-wide thread pool for per-algorithm work."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ThreadPoolExecutor(max_workers=REANALYSIS_WORKERS,
+                                         thread_name_prefix="reanalysis")
+        return _shared
@@ -12,13 +12,22 @@ Endpoint summary
     GET  /scan/status         — Poll scan progress & state
     GET  /scan/result         — Retrieve the full vitals JSON once scan is complete
     POST /scan/reset          — Reset session to idle
+    POST /analyze             — Analyse a whole recorded clip (streamed upload)
+    POST /analyze/traces      — Analyse a batch of precomputed RGB traces
+    POST /reanalyze           — Run every algorithm over a stored / the last trace
+    GET  /algorithms          — Registered rPPG algorithms and their cost classes
+    GET  /history             — Stored results, newest first (paginated)
+    GET  /history/aggregate   — HR / BP / RMSSD statistics over a time range
+    GET  /video_feed          — MJPEG preview, overlay burnt in (?overlay=false: raw)
+    GET  /overlay             — Latest overlay geometry as JSON
+    GET  /overlay_feed        — Overlay geometry per frame (Server-Sent Events)
     GET  /docs                — Auto-generated Swagger UI (FastAPI built-in)
 """
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
-import cv2
 import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from api.schemas import (
     UserMetadata,
     ScanRequest,
@@ -26,7 +35,23 @@ from api.schemas import (
     VitalsResponse,
 )
 from api.session import ScanSession
+from api.store import ScanRecord, shared_store
+from api.reanalysis import reanalyse
+from rppg.algorithms import ALGORITHMS, get_algorithm
+from rppg.archive import shared_archive
+from rppg.pipeline import RPPGPipeline
+from api.clip import ClipTooLargeError, analyze_upload
+from api.batch import (
+    BatchTooLargeError,
+    analyze_traces,
+    load_npy,
+    parse_json_batch,
+    read_body,
+    traces_from_array,
+)
+from api.preview import PreviewBroadcaster, OverlayBroadcaster, overlay_payload
 from utils.logger import get_logger
+from config import CAMERA_FPS, BATCH_MAX_BYTES, HISTORY_PAGE_MAX
 
 logger = get_logger("api.routes")
 
@@ -36,6 +61,13 @@ router = APIRouter()
 # One session for the entire application lifetime.  In a multi-user
 # deployment you would key sessions by user/token; for an MVP this is fine.
 _session = ScanSession()
+_store = shared_store()
+
+# Shared encoders for every preview viewer of the session — one per
+# stream type, so each frame is rendered at most once per type.
+_preview = PreviewBroadcaster(_session, draw_overlay=True)
+_preview_raw = PreviewBroadcaster(_session, draw_overlay=False)
+_overlay = OverlayBroadcaster(_session)
 
 
 # ── Health ────────────────────────────────────────────────────────────────────
@@ -80,16 +112,45 @@ async def start_scan(request: ScanRequest = ScanRequest()):
     Begin an rPPG scan.  The scan will receive frames from the frontend.
 
     Body (JSON, all optional):
-        algorithm         : "pos" | "chrom"   (default "pos")
+        algorithm         : str               GET /algorithms (default "pos")
         duration_seconds  : int               (20–120, default 45)
+        user_id, device_id: str               Owner of the stored result
 
     Returns 409 if a scan is already running, or 422 if metadata is missing.
+    Returns 429 (retry after the estimated wait) or 503 (rejected) with a
+    `Retry-After` header when the server lacks the capacity to process
+    another scan in real time — see `api/admission.py`.
+
+    The response (and every `/scan/frame` response) carries `hints`: the
+    frame interval, JPEG quality and maximum width the client should
+    upload with — see `api/hints.py`.
     """
+    if _session.status == "scanning":
+        raise HTTPException(status_code=409, detail="A scan is already in progress.")
+
+    decision = _session.check_admission(request.duration_seconds)
+    if decision.action != "accept":
+        logger.warning("Scan not admitted: %s", decision.to_dict())
+        headers = {"Retry-After": str(decision.retry_after)}
+        if decision.action == "queue":
+            raise HTTPException(
+                status_code=429,
+                detail=f"Server busy — capacity for a new scan in about {decision.retry_after} s.",
+                headers=headers,
+            )
+        raise HTTPException(
+            status_code=503,
+            detail="Server at capacity. Please try again later.",
+            headers=headers,
+        )
+
     # Just initialize the session - don't actually start camera processing
     # Frontend will send frames
     success = _session.start_scan_frontend_mode(
         algorithm=request.algorithm,
         duration_seconds=request.duration_seconds,
+        user_id=request.user_id,
+        device_id=request.device_id,
     )
     if not success:
         current_status = _session.status
@@ -106,6 +167,8 @@ async def start_scan(request: ScanRequest = ScanRequest()):
             f"Scan started ({request.algorithm}, {request.duration_seconds}s). "
             "Send frames via POST /scan/frame."
         ),
+        "admission": decision.to_dict(),
+        "hints": _session.get_client_hints(),
     }
 
 
@@ -117,6 +180,15 @@ async def receive_frame(data: dict):
     Body (JSON):
         frame: base64 encoded image data
         progress_percent: current progress (0-100)
+        crop (optional): {x, y, scale, frame_width, frame_height} — the
+            image is the camera-frame region at (x, y), resized by `scale`
+            (see `hints.crop` in the previous response).
+
+    The frame is queued for the scan worker (bounded queue, see
+    `api/ingest.py`).  The response reports whether it was accepted,
+    sets `slow_down` when the client should send frames less often, and
+    sets `complete` once the scan holds its post-warm-up signal — the
+    client can stop uploading then, even before its own timer runs out.
     """
     try:
         # Quick validation
@@ -131,19 +203,9 @@ async def receive_frame(data: dict):
             logger.warning("Empty frame data received")
             return {"success": False, "error": "Empty frame data"}
         
-        # Process the frame in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        success = await loop.run_in_executor(
-            None, 
-            _session.process_frontend_frame, 
-            frame_data, 
-            progress
-        )
-        
-        return {"success": success, "progress": progress, "status": _session.status}
-    except asyncio.TimeoutError:
-        logger.error("Frame processing timeout")
-        return {"success": False, "error": "Processing timeout"}
+        # Only a base64 decode and a queue insert — no executor needed
+        result = _session.process_frontend_frame(frame_data, progress, data.get('crop'))
+        return {**result, "progress": progress, "status": _session.status}
     except Exception as e:
         logger.error(f"Frame processing error: {e}", exc_info=True)
         return {"success": False, "error": str(e)[:100]}
@@ -171,10 +233,20 @@ async def scan_status() -> StatusResponse:
         "error":    "Scan encountered an error. Check logs or restart.",
     }
 
+    message = messages.get(status, "Unknown state.")
+    job = _session.get_job_status()
+    if status == "scanning" and job is not None and job["state"] in ("queued", "running"):
+        message = "Frames captured — computing results."
+        if job["eta_seconds"] is not None:
+            message += f" About {job['eta_seconds']:.0f} s remaining."
+
     return StatusResponse(
         status=status,
-        message=messages.get(status, "Unknown state."),
+        message=message,
         progress_percent=progress if status == "scanning" else None,
+        ingest=_session.get_ingest_stats(),
+        stages=_session.get_stage_stats(),
+        job=job,
     )
 
 
@@ -208,70 +280,255 @@ async def scan_reset():
     return {"status": "ok", "message": "Session reset. Ready for a new scan."}
 
 
-# ── Video Streaming ───────────────────────────────────────────────────────────
+@router.post("/analyze")
+async def analyze_clip(
+    request: Request,
+    algorithm: str = Query("pos", description="A name from GET /algorithms"),
+    fps: float = Query(CAMERA_FPS, gt=0, le=120, description="Frame rate of MJPEG uploads"),
+    user_id: str | None = Query(None, max_length=128),
+    device_id: str | None = Query(None, max_length=128),
+):
+    """
+    Analyse a whole recorded clip sent as the raw request body, e.g.
 
-async def generate_video_frames():
+        curl -X POST --data-binary @clip.webm -H "Content-Type: video/webm" \\
+             http://localhost:8000/analyze
+
+    WebM / MP4 / other FFmpeg-readable containers use their own frame
+    timestamps; MJPEG (concatenated JPEGs or `multipart/x-mixed-replace`)
+    is spaced at `fps`.  Independent of the live scan session, but uses
+    its metadata (POST /metadata first).
+
+    Returns the same payload as `/scan/result`, plus frame counts, and
+    stores it under `user_id` / `device_id` (see `/history`).
+    Returns 422 if metadata is missing or no pulse could be extracted,
+    413 if the clip exceeds the size limit.
     """
-    Generate video frames for streaming during the scan.
-    Yields JPEG-encoded frames from the active camera session.
+    _check_algorithm(algorithm)
+    meta = _session.metadata
+    if meta is None:
+        raise HTTPException(status_code=422, detail="Set user metadata first via POST /metadata.")
+
+    try:
+        result = await analyze_upload(
+            request.stream(),
+            request.headers.get("content-type", ""),
+            meta,
+            await asyncio.to_thread(_session.get_bp_estimator),   # First use trains it
+            algorithm=algorithm,
+            mjpeg_fps=fps,
+        )
+    except ClipTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Clip analysis failed: {e}")
+
+    _store.save(ScanRecord(result, meta.model_dump(), "clip", user_id, device_id))
+    return result
+
+
+@router.post("/analyze/traces")
+async def analyze_trace_batch(
+    request: Request,
+    algorithm: str = Query("pos", description="A name from GET /algorithms"),
+    fps: float = Query(CAMERA_FPS, gt=0, le=240, description="Sample rate of .npy uploads"),
+    age: int | None = Query(None, description=".npy uploads: overrides POST /metadata"),
+    gender: str | None = Query(None),
+    height_cm: float | None = Query(None),
+    weight_kg: float | None = Query(None),
+):
+    """
+    Vitals for many precomputed `(T, 3)` RGB traces in one request — see
+    `api/batch.py` for the formats.
+
+    * `application/json`: `{"algorithm", "metadata"?, "traces": [{"id"?,
+      "fps", "metadata"?, "rgb" | "rgb_f32" | "rgb_npy"}]}`.
+    * `application/x-npy`: a `(B, T, 3)` float array; `algorithm`, `fps`
+      and (optionally) the demographics come from the query string.
+
+    Traces without their own metadata use the session's (POST /metadata).
+    Returns `{disclaimer, algorithm_used, count, failed, results}`; a
+    trace that cannot be analysed gets an `error` entry in `results`.
+    Returns 422 for a malformed request, 413 past the size limit.
     """
-    while True:
-        frame = _session.get_current_frame()
-        if frame is not None:
-            # Draw face detection visualization if available
-            rois = _session.get_current_rois()
-            if rois and rois.face_detected:
-                # Draw face landmarks
-                landmarks = rois.landmarks
-                if landmarks:
-                    # Draw face mesh points
-                    for (x, y) in landmarks[::5]:  # Draw every 5th point to avoid clutter
-                        cv2.circle(frame, (x, y), 1, (0, 255, 0), -1)
-                    
-                    # Calculate face bounding box from landmarks
-                    if len(landmarks) > 0:
-                        xs = [pt[0] for pt in landmarks]
-                        ys = [pt[1] for pt in landmarks]
-                        x_min, x_max = min(xs), max(xs)
-                        y_min, y_max = min(ys), max(ys)
-                        
-                        # Add padding
-                        padding = 20
-                        x_min = max(0, x_min - padding)
-                        y_min = max(0, y_min - padding)
-                        x_max = min(frame.shape[1], x_max + padding)
-                        y_max = min(frame.shape[0], y_max + padding)
-                        
-                        # Draw purple frame around face
-                        cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), (255, 0, 255), 3)
-                        
-                        # Draw "Face Detected" indicator
-                        cv2.putText(frame, "Face Detected", (x_min, y_min - 10), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    _check_algorithm(algorithm)
+    content_type = request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    demographics = {"age": age, "gender": gender, "height_cm": height_cm, "weight_kg": weight_kg}
+
+    def run(body: bytes) -> dict:
+        # Parsing a multi-MB body is CPU work too: keep it off the event loop
+        if content_type in ("application/x-npy", "application/octet-stream"):
+            if any(v is not None for v in demographics.values()):
+                meta = UserMetadata(**demographics)
             else:
-                # No face detected - show warning
-                h, w = frame.shape[:2]
-                cv2.putText(frame, "No Face Detected", (w//2 - 150, h//2), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 3)
-            
-            # Encode frame as JPEG
-            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if ret:
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        
-        # Limit frame rate to avoid overwhelming the client
-        await asyncio.sleep(0.033)  # ~30 FPS
+                meta = _session.metadata
+            traces, name = traces_from_array(load_npy(body), fps, meta), algorithm
+        else:
+            traces, name = parse_json_batch(json.loads(body), _session.metadata)
+        bp_estimator = _session.get_bp_estimator()     # First use trains it
+        return analyze_traces(traces, bp_estimator, name)
+
+    try:
+        body = await read_body(request.stream(), BATCH_MAX_BYTES)
+        return await asyncio.to_thread(run, body)
+    except BatchTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        # json.JSONDecodeError and pydantic's ValidationError are ValueErrors
+        raise HTTPException(status_code=422, detail=f"Invalid trace batch: {e}")
+
+
+@router.post("/reanalyze")
+async def reanalyze(data: dict | None = None):
+    """
+    Run every rPPG algorithm concurrently over one trace and combine them.
 
+    Body (JSON, all optional):
+        trace_id   : int         Archived trace (a result's `trace_id`);
+                                 default: the session's last scan.
+        algorithms : list[str]   Subset to run (default: all).
+
+    Returns per-algorithm HR and confidences plus an SNR-weighted
+    ensemble HR — see `api/reanalysis.py`.  404 if there is no such
+    trace, 422 if it has too few valid samples.
+    """
+    data = data or {}
+    trace_id = data.get("trace_id")
+    if trace_id is None:
+        pipeline = _session.get_last_pipeline()
+        if pipeline is None:
+            raise HTTPException(status_code=404, detail="No finished scan to re-analyse.")
+    else:
+        try:
+            trace = await asyncio.to_thread(shared_archive().load, int(trace_id))
+        except (KeyError, ValueError, TypeError):
+            raise HTTPException(status_code=404, detail=f"No archived trace {trace_id!r}.")
+        pipeline = RPPGPipeline.from_trace(trace)
+
+    try:
+        result = await asyncio.to_thread(reanalyse, pipeline, data.get("algorithms"))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=f"Re-analysis failed: {e}")
+    return {"trace_id": trace_id, **result}
+
+
+@router.get("/algorithms")
+async def list_algorithms():
+    """
+    The rPPG algorithms accepted wherever an `algorithm` is taken, with
+    their relative cost class ("cheap" < "moderate" < "heavy") and the
+    shortest trace (seconds of valid samples) each needs.
+    """
+    return {
+        "algorithms": [
+            {"name": spec.name, "cost": spec.cost,
+             "min_seconds": spec.min_seconds, "description": spec.description}
+            for spec in ALGORITHMS.values()
+        ],
+    }
+
+
+def _check_algorithm(name: str) -> None:
+    try:
+        get_algorithm(name)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+# ── History ───────────────────────────────────────────────────────────────────
+
+@router.get("/history")
+async def history(
+    user_id: str | None = None,
+    device_id: str | None = None,
+    since: float | None = Query(None, description="Unix time, inclusive"),
+    until: float | None = Query(None, description="Unix time, exclusive"),
+    limit: int = Query(50, ge=1, le=HISTORY_PAGE_MAX),
+    cursor: str | None = Query(None, description="`next_cursor` of the previous page"),
+    include_result: bool = Query(False, description="Include each full vitals payload"),
+):
+    """
+    Stored results, newest first, filtered by user / device / time range.
+
+    Returns `{items, next_cursor}`; pass `next_cursor` back as `cursor`
+    for the following page (null on the last page).  Each item has the
+    headline numbers (HR, BP, RMSSD, stress level), the demographics and
+    timing; `include_result=true` adds the full `/scan/result` payload.
+    """
+    try:
+        items, next_cursor = await asyncio.to_thread(
+            _store.history, user_id, device_id, since, until, limit, cursor, include_result,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid cursor: {e}")
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/history/aggregate")
+async def history_aggregate(
+    user_id: str | None = None,
+    device_id: str | None = None,
+    since: float | None = Query(None, description="Unix time, inclusive"),
+    until: float | None = Query(None, description="Unix time, exclusive"),
+    bucket: str | None = Query(None, pattern="^(hour|day|week)$"),
+):
+    """
+    Count and mean / min / max of HR, systolic and diastolic BP (plus
+    mean RMSSD) over the range — one entry, or one per UTC hour / day /
+    week bucket with `bucket_start` as Unix time.
+    """
+    buckets = await asyncio.to_thread(_store.aggregate, user_id, device_id, since, until, bucket)
+    return {"buckets": buckets}
+
+
+# ── Video Streaming ───────────────────────────────────────────────────────────
 
 @router.get("/video_feed")
-async def video_feed():
+async def video_feed(overlay: bool = True):
     """
     Stream live video from the camera during scanning.
     Returns an MJPEG stream.
+
+    Query:
+        overlay : bool   Burn landmarks / face box into the frames
+                         (default).  Pass `false` to get untouched frames
+                         and draw the overlay client-side from
+                         `/overlay_feed`.
+
+    All viewers share one broadcaster: each new frame is rendered and
+    JPEG-encoded once, then fanned out to every connected client.
     """
+    broadcaster = _preview if overlay else _preview_raw
     return StreamingResponse(
-        generate_video_frames(),
+        broadcaster.subscribe(),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
+
+
+@router.get("/overlay")
+async def overlay_latest():
+    """
+    Overlay geometry for the most recent frame: face box, forehead /
+    cheek ROI rectangles and a landmark subset, in frame pixels.
+    Returns 404 if no frame has been processed yet.
+    """
+    current = _session.get_overlay(after_seq=-1)
+    if current is None:
+        raise HTTPException(status_code=404, detail="No frame processed yet.")
+    return overlay_payload(*current)
+
+
+@router.get("/overlay_feed")
+async def overlay_feed():
+    """
+    Server-Sent Events stream of overlay geometry — one `data:` event
+    (same JSON as `/overlay`) per new frame, with the frame sequence
+    number as the event id.  A few hundred bytes per frame instead of a
+    JPEG; clients that already display the camera feed render the overlay
+    themselves.
+    """
+    return StreamingResponse(
+        _overlay.subscribe(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
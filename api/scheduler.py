@@ -0,0 +1,214 @@
+"""
+api/scheduler.py — Per-scan load shedding
+==========================================
+Admission control (api/admission.py) decides whether a scan may start;
+once it runs, nothing stops it from falling behind when the host gets
+busier — the ingest queue fills, frames are dropped at random and the
+trace gets holes.  A `LoadScheduler` sheds load in a controlled way
+instead, by stepping along a quality ladder (`SCHEDULER_LEVELS`):
+
+    level 0   full quality (DETECTION_STRIDE, DETECTION_DOWNSCALE)
+      ↓       larger detection stride — landmarks tracked in between
+      ↓       downscaled landmark inference
+      ↓       decimate frames to SCHEDULER_MIN_FPS (2 × BP_HIGH_HZ, the
+              least the rPPG band needs)
+
+Every SCHEDULER_INTERVAL_SECONDS it compares the interval's detection
+time per frame with the per-frame budget,
+
+    budget = detect workers / frame rate      load = detect time / budget
+
+and the ingest queue fill.  Load above SCHEDULER_HIGH_LOAD or a queue
+above SCHEDULER_QUEUE_HIGH sheds one level; load below SCHEDULER_LOW_LOAD
+with a near-empty queue for SCHEDULER_RESTORE_SECONDS restores one.  A
+level that has to be shed again soon after being restored doubles the
+calm time required next time, so the scheduler does not flap.
+
+Each level change is recorded with its measurements; `summary()` goes
+into the scan's result metadata.
+"""
+
+import time
+from collections import deque
+from utils.logger import get_logger
+from config import (
+    DETECTION_STRIDE,
+    DETECTION_DOWNSCALE,
+    SCHEDULER_INTERVAL_SECONDS,
+    SCHEDULER_HIGH_LOAD,
+    SCHEDULER_LOW_LOAD,
+    SCHEDULER_QUEUE_HIGH,
+    SCHEDULER_QUEUE_LOW,
+    SCHEDULER_RESTORE_SECONDS,
+    SCHEDULER_MIN_FPS,
+    SCHEDULER_LEVELS,
+    INGEST_DECIMATE_TOLERANCE,
+)
+
+logger = get_logger("api.scheduler")
+
+# Longest calm time required before a restore, however often it flapped
+_MAX_RESTORE_SECONDS = 8 * SCHEDULER_RESTORE_SECONDS
+# Decisions kept for the result metadata (oldest are dropped)
+_MAX_DECISIONS = 32
+
+
+class LoadScheduler:
+    """
+    Quality level of one live scan.
+
+    Parameters
+    ----------
+    workers : int                          Detection workers sharing the load.
+    levels  : tuple of (stride, downscale, decimate)   The quality ladder.
+    """
+
+    def __init__(self, workers: int = 1, levels: tuple[tuple[int, bool, bool], ...] = SCHEDULER_LEVELS):
+        if not levels:
+            raise ValueError("The scheduler needs at least one quality level.")
+        self._workers = max(1, workers)
+        self._levels = levels
+        self._level = 0
+        self._min_interval = (1.0 - INGEST_DECIMATE_TOLERANCE) / SCHEDULER_MIN_FPS
+
+        now = time.monotonic()
+        self._started = now
+        self._level_since = now
+        self._level_seconds = [0.0] * len(levels)
+        self._decisions: deque[dict] = deque(maxlen=_MAX_DECISIONS)
+        self._changes = 0
+
+        # Interval accumulators
+        self._last_eval = now
+        self._last_busy = 0.0
+        self._last_items = 0
+        self._kept = 0
+        self._queue_fill = 0.0
+        self._load: float | None = None
+
+        # Decimation and restore state
+        self._last_kept: float | None = None
+        self._decimated = 0
+        self._calm_since: float | None = None
+        self._restored_at: float | None = None
+        self._restore_seconds = SCHEDULER_RESTORE_SECONDS
+
+    # ── Current settings ─────────────────────────────────────────────────────
+
+    @property
+    def level(self) -> int:
+        return self._level
+
+    @property
+    def settings(self) -> tuple[int, bool]:
+        """`(detect_stride, downscale)` for the detector at this level."""
+        stride, downscale, _ = self._levels[self._level]
+        return max(DETECTION_STRIDE, stride), DETECTION_DOWNSCALE or downscale
+
+    @property
+    def decimating(self) -> bool:
+        return self._levels[self._level][2]
+
+    # ── Per-frame calls ──────────────────────────────────────────────────────
+
+    def admit(self, timestamp: float) -> bool:
+        """
+        Whether to process the frame captured at `timestamp` (seconds);
+        False when decimation drops it.
+        """
+        if (self.decimating and self._last_kept is not None
+                and timestamp - self._last_kept < self._min_interval):
+            self._decimated += 1
+            return False
+        self._last_kept = timestamp
+        self._kept += 1
+        return True
+
+    def observe(self, busy_seconds: float, items: int, queue_fill: float = 0.0,
+                now: float | None = None) -> None:
+        """
+        Record the detection stage's cumulative busy time and item count
+        and the current queue fill (0–1); re-evaluates the level once per
+        SCHEDULER_INTERVAL_SECONDS.
+        """
+        now = time.monotonic() if now is None else now
+        self._queue_fill = max(self._queue_fill, queue_fill)
+        if now - self._last_eval < SCHEDULER_INTERVAL_SECONDS:
+            return
+
+        wall = now - self._last_eval
+        frames = items - self._last_items
+        busy = busy_seconds - self._last_busy
+        kept, fill = self._kept, self._queue_fill
+        self._last_eval, self._last_busy, self._last_items = now, busy_seconds, items
+        self._kept, self._queue_fill = 0, queue_fill
+        if frames <= 0 and fill <= SCHEDULER_QUEUE_HIGH:
+            return              # Nothing processed, nothing waiting: no evidence
+
+        # ── Per-frame time budget ───────────────────────────────────────
+        frame_ms = 1000.0 * busy / frames if frames > 0 else 0.0
+        rate = max(kept, frames) / wall
+        budget_ms = 1000.0 * self._workers / rate if rate > 0 else float("inf")
+        load = frame_ms / budget_ms
+        self._load = load
+
+        if load > SCHEDULER_HIGH_LOAD or fill > SCHEDULER_QUEUE_HIGH:
+            self._calm_since = None
+            if self._level + 1 < len(self._levels):
+                flapped = self._restored_at is not None and now - self._restored_at < self._restore_seconds
+                self._restore_seconds = (min(2.0 * self._restore_seconds, _MAX_RESTORE_SECONDS)
+                                         if flapped else SCHEDULER_RESTORE_SECONDS)
+                reason = (f"detection {frame_ms:.0f} ms/frame over a {budget_ms:.0f} ms budget"
+                          if load > SCHEDULER_HIGH_LOAD else f"ingest queue {fill:.0%} full")
+                self._set_level(self._level + 1, now, load, fill, reason)
+        elif load < SCHEDULER_LOW_LOAD and fill < SCHEDULER_QUEUE_LOW and self._level > 0:
+            if self._calm_since is None:
+                self._calm_since = now - wall
+            if now - self._calm_since >= self._restore_seconds:
+                self._calm_since = now       # The next step needs its own calm period
+                self._restored_at = now
+                self._set_level(self._level - 1, now, load, fill,
+                                f"detection {frame_ms:.0f} ms/frame within a {budget_ms:.0f} ms budget")
+        else:
+            self._calm_since = None
+
+    # ── Reporting ────────────────────────────────────────────────────────────
+
+    def summary(self) -> dict:
+        """Current level, time per level and recent decisions, for results."""
+        seconds = list(self._level_seconds)
+        seconds[self._level] += time.monotonic() - self._level_since
+        stride, downscale = self.settings
+        return {
+            "level": self._level,
+            "detect_stride": stride,
+            "downscale": downscale,
+            "decimate": self.decimating,
+            "load": None if self._load is None else round(self._load, 3),
+            "level_changes": self._changes,
+            "seconds_at_level": [round(s, 1) for s in seconds],
+            "decimated_frames": self._decimated,
+            "decisions": list(self._decisions),
+        }
+
+    # ── Private ──────────────────────────────────────────────────────────────
+
+    def _set_level(self, level: int, now: float, load: float, fill: float, reason: str) -> None:
+        self._level_seconds[self._level] += now - self._level_since
+        self._level_since = now
+        self._level = level
+        self._changes += 1
+        stride, downscale = self.settings
+        decision = {
+            "at_seconds": round(now - self._started, 1),
+            "level": level,
+            "detect_stride": stride,
+            "downscale": downscale,
+            "decimate": self.decimating,
+            "load": round(load, 3),
+            "queue_fill": round(fill, 3),
+            "reason": reason,
+        }
+        self._decisions.append(decision)
+        logger.info("Quality level %d (stride %d, downscale %s, decimate %s): %s.",
+                    level, stride, downscale, self.decimating, reason)
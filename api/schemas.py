@@ -5,8 +5,9 @@ Centralises all data-transfer objects so that FastAPI can auto-generate
 OpenAPI docs and perform input validation for free.
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
+from rppg.algorithms import get_algorithm
 
 
 # ── Request Models ───────────────────────────────────────────────────────────
@@ -29,8 +30,16 @@ class UserMetadata(BaseModel):
 
 class ScanRequest(BaseModel):
     """Optionally override algorithm and scan duration at scan time."""
-    algorithm: str = Field("pos", pattern="^(pos|chrom)$")
+    algorithm: str = Field("pos", description="A name from GET /algorithms.")
     duration_seconds: int = Field(45, ge=20, le=120)
+    user_id: Optional[str] = Field(None, max_length=128, description="Owner of the stored result.")
+    device_id: Optional[str] = Field(None, max_length=128, description="Device the scan ran on.")
+
+    @field_validator("algorithm")
+    @classmethod
+    def _known_algorithm(cls, value: str) -> str:
+        get_algorithm(value)            # ValueError → 422
+        return value
 
 
 # ── Response Models ──────────────────────────────────────────────────────────
@@ -81,3 +90,6 @@ class StatusResponse(BaseModel):
     status: str                          # "idle" | "scanning" | "error"
     message: str
     progress_percent: Optional[float] = None   # 0–100 during scan
+    ingest: Optional[dict] = None              # Frame-queue counters (frontend mode)
+    stages: Optional[dict] = None              # Per-stage throughput / utilisation
+    job: Optional[dict] = None                 # Post-processing queue position / ETA
@@ -13,6 +13,34 @@ written by the scan thread is protected by `_lock`.  The public
 properties (`status`, `progress`, `result`) acquire the lock before
 reading.
 
+Frontend mode
+-------------
+Uploaded frames pass through a bounded `FrameQueue` (api/ingest.py) and
+then a `StagedPipeline` (utils/stages.py): JPEG decode in threads, face
+detection + ROI sampling on a detect lane shared with other scans
+(`detect_lane()`, one worker process per lane), trace accumulation inline.
+Stage counts and utilisation are reported by `get_stage_stats()`.
+Responses carry capture hints (api/hints.py) sized from the admission
+load and the face size measured in the uploads — `get_client_hints()`.
+Once a face is known the hints include a face crop; cropped uploads come
+with their `FrameWindow`, and landmarks are mapped back to camera-frame
+coordinates before they are stored.  A `LoadScheduler` (api/scheduler.py)
+raises the detection stride, downscales inference or decimates frames
+while detection falls behind, and restores full quality once it catches
+up; its decisions go into the result's `scheduler` field.
+
+Post-processing
+---------------
+In both modes, pulse extraction and HR / HRV / BP / stress estimation
+run as a job on a bounded `JobExecutor` (api/jobs.py) shared by all
+sessions.  `reset()` cancels the job; `get_job_status()` reports its
+queue position and ETA.  Completed results are also queued for the
+persistent `ResultStore` (api/store.py), tagged with the scan's optional
+`user_id` / `device_id`.  The raw per-ROI colour trace is appended to
+the trace archive (rppg/archive.py) first and the result carries its
+`trace_id`, so the scan can be re-analysed later; the last scan's
+pipeline also stays available via `get_last_pipeline()` until `reset()`.
+
 Lifecycle
 ---------
     1. `set_metadata(...)` — store user demographics.
@@ -25,17 +53,41 @@ Lifecycle
 import time
 import threading
 import math
+from functools import partial
 import numpy as np
-import cv2
 from camera.capture import CameraCapture
-# FaceDetector is imported lazily inside _run_scan() so the server
-# boots cleanly even before mediapipe is installed.
-from rppg.pipeline import RPPGPipeline
+from camera.decode import FrameDecoder, FrameWindow, b64_to_bytes
+from api.ingest import FrameQueue
+from api.jobs import Job, JobExecutor, shared_executor
+from api.admission import AdmissionController, AdmissionDecision, shared_admission
+from api.hints import client_hints, crop_window, frame_interval_ms
+from api.scheduler import LoadScheduler
+from api.store import ResultStore, ScanRecord, shared_store
+from utils.stages import StagedPipeline, StageSpec
+# FaceDetector itself is only constructed inside the scan workers, and
+# face.detector imports mediapipe lazily, so the server boots cleanly even
+# before mediapipe is installed.
+from face.detector import (
+    FaceROIs, detect_in_worker, detect_lane, new_stream_id, preferred_input_order, release_stream,
+)
+from rppg.pipeline import RPPGPipeline, signal_target
+from rppg.monitor import ScanAborted, ScanMonitor
+from rppg.archive import TraceArchive, shared_archive
 from features.hr import estimate_hr
 from features.hrv import compute_hrv
 from model.bp_model import BPEstimator
 from model.stress import estimate_stress
-from config import CAMERA_FPS, SCAN_DURATION_SECONDS
+from config import (
+    CAMERA_FPS,
+    SCAN_DURATION_SECONDS,
+    INGEST_IDLE_SECONDS,
+    PIPELINE_DECODE_WORKERS,
+    PIPELINE_DETECT_EXECUTOR,
+    PIPELINE_QUEUE_SIZE,
+    SCAN_ABORT_ENABLED,
+    SCHEDULER_ENABLED,
+    TRACE_ARCHIVE_ENABLED,
+)
 from utils.logger import get_logger
 from api.schemas import UserMetadata
 
@@ -58,6 +110,89 @@ def _compute_bmi(height_cm: float, weight_kg: float) -> float:
     return weight_kg / (height_m ** 2)
 
 
+def compute_vitals(
+    pipeline: RPPGPipeline,
+    meta: UserMetadata,
+    bp_estimator: BPEstimator,
+    duration_seconds: float,
+    extra: dict | None = None,
+) -> dict:
+    """
+    pulse → HR → HRV → BP → stress for a filled pipeline, assembled into
+    the `/scan/result` payload.
+
+    Raises
+    ------
+    ValueError  If the trace is too short or flat to extract a pulse.
+    """
+    pulse = pipeline.extract_pulse()   # May raise ValueError
+    fps = pipeline.fps
+
+    # ── HR estimation ───────────────────────────────────────────────────
+    hr_result = estimate_hr(pulse, fps)
+
+    # ── HRV estimation ──────────────────────────────────────────────────
+    hrv_result = compute_hrv(hr_result["rr_intervals"])
+
+    # ── BP estimation ───────────────────────────────────────────────────
+    bmi = _compute_bmi(meta.height_cm, meta.weight_kg)
+    gender_male = 1 if meta.gender == "male" else 0
+
+    bp_result = bp_estimator.predict(
+        hr=hr_result["hr_bpm"],
+        rmssd=hrv_result["rmssd_ms"] or 30.0,   # fallback if None
+        sdnn=hrv_result["sdnn_ms"] or 20.0,
+        pnn50=hrv_result["pnn50"] or 10.0,
+        age=meta.age,
+        gender_male=gender_male,
+        bmi=bmi,
+    )
+
+    # ── Stress estimation ───────────────────────────────────────────────
+    stress_result = estimate_stress(
+        hr_bpm=hr_result["hr_bpm"],
+        rmssd_ms=hrv_result["rmssd_ms"],
+        sdnn_ms=hrv_result["sdnn_ms"],
+    )
+
+    # ── Assemble final response ─────────────────────────────────────────
+    return {
+        "disclaimer": DISCLAIMER,
+        "hr": {
+            "hr_bpm": hr_result["hr_bpm"],
+            "hr_fft": hr_result["hr_fft"],
+            "hr_peaks": hr_result["hr_peaks"],
+            "confidence_fft": hr_result["confidence_fft"],
+            "confidence_peaks": hr_result["confidence_peaks"],
+        },
+        "hrv": hrv_result,
+        "blood_pressure": bp_result,
+        "stress": stress_result,
+        "scan_duration_seconds": duration_seconds,
+        "algorithm_used": pipeline.algorithm,
+        "warmup_seconds": None if pipeline.warmup_seconds is None else round(pipeline.warmup_seconds, 2),
+        "roi_quality": pipeline.roi_quality(),
+        **(extra or {}),
+    }
+
+
+def archive_trace(pipeline: RPPGPipeline, archive: TraceArchive | None = None) -> int | None:
+    """
+    Append the pipeline's raw trace to `archive` (default: the shared one
+    if TRACE_ARCHIVE_ENABLED).  Returns the trace id, or None if archiving
+    is off or failed — a full disk must not cost the user their result.
+    """
+    if archive is None:
+        if not TRACE_ARCHIVE_ENABLED:
+            return None
+        archive = shared_archive()
+    try:
+        return archive.append(pipeline.raw_trace())
+    except OSError as e:
+        logger.warning("Trace not archived: %s", e)
+        return None
+
+
 class ScanSession:
     """
     Manages the full lifecycle of one rPPG vital-signs scan.
@@ -65,7 +200,12 @@ class ScanSession:
     Instantiate once at application startup and reuse across requests.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        jobs: JobExecutor | None = None,
+        admission: AdmissionController | None = None,
+        store: ResultStore | None = None,
+    ):
         self._lock = threading.Lock()
 
         # State
@@ -74,22 +214,38 @@ class ScanSession:
         self._error_message = ""
         self._result: dict | None = None
         self._metadata: UserMetadata | None = None
+        self._last_pipeline: RPPGPipeline | None = None   # Trace of the last finished scan
 
         # Heavy objects (created lazily)
         self._bp_estimator: BPEstimator | None = None
+
+        # Post-processing runs on a bounded executor shared by all sessions
+        self._jobs = jobs or shared_executor()
+        self._job: Job | None = None
+        self._scan_id = 0                # Bumped per scan / reset; stale workers compare it
+        self._admission = admission or shared_admission()
+        self._store = store or shared_store()
+        self._owner: tuple[str | None, str | None] = (None, None)   # (user_id, device_id) of the scan
         
         # Video streaming support
         self._current_frame: np.ndarray | None = None
-        self._current_rois: list | None = None
+        self._current_rois: FaceROIs | None = None
+        self._current_seq = 0            # Bumped on every new preview frame
         
-        # Frontend mode: collect frames from frontend
+        # Frontend mode: uploaded JPEGs queue here for the scan worker
         self._frontend_mode = False
-        self._collected_frames: list = []
+        self._ingest: FrameQueue | None = None
+        self._ingest_stats: dict | None = None   # Final counters of the last scan
+        self._stages: StagedPipeline | None = None   # Frame-processing stages of that scan
         self._scan_algorithm = "pos"
         self._scan_duration = SCAN_DURATION_SECONDS
         self._processing_started = False  # Flag to prevent duplicate processing
-        self._frame_skip_counter = 0  # Skip frames to reduce load
-        self._last_frame_time = 0  # Track frame timing
+        self._signal_seconds = 0.0       # Post-warm-up signal of the frontend scan so far
+        self._interval_ms = 0            # Upload period chosen at scan start
+        self._upload_view: tuple[float | None, int] | None = None   # (face px, frame width) in upload pixels
+        self._frame_size: tuple[int, int] | None = None   # Camera frame (w, h) behind the uploads
+        self._face_box: tuple[int, int, int, int] | None = None   # Last face box, camera-frame pixels
+        self._crop_hint: dict | None = None
 
         logger.info("ScanSession initialised.")
 
@@ -115,7 +271,29 @@ class ScanSession:
         with self._lock:
             return self._result
 
-    def start_scan(self, algorithm: str = "pos", duration_seconds: int = SCAN_DURATION_SECONDS) -> bool:
+    def get_last_pipeline(self) -> RPPGPipeline | None:
+        """The filled pipeline of the last scan that reached post-processing."""
+        with self._lock:
+            return self._last_pipeline
+
+    @property
+    def metadata(self) -> UserMetadata | None:
+        with self._lock:
+            return self._metadata
+
+    def get_bp_estimator(self) -> BPEstimator:
+        """The session's BP model, created (and trained) on first use."""
+        if self._bp_estimator is None:
+            self._bp_estimator = BPEstimator()
+        return self._bp_estimator
+
+    def start_scan(
+        self,
+        algorithm: str = "pos",
+        duration_seconds: int = SCAN_DURATION_SECONDS,
+        user_id: str | None = None,
+        device_id: str | None = None,
+    ) -> bool:
         """
         Launch the scan in a background thread.
 
@@ -134,14 +312,17 @@ class ScanSession:
             self._progress = 0.0
             self._result = None
             self._error_message = ""
+            self._scan_id += 1
+            self._job = None
+            self._owner = (user_id, device_id)
+            scan_id = self._scan_id
 
         # Lazily initialise the BP model (first call trains it)
-        if self._bp_estimator is None:
-            self._bp_estimator = BPEstimator()
+        self.get_bp_estimator()
 
         thread = threading.Thread(
             target=self._run_scan,
-            args=(algorithm, duration_seconds),
+            args=(algorithm, duration_seconds, scan_id),
             daemon=True,
         )
         thread.start()
@@ -154,17 +335,35 @@ class ScanSession:
             self._status = "idle"
             self._progress = 0.0
             self._result = None
+            self._last_pipeline = None
             self._error_message = ""
             self._current_frame = None
             self._current_rois = None
             self._frontend_mode = False
-            self._collected_frames = []
+            ingest, self._ingest = self._ingest, None
+            self._ingest_stats = None
+            self._stages = None
             self._processing_started = False
-            self._frame_skip_counter = 0
-            self._last_frame_time = 0
+            self._signal_seconds = 0.0
+            self._upload_view = None
+            self._frame_size = None
+            self._face_box = None
+            self._crop_hint = None
+            self._scan_id += 1
+            job, self._job = self._job, None
+        if ingest is not None:
+            ingest.cancel()     # Unblocks the worker, which then exits quietly
+        if job is not None:
+            job.cancel()
         logger.info("Session reset.")
     
-    def start_scan_frontend_mode(self, algorithm: str = "pos", duration_seconds: int = SCAN_DURATION_SECONDS) -> bool:
+    def start_scan_frontend_mode(
+        self,
+        algorithm: str = "pos",
+        duration_seconds: int = SCAN_DURATION_SECONDS,
+        user_id: str | None = None,
+        device_id: str | None = None,
+    ) -> bool:
         """
         Start scan in frontend mode - receives frames from frontend instead of accessing camera.
         
@@ -184,184 +383,340 @@ class ScanSession:
             self._result = None
             self._error_message = ""
             self._frontend_mode = True
-            self._collected_frames = []
+            self._scan_id += 1
+            self._job = None
+            self._owner = (user_id, device_id)
+            scan_id = self._scan_id
+            self._ingest = ingest = FrameQueue()
+            self._ingest_stats = None
+            self._stages = None
             self._scan_algorithm = algorithm
             self._scan_duration = duration_seconds
             self._processing_started = False
+            self._signal_seconds = 0.0
+            self._upload_view = None
+            self._frame_size = None
+            self._face_box = None
+            self._crop_hint = None
         
         # Lazily initialise the BP model
-        if self._bp_estimator is None:
-            self._bp_estimator = BPEstimator()
+        self.get_bp_estimator()
         
+        # Count this scan's live frame-processing load until intake ends
+        self._admission.admit((id(self), scan_id), duration_seconds, self._load_probe)
+        interval_ms = frame_interval_ms(self._load_ratio())
+        with self._lock:
+            self._interval_ms = interval_ms
+
+        # Frames are analysed as they arrive, not all at once at the end
+        thread = threading.Thread(
+            target=self._run_frontend_scan,
+            args=(ingest, scan_id),
+            daemon=True,
+        )
+        thread.start()
         logger.info("Frontend-mode scan started (algo=%s, duration=%ds).", algorithm, duration_seconds)
         return True
     
-    def process_frontend_frame(self, frame_data: str, progress: float) -> bool:
+    def process_frontend_frame(self, frame_data: str, progress: float, crop: dict | None = None) -> dict:
         """
-        Process a frame received from the frontend.
-        
+        Queue a frame received from the frontend.
+
+        Only the base64 layer is removed here; the compressed JPEG goes
+        into the session's bounded `FrameQueue` and is decoded by the
+        scan worker.  Cheap enough to run on the event loop.
+
         Args:
             frame_data: Base64 encoded image data
             progress: Current progress percentage (0-100)
-        
+            crop: Where the image sits in the camera frame (`FrameWindow`
+                fields) if it is a crop and/or downscaled; None for a
+                full-size frame.
+
         Returns:
-            True if frame was processed successfully
+            dict with `success`, `accepted` (False if the drop policy
+            discarded the frame), `complete` (enough post-warm-up signal
+            is in — the client can stop uploading), `slow_down` (back-pressure hint),
+            `queue_depth`, `dropped_frames`, `face_box` (last face box in
+            camera-frame pixels) and `hints` for the next upload.
         """
+        with self._lock:
+            ingest = self._ingest
+            complete = self._signal_seconds >= signal_target(self._scan_duration)
+            self._progress = 100.0 if complete else progress
+        if ingest is None:
+            return {"success": False, "error": "No active scan"}
+
         try:
-            import base64
-            import io
-            from PIL import Image
-            
-            # Update progress
-            with self._lock:
-                self._progress = progress
-            
-            # Decode base64 image
-            if 'base64,' in frame_data:
-                frame_data = frame_data.split('base64,')[1]
-            
-            image_bytes = base64.b64decode(frame_data)
-            image = Image.open(io.BytesIO(image_bytes))
-            frame = np.array(image)
-            
-            # Convert RGB to BGR for OpenCV
-            if len(frame.shape) == 3 and frame.shape[2] == 3:
-                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-            
-            # Store frame
-            with self._lock:
-                self._collected_frames.append(frame)
-                
-                # When scan reaches 100%, process all collected frames (only once)
-                if progress >= 99.9 and not self._processing_started:
-                    self._processing_started = True
-                    logger.info(f"Triggering processing of {len(self._collected_frames)} frames")
-                    # Start processing in background thread
-                    thread = threading.Thread(
-                        target=self._run_frontend_scan,
-                        daemon=True,
-                    )
-                    thread.start()
-            
-            return True
-            
-        except Exception as e:
+            jpeg = b64_to_bytes(frame_data)
+            window = FrameWindow.from_dict(crop) if crop else None
+        except ValueError as e:
             logger.error(f"Error processing frontend frame: {e}")
-            return False
-    
+            return {"success": False, "error": str(e)[:100]}
 
-    
-    def _run_frontend_scan(self) -> None:
-        """Process frames collected from frontend."""
-        from face.detector import FaceDetector
-        
+        accepted = ingest.put((jpeg, window))
+
+        # When scan reaches 100% (or has its signal), let the worker drain the queue and finish
+        if progress >= 99.9 or complete:
+            with self._lock:
+                trigger = not self._processing_started
+                self._processing_started = True
+            if trigger:
+                logger.info("Final frame received (queue depth %d).", ingest.depth)
+                ingest.close()
+
+        stats = ingest.stats()
+        slow_down = ingest.should_slow_down()
+        with self._lock:
+            face_box = self._face_box
+        return {
+            "success": True,
+            "accepted": accepted,
+            "complete": complete,
+            "slow_down": slow_down,
+            "queue_depth": stats["depth"],
+            "dropped_frames": stats["dropped_total"],
+            "face_box": list(face_box) if face_box is not None else None,
+            "hints": self.get_client_hints(slow_down),
+        }
+
+    def check_admission(self, duration_seconds: float) -> AdmissionDecision:
+        """Ask the admission controller whether a new scan may start now."""
+        return self._admission.decide(duration_seconds)
+
+    def get_client_hints(self, slow_down: bool = False) -> dict | None:
+        """Capture hints for the frontend's next upload, None outside a frontend scan."""
+        with self._lock:
+            if not self._frontend_mode:
+                return None
+            interval_ms, view = self._interval_ms, self._upload_view
+            crop = self._crop_hint = crop_window(self._face_box, self._frame_size, self._crop_hint)
+        face_px, width = view if view is not None else (None, None)
+        return client_hints(self._load_ratio(), interval_ms, face_px, width, slow_down, crop)
+
+    def get_job_status(self) -> dict | None:
+        """Post-processing job state, queue position and ETA, if any."""
+        with self._lock:
+            job = self._job
+        return job.describe() if job is not None else None
+
+    def get_stage_stats(self) -> dict | None:
+        """Per-stage utilisation of the current (or last) frontend scan."""
+        with self._lock:
+            stages = self._stages
+        return stages.stats() if stages is not None else None
+
+    def get_ingest_stats(self) -> dict | None:
+        """Ingestion counters of the current (or last) frontend scan."""
+        with self._lock:
+            ingest, final = self._ingest, self._ingest_stats
+        return final if final is not None else (ingest.stats() if ingest is not None else None)
+
+    def _run_frontend_scan(self, ingest: FrameQueue, scan_id: int) -> None:
+        """
+        Decode and analyse queued frontend frames until the queue closes.
+
+        Frames flow through a `StagedPipeline` — decode (threads) →
+        detect + ROI sampling (worker processes) → trace accumulation
+        (inline) — so the stages overlap instead of running back to back.
+        """
+        stages = None
+        stream = new_stream_id()
         try:
-            face_detector = FaceDetector()
+            decoder = FrameDecoder(colour_order=preferred_input_order())
             pipeline = RPPGPipeline(fps=CAMERA_FPS, algorithm=self._scan_algorithm)
-            
-            frames_copy = []
-            with self._lock:
-                frames_copy = self._collected_frames.copy()
-            
-            logger.info(f"Processing {len(frames_copy)} frames from frontend...")
-            
-            # Process each frame
-            for frame in frames_copy:
+            monitor = ScanMonitor(self._scan_duration, self._scan_algorithm) if SCAN_ABORT_ENABLED else None
+            scheduler = LoadScheduler(workers=1) if SCHEDULER_ENABLED else None    # One detect lane
+            aborted: list[ScanAborted] = []
+            timestamps: list[float] = []
+
+            def decode(entry):
+                timestamp, (jpeg, window) = entry
+                frame, scale = decoder.decode(jpeg)
                 if frame is None:
-                    continue
-                
-                # Detect face and extract ROIs
-                rois = face_detector.detect(frame)
-                
-                # Feed into rPPG pipeline
-                pipeline.add_frame(rois)
-            
-            # Extract pulse signal
-            pulse = pipeline.extract_pulse()
-            
-            # Calculate effective FPS
-            effective_fps = CAMERA_FPS
-            
-            # Heart rate estimation
-            hr_result = estimate_hr(pulse, effective_fps)
-            
-            # HRV estimation
-            hrv_result = compute_hrv(hr_result["rr_intervals"])
-            
-            # BP estimation
-            meta = self._metadata
-            bmi = _compute_bmi(meta.height_cm, meta.weight_kg)
-            gender_male = 1 if meta.gender == "male" else 0
-            
-            bp_result = self._bp_estimator.predict(
-                hr=hr_result["hr_bpm"],
-                rmssd=hrv_result["rmssd_ms"] or 30.0,
-                sdnn=hrv_result["sdnn_ms"] or 20.0,
-                pnn50=hrv_result["pnn50"] or 10.0,
-                age=meta.age,
-                gender_male=gender_male,
-                bmi=bmi,
+                    return None
+                if window is None:      # Full-size upload
+                    h, w = frame.shape[:2]
+                    window = FrameWindow(0, 0, 1.0, round(w / scale), round(h / scale))
+                # The view key restarts landmark tracking when the geometry changes;
+                # pruned ROIs are not sampled; the scheduler sets the detection quality
+                view = (window.x, window.y, window.scale, scale)
+                settings = scheduler.settings if scheduler is not None else None
+                return (timestamp, window, scale), frame, view, pipeline.active_rois, settings
+
+            def accumulate(detected):
+                (timestamp, window, scale), rois, face_size = detected
+                # Sizes in upload pixels: the decode scale may have moved on
+                face_px = None if face_size is None else face_size / scale
+                decoder.update_face_size(None if face_px is None else face_px * decoder.scale)
+                rois = rois.mapped(scale * window.scale, (window.x, window.y))
+                with self._lock:
+                    self._upload_view = (face_px, round(window.frame_width * window.scale))
+                    self._frame_size = (window.frame_width, window.frame_height)
+                    self._face_box = rois.face_bbox
+                pipeline.add_frame(rois, timestamp)
+                with self._lock:
+                    self._signal_seconds = pipeline.signal_seconds
+                timestamps.append(timestamp)
+                if monitor is not None:
+                    try:
+                        monitor.update(pipeline, rois)
+                    except ScanAborted as e:
+                        aborted.append(e)
+                        ingest.cancel()         # Wake the feeder; stop accepting uploads
+                        raise
+
+            stages = StagedPipeline(
+                [
+                    StageSpec("decode", decode, workers=PIPELINE_DECODE_WORKERS, kind="thread"),
+                    StageSpec(
+                        "detect",
+                        partial(detect_in_worker, colour_order=decoder.colour_order, stream=stream),
+                        kind=PIPELINE_DETECT_EXECUTOR,
+                        executor=detect_lane(stream),
+                    ),
+                ],
+                sink=accumulate,
+                queue_size=PIPELINE_QUEUE_SIZE,
             )
-            
-            # Stress estimation
-            stress_result = estimate_stress(
-                hr_bpm=hr_result["hr_bpm"],
-                rmssd_ms=hrv_result["rmssd_ms"],
-                sdnn_ms=hrv_result["sdnn_ms"],
+            with self._lock:
+                self._stages = stages
+
+            # Feed frames as they arrive; blocks when a stage is saturated.
+            # A client that stops uploading (closed tab, lost network) would
+            # otherwise hold the stages and its admission slot until /scan/reset.
+            with self._lock:
+                idle_seconds = self._interval_ms / 1000.0 + INGEST_IDLE_SECONDS
+            while (entry := ingest.get(timeout=idle_seconds)) is not None:
+                if scheduler is not None:
+                    detect = stages.stats()["detect"]
+                    scheduler.observe(detect["busy_seconds"], detect["items"], ingest.fill)
+                    if not scheduler.admit(entry[0]):
+                        continue
+                stages.submit(entry)
+
+            if aborted:
+                raise aborted[0]
+            if not ingest.closed:       # get() timed out
+                logger.warning("No frames for %.0f s — abandoning frontend scan.", idle_seconds)
+                self._set_error(f"No frames received for {idle_seconds:.0f} s; the scan was abandoned.", scan_id)
+                return                  # The stages are cancelled below
+            if ingest.cancelled:
+                stages.cancel()
+                stages.close()
+                logger.info("Frontend scan cancelled.")
+                return
+            stages.close()
+
+            stats = ingest.stats()
+            stage_stats = stages.stats()
+            logger.info(
+                "Processed %d frames from frontend (%d dropped by %s policy). Stage utilisation: %s",
+                len(timestamps), stats["dropped_total"], stats["policy"],
+                {name: s["utilisation"] for name, s in stage_stats.items()},
             )
             
-            # Assemble final result
-            result = {
-                "disclaimer": DISCLAIMER,
-                "hr": {
-                    "hr_bpm": hr_result["hr_bpm"],
-                    "hr_fft": hr_result["hr_fft"],
-                    "hr_peaks": hr_result["hr_peaks"],
-                    "confidence_fft": hr_result["confidence_fft"],
-                    "confidence_peaks": hr_result["confidence_peaks"],
-                },
-                "hrv": hrv_result,
-                "blood_pressure": bp_result,
-                "stress": stress_result,
-                "scan_duration_seconds": self._scan_duration,
-                "algorithm_used": self._scan_algorithm,
-            }
-            
+            # The upload rate is set by the client and thinned by drops —
+            # use the measured rate, not the webcam setting.
+            effective_fps = CAMERA_FPS
+            if len(timestamps) >= 2 and timestamps[-1] > timestamps[0]:
+                effective_fps = (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+            pipeline.fps = effective_fps
+
             with self._lock:
-                self._status = "complete"
-                self._progress = 100.0
-                self._result = result
-            
-            logger.info("Frontend scan complete. HR=%.1f BPM, BP=%s/%s mmHg",
-                        hr_result["hr_bpm"],
-                        bp_result["systolic"],
-                        bp_result["diastolic"])
-            
+                if self._ingest is not ingest:
+                    return      # Session was reset while we were finishing
+                self._ingest_stats = stats
+            self._submit_post_processing(
+                scan_id,
+                pipeline,
+                duration_seconds=self._scan_duration,
+                extra={
+                    "effective_fps": round(effective_fps, 2),
+                    "ingest": stats,
+                    "stages": stage_stats,
+                    "quality": monitor.summary() if monitor is not None else None,
+                    "scheduler": scheduler.summary() if scheduler is not None else None,
+                },
+            )
+
+        except ScanAborted as e:
+            self._set_error(f"Scan stopped early: {e}", scan_id)
         except ValueError as e:
-            self._set_error(f"Signal processing error: {e}")
+            self._set_error(f"Signal processing error: {e}", scan_id)
         except Exception as e:
-            self._set_error(f"Unexpected error during frontend scan: {e}")
+            self._set_error(f"Unexpected error during frontend scan: {e}", scan_id)
             logger.exception("Frontend scan failed with exception:")
         finally:
-            face_detector.close()
-    
+            # Release any frames still queued (no-op after a clean drain)
+            ingest.cancel()
+            if stages is not None:
+                stages.cancel()
+                try:
+                    stages.close()
+                except Exception:
+                    pass        # Already reported above
+                release_stream(stream)
+            self._admission.release((id(self), scan_id))
+
+    def _load_probe(self) -> tuple[float, float] | None:
+        """
+        Live (frames/s, CPU ms/frame) of the current frontend scan for the
+        admission controller — summed over all processing stages.
+        """
+        stats = self.get_stage_stats()
+        if not stats:
+            return None
+        stage_stats = [s for name, s in stats.items() if name != "sink"]
+        if any(s["mean_ms"] is None for s in stage_stats):
+            return None
+        frame_ms = sum(s["mean_ms"] for s in stage_stats) + (stats["sink"]["mean_ms"] or 0.0)
+        return stage_stats[0]["items_per_second"], frame_ms
+
+    def _load_ratio(self) -> float:
+        """Admission load as a fraction of scan capacity."""
+        snapshot = self._admission.snapshot()
+        return snapshot["load_cores"] / snapshot["capacity_cores"] if snapshot["capacity_cores"] > 0 else 1.0
+
     def get_current_frame(self) -> np.ndarray | None:
         """Get the current camera frame during scanning."""
         with self._lock:
             return self._current_frame.copy() if self._current_frame is not None else None
     
-    def get_current_rois(self) -> list | None:
+    def get_current_rois(self) -> FaceROIs | None:
         """Get the current face ROIs during scanning."""
         with self._lock:
             return self._current_rois
 
+    def get_preview_frame(self, after_seq: int) -> tuple[int, np.ndarray, FaceROIs | None] | None:
+        """
+        Return `(seq, frame_copy, rois)` if a frame newer than `after_seq`
+        is available, else None.  Lets preview consumers skip all work
+        (including the copy) when nothing has changed.
+        """
+        with self._lock:
+            if self._current_frame is None or self._current_seq <= after_seq:
+                return None
+            return self._current_seq, self._current_frame.copy(), self._current_rois
+
+    def get_overlay(self, after_seq: int) -> tuple[int, tuple[int, int], FaceROIs | None] | None:
+        """
+        Return `(seq, (height, width), rois)` for a frame newer than
+        `after_seq`, else None.  Never copies pixels — overlay consumers
+        only need the geometry.
+        """
+        with self._lock:
+            if self._current_frame is None or self._current_seq <= after_seq:
+                return None
+            return self._current_seq, self._current_frame.shape[:2], self._current_rois
+
     # ── Private: scan loop ─────────────────────────────────────────────────
 
-    def _run_scan(self, algorithm: str, duration_seconds: int) -> None:
+    def _run_scan(self, algorithm: str, duration_seconds: int, scan_id: int) -> None:
         """
-        The entire scan pipeline runs here in a background thread:
-            open camera → detect faces → collect RGB → extract pulse
-            → compute HR → compute HRV → estimate BP → estimate stress.
+        The capture half of a camera scan runs here in a background thread:
+            open camera → detect faces → collect RGB
+        then queues pulse extraction → HR → HRV → BP → stress as a job.
         """
         # Lazy import — keeps the server bootable even without mediapipe.
         # The ImportError (with install instructions) surfaces here if missing.
@@ -370,6 +725,10 @@ class ScanSession:
         camera = CameraCapture()
         face_detector = FaceDetector()
         pipeline = RPPGPipeline(fps=CAMERA_FPS, algorithm=algorithm)
+        monitor = ScanMonitor(duration_seconds, algorithm) if SCAN_ABORT_ENABLED else None
+        scheduler = LoadScheduler() if SCHEDULER_ENABLED else None
+        detect_seconds = 0.0
+        detected = 0
 
         try:
             # ── Open camera ─────────────────────────────────────────────
@@ -378,116 +737,162 @@ class ScanSession:
                 return
 
             # Wait for the first frame
-            first = camera.wait_for_frame(timeout=3.0)
+            first = camera.next_frame(timeout=3.0)
             if first is None:
                 self._set_error("No frame received from camera.")
                 return
 
-            start_time = time.time()
             elapsed = 0.0
+            target = signal_target(duration_seconds)
+            seq = first.seq - 1         # Process the first frame too
+            missed = 0
+            timestamps: list[float] = []
 
-            logger.info("Capturing for %d seconds…", duration_seconds)
+            logger.info("Capturing for up to %d seconds (%.0f s of signal)…", duration_seconds, target)
 
             # ── Main capture loop ───────────────────────────────────────
-            while elapsed < duration_seconds:
-                frame = camera.get_latest_frame()
-                if frame is None:
-                    time.sleep(0.02)
-                    continue
+            while elapsed < duration_seconds and pipeline.signal_seconds < target:
+                # Blocks until a frame this loop has not seen yet arrives
+                captured = camera.next_frame(seq, timeout=3.0)
+                if captured is None:
+                    self._set_error("Camera stopped delivering frames.", scan_id)
+                    return
+                missed += captured.seq - seq - 1
+                seq = captured.seq
+                frame = captured.image
+                elapsed = captured.timestamp - first.timestamp
+
+                # Load shedding: detection quality and frame decimation
+                if scheduler is not None:
+                    scheduler.observe(detect_seconds, detected)
+                    if not scheduler.admit(captured.timestamp):
+                        continue
+                    face_detector.detect_stride, face_detector.downscale = scheduler.settings
 
                 # Face detection + ROI extraction
-                rois = face_detector.detect(frame)
+                t0 = time.perf_counter()
+                rois = face_detector.detect(frame, rois=pipeline.active_rois)
+                detect_seconds += time.perf_counter() - t0
+                detected += 1
 
                 # Store current frame and ROIs for video streaming
                 with self._lock:
                     self._current_frame = frame
                     self._current_rois = rois
+                    self._current_seq += 1
 
-                # Feed ROIs into the rPPG pipeline (skips if no face)
-                pipeline.add_frame(rois)
+                # Feed ROIs into the rPPG pipeline (skips if no face),
+                # timed by capture rather than processing time
+                pipeline.add_frame(rois, captured.timestamp)
+                timestamps.append(captured.timestamp)
+                if monitor is not None:
+                    monitor.update(pipeline, rois)      # Raises ScanAborted
 
                 # Update progress
-                elapsed = time.time() - start_time
-                pct = min((elapsed / duration_seconds) * 100.0, 100.0)
+                pct = min(max(elapsed / duration_seconds, pipeline.signal_seconds / target) * 100.0, 100.0)
                 with self._lock:
                     self._progress = round(pct, 1)
 
-                time.sleep(0.01)   # Avoid busy-spinning; ~100 iterations/s max
-
-            # ── Signal processing ───────────────────────────────────────
-            logger.info("Capture complete. Running signal processing…")
-
-            pulse = pipeline.extract_pulse()   # May raise ValueError
-
-            # Determine effective FPS from the pipeline buffer
-            effective_fps = CAMERA_FPS   # Use configured value
-
-            # ── HR estimation ───────────────────────────────────────────
-            hr_result = estimate_hr(pulse, effective_fps)
-
-            # ── HRV estimation ──────────────────────────────────────────
-            hrv_result = compute_hrv(hr_result["rr_intervals"])
-
-            # ── BP estimation ───────────────────────────────────────────
-            meta = self._metadata  # guaranteed non-None by start_scan guard
-            bmi = _compute_bmi(meta.height_cm, meta.weight_kg)
-            gender_male = 1 if meta.gender == "male" else 0
-
-            bp_result = self._bp_estimator.predict(  # type: ignore[union-attr]
-                hr=hr_result["hr_bpm"],
-                rmssd=hrv_result["rmssd_ms"] or 30.0,   # fallback if None
-                sdnn=hrv_result["sdnn_ms"] or 20.0,
-                pnn50=hrv_result["pnn50"] or 10.0,
-                age=meta.age,
-                gender_male=gender_male,
-                bmi=bmi,
+            # Decimation and frames missed while busy thin the nominal rate
+            effective_fps = CAMERA_FPS
+            if len(timestamps) >= 2 and timestamps[-1] > timestamps[0]:
+                effective_fps = (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+            pipeline.fps = effective_fps
+
+            logger.info("Capture complete: %d frames at %.2f FPS (%d missed). Queuing signal processing…",
+                        len(timestamps), effective_fps, missed)
+            self._submit_post_processing(
+                scan_id, pipeline, duration_seconds=round(elapsed, 1),
+                extra={
+                    "effective_fps": round(effective_fps, 2),
+                    "frames": len(timestamps),
+                    "frames_missed": missed,
+                    "quality": monitor.summary() if monitor is not None else None,
+                    "scheduler": scheduler.summary() if scheduler is not None else None,
+                },
             )
 
-            # ── Stress estimation ───────────────────────────────────────
-            stress_result = estimate_stress(
-                hr_bpm=hr_result["hr_bpm"],
-                rmssd_ms=hrv_result["rmssd_ms"],
-                sdnn_ms=hrv_result["sdnn_ms"],
-            )
+        except ScanAborted as e:
+            self._set_error(f"Scan stopped early: {e}", scan_id)
+        except Exception as e:
+            self._set_error(f"Unexpected error during scan: {e}", scan_id)
+            logger.exception("Scan failed with exception:")
+        finally:
+            camera.release()
+            face_detector.close()
 
-            # ── Assemble final response ─────────────────────────────────
-            result = {
-                "disclaimer": DISCLAIMER,
-                "hr": {
-                    "hr_bpm": hr_result["hr_bpm"],
-                    "hr_fft": hr_result["hr_fft"],
-                    "hr_peaks": hr_result["hr_peaks"],
-                    "confidence_fft": hr_result["confidence_fft"],
-                    "confidence_peaks": hr_result["confidence_peaks"],
-                },
-                "hrv": hrv_result,
-                "blood_pressure": bp_result,
-                "stress": stress_result,
-                "scan_duration_seconds": round(elapsed, 1),
-                "algorithm_used": algorithm,
-            }
+    # ── Private: post-processing ───────────────────────────────────────────
+
+    def _submit_post_processing(
+        self,
+        scan_id: int,
+        pipeline: RPPGPipeline,
+        duration_seconds: float,
+        extra: dict | None = None,
+    ) -> None:
+        """Queue HR / HRV / BP / stress estimation on the shared job executor."""
+        job = self._jobs.submit(
+            self._post_process, scan_id, pipeline, duration_seconds, extra or {},
+            name=f"scan-{scan_id}",
+        )
+        with self._lock:
+            if self._scan_id == scan_id:
+                self._job = job
+                return
+        job.cancel()    # Reset raced with submission
+
+    def _post_process(
+        self,
+        scan_id: int,
+        pipeline: RPPGPipeline,
+        duration_seconds: float,
+        extra: dict,
+    ) -> None:
+        """
+        pulse → HR → HRV → BP → stress → result.  Runs on a job-executor
+        worker; the result is dropped if the session was reset meanwhile.
+        """
+        try:
+            meta = self._metadata  # guaranteed non-None by start_scan guard
+            # Archived before analysis, so failed scans can be replayed too
+            extra = {**extra, "trace_id": archive_trace(pipeline)}
+            with self._lock:
+                if self._scan_id == scan_id:
+                    self._last_pipeline = pipeline
+            result = compute_vitals(pipeline, meta, self._bp_estimator, duration_seconds, extra)
 
             with self._lock:
+                if self._scan_id != scan_id:
+                    return      # Session was reset while we were processing
                 self._status = "complete"
                 self._progress = 100.0
                 self._result = result
+                user_id, device_id = self._owner
+                source = "frontend" if self._frontend_mode else "camera"
+
+            self._store.save(ScanRecord(
+                result=result,
+                metadata=meta.model_dump(),
+                source=source,
+                user_id=user_id,
+                device_id=device_id,
+            ))
 
             logger.info("Scan complete. HR=%.1f BPM, BP=%s/%s mmHg",
-                        hr_result["hr_bpm"],
-                        bp_result["systolic"],
-                        bp_result["diastolic"])
+                        result["hr"]["hr_bpm"],
+                        result["blood_pressure"]["systolic"],
+                        result["blood_pressure"]["diastolic"])
 
         except ValueError as e:
-            self._set_error(f"Signal processing error: {e}")
+            self._set_error(f"Signal processing error: {e}", scan_id)
         except Exception as e:
-            self._set_error(f"Unexpected error during scan: {e}")
-            logger.exception("Scan failed with exception:")
-        finally:
-            camera.release()
-            face_detector.close()
+            self._set_error(f"Unexpected error during post-processing: {e}", scan_id)
+            logger.exception("Post-processing failed with exception:")
 
-    def _set_error(self, message: str) -> None:
+    def _set_error(self, message: str, scan_id: int | None = None) -> None:
         with self._lock:
+            if scan_id is not None and scan_id != self._scan_id:
+                return      # Stale worker of a scan that was reset
             self._status = "error"
             self._error_message = message
         logger.error("Scan error: %s", message)
\ No newline at end of file
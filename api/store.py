@@ -0,0 +1,416 @@
+"""
+api/store.py — Persistent scan-result store
+=============================================
+A session keeps only its latest result, and loses it on `reset()` or a
+restart.  Every completed vitals payload is therefore also handed to a
+`ResultStore`, together with the demographics it was computed with, who
+it belongs to (`user_id` / `device_id`, both optional) and when.
+
+Writes never block the caller: `save()` enqueues the record and a single
+writer thread commits queued records in batches.  If the queue is full
+(the backend is stalled) the record is dropped with a warning rather
+than holding up a scan.
+
+Queries
+-------
+    history()    Newest-first pages of records for a user / device /
+                 time range.  Pagination is keyset-based — the cursor is
+                 the (created_at, id) of the last row returned — so a
+                 page costs the same however deep into the history it is.
+    aggregate()  Count / mean / min / max of HR, BP and RMSSD over a time
+                 range, optionally bucketed by hour / day / week.
+
+Backends
+--------
+    "sqlite"   (default) one file, WAL mode.  The indexes lead with
+               (user_id | device_id | created_at) and carry the
+               aggregated columns, so both queries are index range scans
+               that never touch the table rows of other users.
+    "none"     Discards writes — for deployments that must not persist
+               results.
+
+Register another backend by adding it to `STORES`.
+"""
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from utils.logger import get_logger
+from config import (
+    RESULT_STORE_BACKEND,
+    RESULT_STORE_PATH,
+    RESULT_STORE_QUEUE,
+    RESULT_STORE_BATCH,
+)
+
+logger = get_logger("api.store")
+
+# Bucket name → width in seconds for `aggregate()`
+BUCKETS = {"hour": 3600, "day": 86_400, "week": 7 * 86_400}
+
+
+@dataclass
+class ScanRecord:
+    """One completed scan, as persisted."""
+    result: dict                      # The `/scan/result` payload
+    metadata: dict                    # UserMetadata fields used for BP
+    source: str                       # "camera" | "frontend" | "clip"
+    user_id: str | None = None
+    device_id: str | None = None
+    created_at: float = field(default_factory=time.time)   # Unix seconds
+
+    def summary(self) -> dict:
+        """The indexed columns derived from the payload."""
+        result = self.result
+        hrv = result.get("hrv") or {}
+        return {
+            "duration_seconds": result.get("scan_duration_seconds"),
+            "algorithm": result.get("algorithm_used"),
+            "hr_bpm": (result.get("hr") or {}).get("hr_bpm"),
+            "systolic": (result.get("blood_pressure") or {}).get("systolic"),
+            "diastolic": (result.get("blood_pressure") or {}).get("diastolic"),
+            "rmssd_ms": hrv.get("rmssd_ms"),
+            "sdnn_ms": hrv.get("sdnn_ms"),
+            "stress_level": (result.get("stress") or {}).get("level"),
+        }
+
+
+def encode_cursor(created_at: float, record_id: int) -> str:
+    return f"{created_at!r}:{record_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    """Raises ValueError for a malformed cursor."""
+    created_at, _, record_id = cursor.partition(":")
+    return float(created_at), int(record_id)
+
+
+class ResultStore:
+    """
+    Base class for result backends: owns the asynchronous write queue
+    and leaves the storage to `_write_batch`, `history` and `aggregate`.
+    """
+
+    name = ""
+
+    def __init__(self, queue_size: int = RESULT_STORE_QUEUE, batch_size: int = RESULT_STORE_BATCH):
+        self._queue: queue.Queue[ScanRecord | None] = queue.Queue(maxsize=queue_size)
+        self._batch_size = batch_size
+        self._writer: threading.Thread | None = None
+        self._writer_lock = threading.Lock()
+        self._dropped = 0
+
+    # ── Writes ───────────────────────────────────────────────────────────────
+
+    def save(self, record: ScanRecord) -> bool:
+        """Queue a record for writing; False if it had to be dropped."""
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self._dropped += 1
+            logger.warning("Result store queue full — record dropped (%d so far).", self._dropped)
+            return False
+
+    def flush(self) -> None:
+        """Block until every queued record has been written."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Write what is queued, then stop the writer."""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    # ── Queries (backend-specific) ───────────────────────────────────────────
+
+    def history(
+        self,
+        user_id: str | None = None,
+        device_id: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        limit: int = 50,
+        cursor: str | None = None,
+        include_result: bool = False,
+    ) -> tuple[list[dict], str | None]:
+        """
+        One newest-first page of records; returns `(items, next_cursor)`,
+        where `next_cursor` is None on the last page.
+        """
+        raise NotImplementedError
+
+    def aggregate(
+        self,
+        user_id: str | None = None,
+        device_id: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        bucket: str | None = None,
+    ) -> list[dict]:
+        """Summary statistics over the range, one entry per bucket (oldest first)."""
+        raise NotImplementedError
+
+    def _write_batch(self, records: list[ScanRecord]) -> None:
+        raise NotImplementedError
+
+    # ── Private ──────────────────────────────────────────────────────────────
+
+    def _ensure_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name=f"result-store-{self.name}", daemon=True,
+                )
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            batch = [] if first is None else [first]
+            stop = first is None
+            while not stop and len(batch) < self._batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                else:
+                    batch.append(record)
+            try:
+                if batch:
+                    self._write_batch(batch)
+            except Exception:
+                logger.exception("Writing %d scan results failed.", len(batch))
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+
+
+# ── SQLite ───────────────────────────────────────────────────────────────────
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scan_results (
+    id               INTEGER PRIMARY KEY,
+    user_id          TEXT,
+    device_id        TEXT,
+    created_at       REAL NOT NULL,
+    source           TEXT,
+    duration_seconds REAL,
+    algorithm        TEXT,
+    hr_bpm           REAL,
+    systolic         REAL,
+    diastolic        REAL,
+    rmssd_ms         REAL,
+    sdnn_ms          REAL,
+    stress_level     TEXT,
+    metadata         TEXT,
+    result           TEXT
+);
+CREATE INDEX IF NOT EXISTS scan_results_user
+    ON scan_results (user_id, created_at, id, hr_bpm, systolic, diastolic, rmssd_ms);
+CREATE INDEX IF NOT EXISTS scan_results_device
+    ON scan_results (device_id, created_at, id, hr_bpm, systolic, diastolic, rmssd_ms);
+CREATE INDEX IF NOT EXISTS scan_results_time
+    ON scan_results (created_at, id, hr_bpm, systolic, diastolic, rmssd_ms);
+"""
+
+_SUMMARY_COLUMNS = (
+    "id", "user_id", "device_id", "created_at", "source", "duration_seconds", "algorithm",
+    "hr_bpm", "systolic", "diastolic", "rmssd_ms", "sdnn_ms", "stress_level", "metadata",
+)
+
+_AGGREGATES = """
+    COUNT(*),
+    AVG(hr_bpm), MIN(hr_bpm), MAX(hr_bpm),
+    AVG(systolic), MIN(systolic), MAX(systolic),
+    AVG(diastolic), MIN(diastolic), MAX(diastolic),
+    AVG(rmssd_ms)
+"""
+
+
+def _round(value: float | None, digits: int = 1) -> float | None:
+    return None if value is None else round(value, digits)
+
+
+class SQLiteResultStore(ResultStore):
+    """
+    Parameters
+    ----------
+    path : str   Database file (created, with its directory, if missing).
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = RESULT_STORE_PATH, **kwargs):
+        super().__init__(**kwargs)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._path = path
+        self._local = threading.local()      # One connection per thread
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        logger.info("SQLite result store at %s.", path)
+
+    def history(self, user_id=None, device_id=None, since=None, until=None,
+                limit=50, cursor=None, include_result=False):
+        where, params = self._filters(user_id, device_id, since, until)
+        if cursor is not None:
+            where.append("(created_at, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        columns = ", ".join(_SUMMARY_COLUMNS + (("result",) if include_result else ()))
+        rows = self._connection().execute(
+            f"SELECT {columns} FROM scan_results {self._where(where)} "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+
+        items = []
+        for row in rows[:limit]:
+            item = dict(zip(_SUMMARY_COLUMNS, row))
+            item["metadata"] = json.loads(item["metadata"]) if item["metadata"] else None
+            if include_result:
+                item["result"] = json.loads(row[-1]) if row[-1] else None
+            items.append(item)
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        return items, next_cursor
+
+    def aggregate(self, user_id=None, device_id=None, since=None, until=None, bucket=None):
+        where, params = self._filters(user_id, device_id, since, until)
+        if bucket is None:
+            sql = f"SELECT NULL, {_AGGREGATES} FROM scan_results {self._where(where)}"
+        else:
+            if bucket not in BUCKETS:
+                raise ValueError(f"Unknown bucket '{bucket}'. Choose from {list(BUCKETS)}.")
+            width = BUCKETS[bucket]
+            sql = (f"SELECT CAST(created_at / {width} AS INTEGER) * {width} AS bucket, {_AGGREGATES} "
+                   f"FROM scan_results {self._where(where)} GROUP BY bucket ORDER BY bucket")
+
+        out = []
+        for row in self._connection().execute(sql, params):
+            count = row[1]
+            if not count:
+                continue
+            out.append({
+                "bucket_start": row[0],
+                "count": count,
+                "hr_bpm": {"mean": _round(row[2]), "min": _round(row[3]), "max": _round(row[4])},
+                "systolic": {"mean": _round(row[5]), "min": _round(row[6]), "max": _round(row[7])},
+                "diastolic": {"mean": _round(row[8]), "min": _round(row[9]), "max": _round(row[10])},
+                "rmssd_ms": {"mean": _round(row[11], 2)},
+            })
+        return out
+
+    def _write_batch(self, records: list[ScanRecord]) -> None:
+        rows = []
+        for record in records:
+            summary = record.summary()
+            rows.append((
+                record.user_id, record.device_id, record.created_at, record.source,
+                summary["duration_seconds"], summary["algorithm"], summary["hr_bpm"],
+                summary["systolic"], summary["diastolic"], summary["rmssd_ms"],
+                summary["sdnn_ms"], summary["stress_level"],
+                json.dumps(record.metadata), json.dumps(record.result, default=str),
+            ))
+        conn = self._connection()
+        with conn:      # One transaction per batch
+            conn.executemany(
+                "INSERT INTO scan_results (user_id, device_id, created_at, source, "
+                "duration_seconds, algorithm, hr_bpm, systolic, diastolic, rmssd_ms, "
+                "sdnn_ms, stress_level, metadata, result) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        logger.debug("Stored %d scan results.", len(rows))
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _filters(user_id, device_id, since, until) -> tuple[list[str], list]:
+        where, params = [], []
+        for column, value in (("user_id", user_id), ("device_id", device_id)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("created_at < ?")
+            params.append(until)
+        return where, params
+
+    @staticmethod
+    def _where(conditions: list[str]) -> str:
+        return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+class NullResultStore(ResultStore):
+    """Accepts and discards every record."""
+
+    name = "none"
+
+    def save(self, record: ScanRecord) -> bool:
+        return True
+
+    def history(self, *args, **kwargs):
+        return [], None
+
+    def aggregate(self, *args, **kwargs):
+        return []
+
+
+# ── Registry ─────────────────────────────────────────────────────────────────
+
+# name → (class, constructor kwargs)
+STORES = {
+    "sqlite": (SQLiteResultStore, {}),
+    "none":   (NullResultStore, {}),
+}
+
+
+def create_store(name: str) -> ResultStore:
+    """Instantiate a result store by registry name."""
+    if name not in STORES:
+        raise ValueError(f"Unknown result store '{name}'. Choose from {list(STORES)}.")
+    cls, kwargs = STORES[name]
+    return cls(**kwargs)
+
+
+# ── Shared instance ──────────────────────────────────────────────────────────
+
+_shared: ResultStore | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_store() -> ResultStore:
+    """Process-wide store used by every `ScanSession` by default."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = create_store(RESULT_STORE_BACKEND)
+            atexit.register(_shared.close)      # Write what is still queued
+        return _shared
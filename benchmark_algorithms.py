@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+benchmark_algorithms.py — rPPG algorithm cost vs. accuracy benchmark
+=====================================================================
+Runs every algorithm in `rppg/algorithms.py` over the same synthetic RGB
+traces — a pulse of known rate, per-trace skin tone, sensor noise and
+intensity / specular motion — and reports, per algorithm:
+
+    * its registered cost class
+    * ms per call on one trace and on a stacked batch of traces
+    * traces/s and samples/s at the batch size
+    * mean absolute HR error against the known pulse rate
+
+Use it to check that an algorithm's cost class still matches its
+measured cost, and which algorithms hold up under motion.
+
+Usage:
+    python benchmark_algorithms.py
+    python benchmark_algorithms.py --traces 256 --duration 30 --motion 2.0
+    python benchmark_algorithms.py --algorithms pos chrom ica --repeat 5
+"""
+
+import argparse
+import time
+import numpy as np
+
+from rppg.algorithms import ALGORITHMS
+from rppg.filters import bandpass_filter
+from features.hr import estimate_hr_batch
+from config import CAMERA_FPS
+
+
+def synthetic_traces(n: int, fps: float, seconds: float, motion: float, seed: int = 0):
+    """
+    (n, T, 3) mean-RGB traces and their true HR (BPM).  The pulse follows
+    the blood-volume-pulse colour signature (strongest in green); motion
+    is a slow intensity sway common to all channels plus a specular
+    (white) component, as a moving head under a fixed light produces.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * fps)) / fps
+    hr = rng.uniform(50.0, 110.0, n)
+    skin = rng.uniform([150, 100, 80], [220, 160, 130], (n, 3))
+    pulse = np.sin(2 * np.pi * (hr[:, None] / 60.0) * t
+                   + rng.uniform(0, 2 * np.pi, (n, 1)))                # (n, T)
+    sway_hz = rng.uniform(0.15, 0.5, (n, 1))
+    sway = motion * 0.01 * np.sin(2 * np.pi * sway_hz * t)               # Intensity
+    specular = motion * 0.6 * np.sin(2 * np.pi * 1.7 * sway_hz * t + 1.0)
+
+    signature = np.array([0.33, 0.77, 0.53])
+    rgb = (skin[:, None, :] * (1.0 + sway[..., None] + 0.003 * pulse[..., None] * signature)
+           + specular[..., None]
+           + rng.normal(0.0, 0.1, (n, len(t), 3)))
+    return rgb, hr
+
+
+def time_call(fn, repeat: int) -> float:
+    """Best wall time of `repeat` calls, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def run_algorithm(name: str, rgb: np.ndarray, hr_true: np.ndarray, fps: float, repeat: int) -> dict:
+    """Time one algorithm on one trace and on the batch; HR error on the batch."""
+    spec = ALGORITHMS[name]
+    single_ms = time_call(lambda: spec.run(rgb[0], fps), repeat)
+    batch_ms = time_call(lambda: spec.run(rgb, fps), repeat)
+
+    pulses = bandpass_filter(spec.run(rgb, fps), fps)
+    hr_est = np.array([r["hr_bpm"] for r in estimate_hr_batch(pulses, fps)])
+    return {
+        "name": name,
+        "cost": spec.cost,
+        "single_ms": single_ms,
+        "batch_ms": batch_ms,
+        "traces_per_s": len(rgb) / (batch_ms / 1000.0),
+        "samples_per_s": rgb.shape[0] * rgb.shape[1] / (batch_ms / 1000.0),
+        "mae_bpm": float(np.mean(np.abs(hr_est - hr_true))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rPPG algorithm cost vs. accuracy benchmark")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS), choices=list(ALGORITHMS))
+    parser.add_argument("--traces", type=int, default=64, help="Batch size")
+    parser.add_argument("--fps", type=float, default=CAMERA_FPS, help="Sampling rate")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per trace")
+    parser.add_argument("--motion", type=float, default=1.0, help="Motion strength (0 = none)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed calls per measurement")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rgb, hr_true = synthetic_traces(args.traces, args.fps, args.duration, args.motion, args.seed)
+    results = [run_algorithm(name, rgb, hr_true, args.fps, args.repeat) for name in args.algorithms]
+
+    print("\n" + "=" * 78)
+    print(f"  rPPG ALGORITHM BENCHMARK — {args.traces} traces × {rgb.shape[1]} samples "
+          f"@ {args.fps:.1f} FPS, motion={args.motion}")
+    print("=" * 78)
+    print(f"  {'algorithm':<11}{'cost':<10}{'ms/trace':>10}{'ms/batch':>10}"
+          f"{'traces/s':>11}{'samples/s':>12}{'HR MAE':>10}")
+    for r in results:
+        print(f"  {r['name']:<11}{r['cost']:<10}{r['single_ms']:>10.2f}{r['batch_ms']:>10.1f}"
+              f"{r['traces_per_s']:>11.0f}{r['samples_per_s']:>12.3g}{r['mae_bpm']:>10.2f}")
+    print("=" * 78 + "\n")
+
+
+if __name__ == "__main__":
+    main()
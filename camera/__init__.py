@@ -1,4 +1,6 @@
 """
 camera/__init__.py
 camera/capture.py — Thread-safe webcam capture wrapper
+camera/decode.py  — Reduced-resolution JPEG decoding of uploaded frames
+camera/clip.py    — MJPEG splitting and frame-by-frame decoding of recorded clips
 """
@@ -2,19 +2,33 @@
 camera/capture.py — Thread-safe webcam capture
 ================================================
 A background thread continuously grabs frames so the main processing
-pipeline never blocks on I/O.  Other modules call `get_latest_frame()`
-to retrieve the most recent BGR image without waiting.
+pipeline never blocks on I/O.  Every frame is tagged on arrival as a
+`CapturedFrame`: a sequence number (1, 2, … per `open()`) and its
+`time.monotonic()` capture time, which is what the rPPG pipeline should
+time samples by — not the moment a consumer got round to the frame.
+
+Consumers either
+* block for the newest unseen frame — `next_frame(after_seq)`, or
+  iterate `frames()` — so no frame is processed twice; a consumer that
+  falls behind skips frames and counts them from the gaps in `seq`; or
+* take a copy of whatever is newest with `get_latest_frame()` (preview).
 
 Design notes
 ------------
 * The capture thread runs as a daemon so it dies automatically when the
   main process exits — no explicit cleanup is strictly required, but
   `release()` should still be called for good practice.
-* `_frame_ready` is a threading.Event that is set every time a new frame
-  arrives.  Consumers can optionally wait on it with a timeout.
+* `cap.read()` allocates a new image per frame and the capture thread
+  never writes to a frame once published, so `CapturedFrame.image` is
+  handed out without a copy.  Treat it as read-only.
+* Waiters sleep on a condition variable notified per frame, and are
+  woken when the camera is released or disconnects.
 """
 
 import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator
 import cv2
 import numpy as np
 from utils.logger import get_logger
@@ -23,15 +37,24 @@ from config import CAMERA_INDEX, CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS
 logger = get_logger("camera.capture")
 
 
+@dataclass(frozen=True)
+class CapturedFrame:
+    seq: int                 # 1, 2, … in capture order
+    timestamp: float         # time.monotonic() when the grab returned
+    image: np.ndarray        # BGR, uint8 — shared, do not modify
+
+
 class CameraCapture:
     """Manages a single webcam and exposes its frames in a thread-safe way."""
 
     def __init__(self, device_index: int = CAMERA_INDEX):
         self._device_index = device_index
         self._cap: cv2.VideoCapture | None = None
-        self._latest_frame: np.ndarray | None = None
+        self._latest: CapturedFrame | None = None
+        self._seq = 0
         self._lock = threading.Lock()
-        self._frame_ready = threading.Event()
+        self._new_frame = threading.Condition(self._lock)
+        self._running = False            # Capture loop alive (False after a disconnect)
         self._stop_event = threading.Event()
         self._thread: threading.Thread | None = None
         self.is_open = False
@@ -72,6 +95,10 @@ class CameraCapture:
         logger.info("Camera opened — %dx%d @ %.1f FPS", actual_w, actual_h, actual_fps)
 
         self._stop_event.clear()
+        with self._lock:
+            self._latest = None
+            self._seq = 0
+            self._running = True
         self._thread = threading.Thread(target=self._capture_loop, daemon=True)
         self._thread.start()
         self.is_open = True
@@ -80,6 +107,9 @@ class CameraCapture:
     def release(self) -> None:
         """Stop the capture thread and release the hardware device."""
         self._stop_event.set()
+        with self._lock:
+            self._running = False
+            self._new_frame.notify_all()     # Wake blocked consumers
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout=2.0)
         if self._cap:
@@ -97,16 +127,49 @@ class CameraCapture:
         thread last wrote.
         """
         with self._lock:
-            return self._latest_frame.copy() if self._latest_frame is not None else None
+            return self._latest.image.copy() if self._latest is not None else None
+
+    def next_frame(self, after_seq: int = 0, timeout: float | None = 1.0) -> CapturedFrame | None:
+        """
+        The newest frame with `seq > after_seq`, blocking until one arrives.
+
+        Pass the `seq` of the last frame processed to never see a frame
+        twice; frames captured in between are skipped (the gap in `seq`
+        says how many).
+
+        Returns None on timeout, or once the camera is released or has
+        stopped delivering frames.
+        """
+        with self._new_frame:
+            ready = self._new_frame.wait_for(
+                lambda: (self._latest is not None and self._latest.seq > after_seq) or not self._running,
+                timeout,
+            )
+            if not ready or self._latest is None or self._latest.seq <= after_seq:
+                return None
+            return self._latest
+
+    def frames(self, timeout: float = 1.0) -> Iterator[CapturedFrame]:
+        """
+        Yield the newest frame each time one arrives that has not been
+        yielded yet, until the camera is released or no frame arrives
+        within `timeout` seconds.
+
+        No frame is yielded twice, but frames captured while the consumer
+        was busy are skipped, not queued — gaps in `seq` count them.
+        """
+        seq = 0
+        while (frame := self.next_frame(seq, timeout)) is not None:
+            seq = frame.seq
+            yield frame
 
     def wait_for_frame(self, timeout: float = 1.0) -> np.ndarray | None:
         """
-        Block until a new frame arrives or `timeout` seconds elapse.
+        Block until a frame is available or `timeout` seconds elapse.
         Useful for the very first frame after `open()`.
         """
-        self._frame_ready.wait(timeout=timeout)
-        self._frame_ready.clear()
-        return self.get_latest_frame()
+        frame = self.next_frame(0, timeout)
+        return frame.image.copy() if frame is not None else None
 
     # ── Private ──────────────────────────────────────────────────────────────
 
@@ -117,7 +180,12 @@ class CameraCapture:
             if not ret:
                 logger.warning("Frame grab returned False — camera may have been disconnected.")
                 break
-            with self._lock:
-                self._latest_frame = frame
-            self._frame_ready.set()
-        logger.debug("Capture loop exited.")
+            timestamp = time.monotonic()
+            with self._new_frame:
+                self._seq += 1
+                self._latest = CapturedFrame(self._seq, timestamp, frame)
+                self._new_frame.notify_all()
+        with self._new_frame:
+            self._running = False
+            self._new_frame.notify_all()
+        logger.debug("Capture loop exited after %d frames.", self._seq)
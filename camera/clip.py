@@ -0,0 +1,137 @@
+"""
+camera/clip.py — Frame sources for recorded clips
+==================================================
+`/analyze` receives a whole recorded clip as a streamed request body.
+Two kinds of input are handled, neither of which is ever held in memory
+as a whole:
+
+* **MJPEG** (concatenated JPEGs, e.g. `multipart/x-mixed-replace` or
+  `video/x-motion-jpeg`).  `MJPEGSplitter` cuts complete JPEGs out of the
+  byte stream as chunks arrive, so frames are analysed while the upload
+  is still in progress.  MJPEG carries no timestamps; frames are spaced
+  at the rate the client declares.
+* **Containers** (WebM, MP4, …).  These need random access (an MP4 index
+  may sit at the end of the file), so the body is spooled to a temporary
+  file on disk and `iter_video_frames()` decodes it one frame at a time
+  through OpenCV's FFmpeg backend, using the container's presentation
+  timestamps.
+"""
+
+from typing import Iterator
+import cv2
+import numpy as np
+from utils.logger import get_logger
+from config import CLIP_MAX_FRAME_BYTES
+
+logger = get_logger("camera.clip")
+
+_SOI = b"\xff\xd8\xff"   # JPEG start-of-image (+ first marker byte)
+_EOI = b"\xff\xd9"       # JPEG end-of-image
+
+_MJPEG_TYPES = ("multipart/x-mixed-replace", "video/x-motion-jpeg", "video/mjpeg", "image/jpeg")
+
+
+def is_mjpeg(content_type: str, head: bytes) -> bool:
+    """True if the upload is a JPEG stream, by content type or by sniffing."""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type in _MJPEG_TYPES:
+        return True
+    # A bare stream of JPEGs starts with SOI; multipart MJPEG has a part
+    # header first, so look a little further in.
+    return head.startswith(_SOI) or (media_type == "" and _SOI in head[:1024])
+
+
+class MJPEGSplitter:
+    """
+    Incrementally split a byte stream into complete JPEG images.
+
+    Anything between images (multipart boundaries and part headers) is
+    skipped.  Images must not embed a JPEG thumbnail, whose end marker
+    would end the frame early — true of camera and canvas encoders.
+
+    Parameters
+    ----------
+    max_frame_bytes : int   Largest image accepted before the stream is
+                            declared corrupt.
+    """
+
+    def __init__(self, max_frame_bytes: int = CLIP_MAX_FRAME_BYTES):
+        self._buf = bytearray()
+        self._in_frame = False
+        self._scan_from = 0          # Where to resume the marker search
+        self._max_frame_bytes = max_frame_bytes
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """
+        Add a chunk of the stream; return the images it completed.
+
+        Raises
+        ------
+        ValueError  If an image exceeds `max_frame_bytes`.
+        """
+        self._buf += chunk
+        frames = []
+        while True:
+            if not self._in_frame:
+                start = self._buf.find(_SOI, self._scan_from)
+                if start < 0:
+                    # Keep a possible partial SOI at the very end
+                    del self._buf[:max(0, len(self._buf) - len(_SOI) + 1)]
+                    self._scan_from = 0
+                    return frames
+                del self._buf[:start]
+                self._in_frame = True
+                self._scan_from = len(_SOI)
+
+            end = self._buf.find(_EOI, self._scan_from)
+            if end < 0:
+                if len(self._buf) > self._max_frame_bytes:
+                    raise ValueError(f"MJPEG frame exceeds {self._max_frame_bytes} bytes.")
+                self._scan_from = max(len(_SOI), len(self._buf) - len(_EOI) + 1)
+                return frames
+            end += len(_EOI)
+            frames.append(bytes(self._buf[:end]))
+            del self._buf[:end]
+            self._in_frame = False
+            self._scan_from = 0
+
+
+def iter_video_frames(path: str, fallback_fps: float) -> Iterator[tuple[float, np.ndarray]]:
+    """
+    Decode a video file frame by frame.
+
+    Yields
+    ------
+    (timestamp_seconds, bgr_frame)
+        Timestamps are the container's presentation times.  Where the
+        container reports none (or they stop increasing), frames are
+        spaced at its nominal rate, or `fallback_fps` if that is missing
+        or implausible.
+
+    Raises
+    ------
+    ValueError  If OpenCV cannot open the file.
+    """
+    cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG)
+    if not cap.isOpened():
+        raise ValueError("Unsupported or corrupt video clip.")
+    nominal = cap.get(cv2.CAP_PROP_FPS)
+    period = 1.0 / (nominal if 0 < nominal <= 240 else fallback_fps)
+    last = None
+    synthetic = 0
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                return
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if last is not None and timestamp <= last:
+                timestamp = last + period
+                synthetic += 1
+            last = timestamp
+            yield timestamp, frame
+    finally:
+        cap.release()
+        if synthetic:
+            logger.warning("%d frames had no usable timestamp; spaced at %.1f FPS.",
+                           synthetic, 1.0 / period)
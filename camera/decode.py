@@ -0,0 +1,209 @@
+"""
+camera/decode.py — Reduced-resolution JPEG decoding of uploaded frames
+=======================================================================
+In frontend mode every frame arrives as a base64 JPEG.  The old path
+decoded it with PIL, converted RGB → BGR for OpenCV, and the face
+detector immediately converted BGR → RGB again for MediaPipe — two
+full-frame colour conversions per frame on top of a full-size decode.
+
+`FrameDecoder` instead:
+
+* decodes with `cv2.imdecode` straight into the colour order the
+  detector wants (RGB for the MediaPipe backends, when the installed
+  OpenCV supports `IMREAD_COLOR_RGB`), and
+* uses libjpeg's DCT scaling (`IMREAD_REDUCED_COLOR_2/4`) to decode at
+  1/2 or 1/4 size while the face is large enough.  Skipping the inverse
+  DCT for high-frequency coefficients makes a reduced decode much
+  cheaper than a full decode followed by a resize.
+
+Scale selection
+---------------
+Feed the detector's face size back with `update_face_size()` after each
+frame.  The decoder halves the resolution only when the face would still
+span `min_face_px * _SHRINK_MARGIN` pixels (hysteresis, so the scale —
+and hence the ROI sampling grid — changes rarely), returns to a larger
+scale as soon as the face drops below `min_face_px`, and goes back to
+full resolution whenever the face is lost.
+
+`decode()` may run on several threads while another feeds back face
+sizes, so it returns the scale it actually decoded at alongside the frame
+— reading `scale` separately could pair a frame with the next scale.
+
+Face-crop uploads
+-----------------
+Once a face has been found, clients may upload only a padded crop around
+it, scaled down as a whole.  `FrameWindow` describes where such an upload
+sits in the original camera frame so that landmarks and ROI boxes found
+in it can be mapped back (`FaceROIs.mapped`).
+"""
+
+import base64
+import binascii
+import threading
+from dataclasses import dataclass
+import cv2
+import numpy as np
+from utils.logger import get_logger
+from config import FRAME_DECODE_REDUCED, DECODE_MIN_FACE_PX
+
+logger = get_logger("camera.decode")
+
+# Only shrink further if the face keeps this much headroom above the floor
+_SHRINK_MARGIN = 1.25
+
+# imdecode flags per scale denominator
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+}
+
+# OpenCV ≥ 4.11 can emit RGB directly from the decoder
+_IMREAD_COLOR_RGB = getattr(cv2, "IMREAD_COLOR_RGB", None)
+
+
+def strip_data_url(frame_data: str) -> str:
+    """Drop a `data:image/jpeg;base64,` prefix if present."""
+    head, sep, tail = frame_data.partition("base64,")
+    return tail if sep else head
+
+
+def b64_to_bytes(frame_data: str) -> bytes:
+    """
+    Decode a base64 (optionally data-URL) frame into raw JPEG bytes.
+
+    Raises
+    ------
+    ValueError  If the payload is not valid base64.
+    """
+    try:
+        return base64.b64decode(strip_data_url(frame_data), validate=False)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid base64 frame data: {e}") from e
+
+
+@dataclass(frozen=True, slots=True)
+class FrameWindow:
+    """
+    Placement of an uploaded image within the original camera frame:
+
+        original = upload / scale + (x, y)
+
+    A full-frame upload is `FrameWindow(0, 0, scale, width, height)`.
+    """
+    x: int                  # Left edge of the crop (original pixels)
+    y: int                  # Top edge of the crop (original pixels)
+    scale: float            # Upload pixels per original pixel
+    frame_width: int        # Original camera frame size
+    frame_height: int
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FrameWindow":
+        """
+        Parse the `crop` object of a `/scan/frame` request.
+
+        Raises
+        ------
+        ValueError  If a field is missing, non-numeric or out of range.
+        """
+        try:
+            window = cls(
+                x=int(data["x"]),
+                y=int(data["y"]),
+                scale=float(data.get("scale", 1.0)),
+                frame_width=int(data["frame_width"]),
+                frame_height=int(data["frame_height"]),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid crop metadata: {e!r}") from e
+        if not 0.0 < window.scale <= 1.0:
+            raise ValueError(f"Crop scale must be in (0, 1], got {window.scale}.")
+        if window.frame_width <= 0 or window.frame_height <= 0:
+            raise ValueError("Crop frame size must be positive.")
+        if not (0 <= window.x < window.frame_width and 0 <= window.y < window.frame_height):
+            raise ValueError("Crop offset lies outside the frame.")
+        return window
+
+
+class FrameDecoder:
+    """
+    Stateful JPEG decoder for one stream of uploaded frames.
+
+    Parameters
+    ----------
+    colour_order : str
+        "rgb" or "bgr" — the order the consumer wants.  Falls back to
+        "bgr" when this OpenCV build cannot decode straight to RGB; check
+        `colour_order` for what `decode()` actually returns.
+    reduced : bool
+        Allow 1/2 and 1/4 scale decoding.
+    min_face_px : int
+        Smallest face size (longest side, decoded pixels) to keep.
+    """
+
+    def __init__(
+        self,
+        colour_order: str = "bgr",
+        reduced: bool = FRAME_DECODE_REDUCED,
+        min_face_px: int = DECODE_MIN_FACE_PX,
+    ):
+        if colour_order not in ("rgb", "bgr"):
+            raise ValueError(f"Unsupported colour order '{colour_order}'.")
+        if colour_order == "rgb" and _IMREAD_COLOR_RGB is None:
+            logger.info("OpenCV %s cannot decode to RGB; decoding to BGR.", cv2.__version__)
+            colour_order = "bgr"
+        self.colour_order = colour_order
+        self.reduced = reduced
+        self._min_face_px = min_face_px
+        self._denominator = 1
+        self._count_lock = threading.Lock()
+        self.frames_decoded = 0
+
+    @property
+    def scale(self) -> float:
+        """Linear scale of decoded frames relative to the encoded JPEG."""
+        return 1.0 / self._denominator
+
+    def decode(self, jpeg: bytes | np.ndarray) -> tuple[np.ndarray | None, float]:
+        """
+        Decode one JPEG at the current scale.  Safe to call from several
+        threads.
+
+        Returns
+        -------
+        (frame, scale)   frame: ndarray (H, W, 3) uint8, or None if the data
+                         is not a decodable image; scale: the linear scale
+                         it was decoded at.
+        """
+        denominator = self._denominator         # Read once: may change concurrently
+        flags = _REDUCED_FLAGS[denominator]
+        if self.colour_order == "rgb":
+            flags |= _IMREAD_COLOR_RGB
+        # np.frombuffer wraps the bytes without copying
+        buf = jpeg if isinstance(jpeg, np.ndarray) else np.frombuffer(jpeg, dtype=np.uint8)
+        frame = cv2.imdecode(buf, flags)
+        if frame is not None:
+            with self._count_lock:
+                self.frames_decoded += 1
+        return frame, 1.0 / denominator
+
+    def update_face_size(self, face_px: float | None) -> None:
+        """
+        Adapt the decode scale to the face size (longest side, in pixels
+        of the *decoded* frame) found in the last frame, or None if no
+        face was found.  Call from one thread only.
+        """
+        if not self.reduced:
+            return
+        if face_px is None:
+            denominator = 1      # Search the next frame at full resolution
+        else:
+            full_px = face_px * self._denominator
+            denominator = self._denominator
+            while denominator < 4 and full_px / (2 * denominator) >= self._min_face_px * _SHRINK_MARGIN:
+                denominator *= 2
+            while denominator > 1 and full_px / denominator < self._min_face_px:
+                denominator //= 2
+        if denominator != self._denominator:
+            logger.debug("Decode scale 1/%d → 1/%d.", self._denominator, denominator)
+            self._denominator = denominator
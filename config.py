@@ -13,19 +13,170 @@ CAMERA_FPS: int = 15           # Requested FPS; actual FPS may differ
 
 # ─── Scan Timing ─────────────────────────────────────────────────────────────
 SCAN_DURATION_SECONDS: int = 45   # How long the rPPG capture window runs
-WARMUP_FRAMES: int = 60           # Frames to discard before signal processing
-                                  # (lets the face settle and auto-exposure stabilise)
+
+# Warm-up — capture time discarded before signal processing (lets the face
+# settle and auto-exposure stabilise).  Measured in seconds, not frames, and
+# ended early once the trailing WARMUP_WINDOW_SECONDS of brightness drifts by
+# less than WARMUP_MAX_DRIFT of its mean per second.  Scans stop once they
+# hold SCAN_DURATION_SECONDS − WARMUP_MAX_SECONDS of post-warm-up signal.
+WARMUP_MIN_SECONDS: float = 1.0
+WARMUP_MAX_SECONDS: float = 4.0
+WARMUP_ADAPTIVE: bool = True
+WARMUP_WINDOW_SECONDS: float = 1.5
+WARMUP_MAX_DRIFT: float = 0.01
+
+# ─── Frame Ingestion (frontend mode) ─────────────────────────────────────────
+# Uploaded frames wait in a bounded per-session queue for the scan worker.
+# Policies when the client outpaces the worker (see api/ingest.py):
+#   "drop_oldest"  evict the oldest queued frame to make room
+#   "drop_newest"  reject the incoming frame
+#   "decimate"     accept at most INGEST_TARGET_FPS, then drop_oldest
+INGEST_QUEUE_SIZE: int = 32
+INGEST_DROP_POLICY: str = "drop_oldest"
+INGEST_TARGET_FPS: float = 15.0
+INGEST_DECIMATE_TOLERANCE: float = 0.1  # Decimation keeps a frame this fraction of a period early (client timer jitter)
+INGEST_SLOW_DOWN_FILL: float = 0.75   # Ask the client to slow down above this queue fill
+INGEST_IDLE_SECONDS: float = 10.0     # Abandon a scan with no upload for this long past the frame interval
+
+# Staged frame processing (see utils/stages.py): decode → detect → accumulate.
+# Decoding releases the GIL, so threads suffice (per scan); detection runs on
+# long-lived single-worker "lanes" shared by all scans (see face/detector.py),
+# so workers load the face model once per server, not once per scan.  Each
+# scan is pinned to one lane, so its tracker sees every frame in order.
+PIPELINE_DECODE_WORKERS: int = 2
+PIPELINE_DETECT_WORKERS: int = 2            # Detect lanes (worker processes), shared by all scans
+PIPELINE_DETECT_EXECUTOR: str = "process"   # "process" | "thread"
+PIPELINE_QUEUE_SIZE: int = 8                # In-flight frames per stage
+
+# Post-processing (pulse → HR/HRV/BP/stress) runs on a shared bounded job
+# executor (see api/jobs.py) instead of a thread per scan.
+SCAN_JOB_WORKERS: int = 2
+SCAN_JOB_QUEUE: str = "fifo"                # "fifo" | "priority"
+
+# ─── Clip Upload (/analyze) ──────────────────────────────────────────────────
+# Recorded clips are streamed in; MJPEG is analysed as it arrives, other
+# containers are spooled to a temporary file first (see camera/clip.py).
+CLIP_MAX_BYTES: int = 256 * 1024 * 1024     # Reject larger uploads (413)
+CLIP_MAX_FRAME_BYTES: int = 8 * 1024 * 1024 # Largest single MJPEG frame
+CLIP_SPOOL_DIR: str | None = None           # Temp dir for container spools (None = system default)
+
+# ─── Trace Batches (/analyze/traces) ─────────────────────────────────────────
+# Precomputed RGB traces analysed in one request (see api/batch.py).
+BATCH_MAX_TRACES: int = 1000
+BATCH_MAX_SAMPLES: int = 36_000             # Per trace — 10 min at 60 Hz
+BATCH_MAX_BYTES: int = 64 * 1024 * 1024     # Reject larger bodies (413)
+
+# ─── Result Store ────────────────────────────────────────────────────────────
+# Completed results are persisted off the request path (see api/store.py).
+RESULT_STORE_BACKEND: str = "sqlite"        # "sqlite" | "none"
+RESULT_STORE_PATH: str = "data/results.sqlite3"
+RESULT_STORE_QUEUE: int = 1024              # Pending writes before records are dropped
+RESULT_STORE_BATCH: int = 64                # Records per write transaction
+HISTORY_PAGE_MAX: int = 200                 # Largest /history page
+
+# ─── Raw-Trace Archive ───────────────────────────────────────────────────────
+# Every scan's per-ROI colour trace is appended to segment files so it
+# can be re-analysed later (see rppg/archive.py).
+TRACE_ARCHIVE_ENABLED: bool = True
+TRACE_ARCHIVE_DIR: str = "data/traces"
+TRACE_ARCHIVE_DTYPE: str = "float16"        # "float16" (deviation from baseline) | "float32"
+TRACE_SEGMENT_BYTES: int = 64 * 1024 * 1024 # Start a new segment file past this size
+
+# ─── Re-analysis ─────────────────────────────────────────────────────────────
+# /reanalyze runs every rPPG algorithm over one trace on a shared thread
+# pool (see api/reanalysis.py); NumPy / SciPy release the GIL.
+REANALYSIS_WORKERS: int = 4
+
+# ─── Admission Control ───────────────────────────────────────────────────────
+# /scan/start admits a scan only if the live per-frame processing cost of
+# all running scans plus the new one fits in the CPU budget (see
+# api/admission.py).  The defaults below are priors until live stage
+# timings have been measured.
+ADMISSION_TARGET_UTILISATION: float = 0.8   # Fraction of CPU cores scans may fill
+ADMISSION_MAX_WAIT_SECONDS: float = 60.0    # Ask the client to retry up to this wait, else reject
+ADMISSION_DEFAULT_FRAME_MS: float = 25.0    # CPU ms per frame, all stages
+ADMISSION_EXPECTED_FPS: float = 5.0         # Upload rate of a new scan
+
+# ─── Load Shedding ───────────────────────────────────────────────────────────
+# While a live scan runs, a scheduler compares each interval's detection
+# time per frame with the per-frame budget (detect workers / frame rate)
+# and watches the ingest queue (see api/scheduler.py).  Under load it steps
+# down the quality ladder below; once load has stayed low it steps back up.
+SCHEDULER_ENABLED: bool = True
+SCHEDULER_INTERVAL_SECONDS: float = 1.0     # Between load evaluations
+SCHEDULER_HIGH_LOAD: float = 0.85           # Shed above this fraction of the budget…
+SCHEDULER_LOW_LOAD: float = 0.4             # …restore below it (ladder steps ~halve cost)
+SCHEDULER_QUEUE_HIGH: float = 0.5           # Shed above this ingest queue fill…
+SCHEDULER_QUEUE_LOW: float = 0.1            # …restore only below it
+SCHEDULER_RESTORE_SECONDS: float = 3.0      # Calm time before restoring a level (doubles on flapping)
+SCHEDULER_MIN_FPS: float = 5.0              # Decimation floor: 2 × BP_HIGH_HZ
+# Quality ladder, full quality first: (detection stride, downscaled
+# inference, decimate to SCHEDULER_MIN_FPS).  Level 0 never undercuts
+# DETECTION_STRIDE / DETECTION_DOWNSCALE.
+SCHEDULER_LEVELS: tuple[tuple[int, bool, bool], ...] = (
+    (1, False, False),
+    (2, False, False),   # Landmark tracking between detections
+    (2, True, False),    # + inference on a downscaled copy
+    (4, True, False),
+    (4, True, True),     # + drop frames above the rPPG minimum rate
+)
+
+# ─── Client Capture Hints (frontend mode) ────────────────────────────────────
+# /scan/start and /scan/frame tell the browser how often, how large and at
+# what JPEG quality to upload (see api/hints.py).  Each pair is
+# (idle server, busy server); hints slide between them as the admission
+# load rises from CLIENT_HINT_BUSY_FROM to 100 % of capacity.
+CLIENT_HINT_BUSY_FROM: float = 0.5
+CLIENT_FRAME_INTERVAL_MS: tuple[int, int] = (100, 200)   # 200 ms = 5 FPS, still ≥ 2× BP_HIGH_HZ
+CLIENT_JPEG_QUALITY: tuple[float, float] = (0.85, 0.65)
+CLIENT_TARGET_FACE_PX: tuple[int, int] = (320, 200)      # Face size to aim for in uploads
+CLIENT_WIDTH_RANGE: tuple[int, int] = (320, 1280)        # Bounds of the max-width hint
+# Face-crop hint: upload only the face box plus this fraction of its size on
+# every side (room for head motion between hint updates).  No crop is
+# suggested when it would not save at least 1 - CLIENT_CROP_MAX_AREA of the frame.
+CLIENT_CROP_PADDING: float = 0.35
+CLIENT_CROP_MAX_AREA: float = 0.6
 
 # ─── Face / ROI ──────────────────────────────────────────────────────────────
+# Face-localisation backend (see face/backends.py and benchmark_backends.py):
+#   "facemesh_refined" | "facemesh" | "blazeface" | "haar"
+FACE_BACKEND: str = "facemesh_refined"
+
 # Normalised bounding-box coordinates relative to the 468-landmark face mesh.
 # Forehead is sampled from the upper-centre region; cheeks from left and right.
 FOREHEAD_LANDMARKS = [246, 7, 376, 383]   # Indices that bracket the forehead ROI
 CHEEK_LEFT_LANDMARKS = [36, 194, 227, 116]
 CHEEK_RIGHT_LANDMARKS = [266, 430, 447, 352]
 
+# Detection stride — run full FaceMesh inference every N frames and
+# propagate landmarks with optical-flow tracking in between (1 = every frame).
+DETECTION_STRIDE: int = 1
+TRACKING_MIN_CONFIDENCE: float = 0.6   # Re-detect early below this tracker inlier ratio
+
+# Downscaled landmark inference — FaceMesh runs on a resized copy so the
+# previous frame's face spans ~DETECTION_TARGET_FACE_PX; ROI colours are
+# still sampled from the full-resolution frame.
+DETECTION_DOWNSCALE: bool = False
+DETECTION_TARGET_FACE_PX: int = 192   # FaceMesh's own landmark-model input size
+DETECTION_MIN_SCALE: float = 0.25     # Never shrink the frame below 1/4 size
+
+# Reduced-resolution decode of uploaded JPEG frames — libjpeg's DCT
+# scaling decodes at 1/2 or 1/4 size for a fraction of the cost, as long
+# as the face still spans at least DECODE_MIN_FACE_PX pixels.
+FRAME_DECODE_REDUCED: bool = True
+DECODE_MIN_FACE_PX: int = 160
+
 # ROI shrink factor — pull each edge inward by this fraction to avoid skin/hair borders
 ROI_SHRINK = 0.15
 
+# Geometric ROIs for box-only backends, as (x0, y0, x1, y1) fractions of
+# the face box.  Chosen to sit on forehead / cheek skin for a frontal face.
+GEOMETRIC_ROIS = {
+    "forehead":    (0.30, 0.08, 0.70, 0.22),
+    "cheek_left":  (0.15, 0.52, 0.35, 0.72),
+    "cheek_right": (0.65, 0.52, 0.85, 0.72),
+}
+
 # ─── rPPG Signal Processing ──────────────────────────────────────────────────
 # Butterworth bandpass filter band (Hz).
 # 0.75 Hz  →  45 BPM   (lower physiological limit - resting)
@@ -38,6 +189,29 @@ FILTER_ORDER: int = 4          # Butterworth filter order
 # Sliding window for heart-rate estimation (seconds)
 HR_WINDOW_SECONDS: float = 10.0
 
+# ─── ROI Quality ─────────────────────────────────────────────────────────────
+# Running per-ROI spectral SNR (see rppg/roi_quality.py).  ROIs that stay
+# poor are pruned — no longer sampled or averaged — and the final pulse is
+# an SNR-weighted combination of the per-ROI pulses.
+ROI_QUALITY_ENABLED: bool = True
+ROI_QUALITY_ALGORITHM: str = "chrom"       # Cheap algorithm used for scoring
+ROI_QUALITY_WINDOW_SECONDS: float = 8.0    # Samples scored per evaluation
+ROI_QUALITY_INTERVAL_SECONDS: float = 1.0  # Time between evaluations
+ROI_QUALITY_SMOOTHING: float = 0.3         # EMA weight of the newest SNR
+ROI_SNR_HALF_WIDTH_HZ: float = 0.15        # Signal bins either side of the pulse peak
+ROI_PRUNE_SNR_DB: float = -3.0             # Prune below this smoothed SNR …
+ROI_PRUNE_MARGIN_DB: float = 3.0           # … when also this far below the best ROI …
+ROI_PRUNE_PATIENCE: int = 5                # … for this many evaluations in a row
+
+# ─── Early Abort ─────────────────────────────────────────────────────────────
+# Scans that can no longer succeed stop with a reason (see rppg/monitor.py)
+SCAN_ABORT_ENABLED: bool = True
+SCAN_MIN_USABLE_FRACTION: float = 0.6   # Of the signal target that must be usable
+SCAN_MAX_GAP_SECONDS: float = 6.0       # Longest run without a usable frame
+SCAN_MAX_MOTION: float = 0.5            # Face-box speed (face widths / s) that makes a frame unusable
+SCAN_MIN_SNR_DB: float = -2.5           # Median rolling pulse SNR below which …
+SCAN_SNR_PATIENCE_SECONDS: float = 15.0 # … over this long the scan has no pulse
+
 # ─── HRV ─────────────────────────────────────────────────────────────────────
 # Minimum number of detected peaks needed to compute HRV metrics
 # Reduced to 3 for short scan compatibility (45s scans)
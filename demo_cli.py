@@ -13,14 +13,15 @@ Usage:
 """
 
 import argparse
-import time
 import sys
 import cv2
 import numpy as np
 
 from camera.capture import CameraCapture
 from face.detector import FaceDetector
-from rppg.pipeline import RPPGPipeline
+from rppg.algorithms import ALGORITHMS
+from rppg.pipeline import RPPGPipeline, signal_target
+from rppg.monitor import ScanAborted, ScanMonitor
 from features.hr import estimate_hr
 from features.hrv import compute_hrv
 from model.bp_model import BPEstimator
@@ -47,7 +48,7 @@ def main():
     parser.add_argument("--height", type=float, default=175.0, help="Height (cm)")
     parser.add_argument("--weight", type=float, default=70.0, help="Weight (kg)")
     parser.add_argument("--duration", type=int, default=30, help="Scan duration (seconds)")
-    parser.add_argument("--algorithm", type=str, default="pos", choices=["pos", "chrom"])
+    parser.add_argument("--algorithm", type=str, default="pos", choices=list(ALGORITHMS))
     parser.add_argument("--show-feed", action="store_true", help="Show live camera feed with face overlay")
     args = parser.parse_args()
 
@@ -66,6 +67,7 @@ def main():
 
     face_detector = FaceDetector()
     pipeline = RPPGPipeline(fps=CAMERA_FPS, algorithm=args.algorithm)
+    monitor = ScanMonitor(args.duration, args.algorithm)
 
     print(f"  Algorithm    : {args.algorithm.upper()}")
     print(f"  Scan duration: {args.duration} s")
@@ -74,39 +76,48 @@ def main():
     print("  Please look directly at the camera and stay still…\n")
 
     # ── Main capture loop ────────────────────────────────────────────────
-    start = time.time()
+    # Each new camera frame exactly once, blocking in between
+    start = None
     frame_count = 0
     face_detected_count = 0
+    timestamps = []
 
-    while True:
-        elapsed = time.time() - start
-        if elapsed >= args.duration:
+    target = signal_target(args.duration)
+    for captured in camera.frames(timeout=3.0):
+        start = captured.timestamp if start is None else start
+        elapsed = captured.timestamp - start
+        if elapsed >= args.duration or pipeline.signal_seconds >= target:
             break
 
-        frame = camera.get_latest_frame()
-        if frame is None:
-            time.sleep(0.02)
-            continue
-
+        frame = captured.image
         frame_count += 1
-        rois = face_detector.detect(frame)
+        rois = face_detector.detect(frame, rois=pipeline.active_rois)
 
         if rois.face_detected:
             face_detected_count += 1
 
-        pipeline.add_frame(rois)
+        pipeline.add_frame(rois, captured.timestamp)
+        timestamps.append(captured.timestamp)
+        try:
+            monitor.update(pipeline, rois)
+        except ScanAborted as e:
+            print(f"\n  Scan stopped early: {e}")
+            camera.release()
+            face_detector.close()
+            if args.show_feed:
+                cv2.destroyAllWindows()
+            sys.exit(1)
 
         # ── Optional live feed with overlay ──────────────────────────
         if args.show_feed:
             display = frame.copy()
             # Draw ROI rectangles on the display frame
-            if rois.face_detected and rois.landmarks:
+            if rois.face_detected and rois.face_bbox is not None:
                 # Simple bounding box around all landmarks
-                xs = [l[0] for l in rois.landmarks]
-                ys = [l[1] for l in rois.landmarks]
+                x_min, y_min, x_max, y_max = rois.face_bbox
                 cv2.rectangle(display,
-                              (min(xs), min(ys)),
-                              (max(xs), max(ys)),
+                              (x_min, y_min),
+                              (x_max, y_max),
                               (0, 255, 0), 2)
 
             # Progress bar
@@ -125,9 +136,8 @@ def main():
                 if args.show_feed:
                     cv2.destroyAllWindows()
                 sys.exit(0)
-
-        # Small sleep to avoid 100 % CPU on the main thread
-        time.sleep(0.01)
+    else:
+        print("\n  Camera stopped delivering frames — analysing what was captured.")
 
     # ── Cleanup camera ──────────────────────────────────────────────────
     camera.release()
@@ -135,8 +145,12 @@ def main():
     if args.show_feed:
         cv2.destroyAllWindows()
 
-    print(f"\n  Captured {frame_count} frames, face detected in {face_detected_count} "
-          f"({100*face_detected_count/max(frame_count,1):.0f}%).\n")
+    # Measured capture rate, not the requested one
+    if len(timestamps) >= 2 and timestamps[-1] > timestamps[0]:
+        pipeline.fps = (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+
+    print(f"\n  Captured {frame_count} frames at {pipeline.fps:.1f} FPS, face detected in "
+          f"{face_detected_count} ({100*face_detected_count/max(frame_count,1):.0f}%).\n")
 
     # ── Signal processing ────────────────────────────────────────────────
     try:
@@ -145,7 +159,7 @@ def main():
         print(f"  ERROR: {e}")
         sys.exit(1)
 
-    hr_result = estimate_hr(pulse, CAMERA_FPS)
+    hr_result = estimate_hr(pulse, pipeline.fps)
     hrv_result = compute_hrv(hr_result["rr_intervals"])
 
     # ── BP & Stress ──────────────────────────────────────────────────────
@@ -1,4 +1,6 @@
 """
 face/__init__.py
 face/detector.py — MediaPipe Face Mesh wrapper + ROI extraction
+face/tracker.py  — Optical-flow landmark tracking between detections
+face/backends.py — Pluggable face-localisation backends (FaceMesh, BlazeFace, Haar)
 """
@@ -0,0 +1,316 @@
+"""
+face/backends.py — Pluggable face-localisation backends
+========================================================
+`FaceDetector` delegates the expensive "where is the face?" step to a
+*backend*.  Every backend answers two questions:
+
+    locate(image)      → normalised (N, 2) points describing the face
+                         (landmarks, or just the four face-box corners)
+    roi_boxes(points)  → forehead / left-cheek / right-cheek boxes in
+                         pixel coordinates
+
+Everything else — detection stride, landmark tracking, downscaled
+inference and full-resolution ROI sampling — lives in `FaceDetector` and
+works the same for all backends.
+
+Available backends
+------------------
+    facemesh_refined  MediaPipe FaceMesh with iris refinement (478 points).
+                      The historical default.
+    facemesh          MediaPipe FaceMesh without refinement (468 points).
+                      Same ROI landmarks, skips the iris sub-model.
+    blazeface         MediaPipe short-range face *box* detector with
+                      geometric forehead / cheek ROIs.  Much cheaper, but
+                      ROIs follow the box rather than facial features.
+    haar              OpenCV's bundled Haar cascade (pure CPU, no extra
+                      dependency) with the same geometric ROIs.
+
+Use `benchmark_backends.py` to measure ms/frame and downstream HR error
+of each backend on your own hardware and recordings.
+"""
+
+import cv2
+import numpy as np
+from utils.logger import get_logger
+from config import (
+    FOREHEAD_LANDMARKS,
+    CHEEK_LEFT_LANDMARKS,
+    CHEEK_RIGHT_LANDMARKS,
+    ROI_SHRINK,
+    GEOMETRIC_ROIS,
+)
+
+logger = get_logger("face.backends")
+
+Box = tuple[int, int, int, int]   # (x_min, y_min, x_max, y_max) in pixels
+
+
+def _import_mediapipe():
+    """
+    Lazy import of mediapipe.
+
+    Intentionally done at backend construction (not at module level) so
+    the rest of the application can start even when mediapipe is missing.
+    The error below lists every available 0.10.x wheel for Python 3.11 /
+    Windows.
+    """
+    try:
+        import mediapipe as mp
+    except ImportError:
+        raise ImportError(
+            "\n"
+            "╔══════════════════════════════════════════════════════════════╗\n"
+            "║  mediapipe is not installed.                                ║\n"
+            "║                                                              ║\n"
+            "║  Run ONE of these in your activated .venv:                   ║\n"
+            "║                                                              ║\n"
+            "║    pip install mediapipe                   ← latest          ║\n"
+            "║    pip install mediapipe==0.10.32          ← last 0.10.x     ║\n"
+            "║                                                              ║\n"
+            "║  Known 0.10.x versions (Python 3.11, Windows):              ║\n"
+            "║    0.10.5  0.10.7  0.10.8  0.10.9  0.10.10  0.10.11        ║\n"
+            "║    0.10.13 0.10.14 0.10.18 0.10.20 0.10.21  0.10.30        ║\n"
+            "║    0.10.31 0.10.32                                           ║\n"
+            "║                                                              ║\n"
+            "║  After installing, restart:  python main.py                  ║\n"
+            "╚══════════════════════════════════════════════════════════════╝\n"
+        )
+    return mp
+
+
+class FaceBackend:
+    """
+    Base class for face-localisation backends.
+
+    Attributes
+    ----------
+    name         : str   Registry key (see `BACKENDS`).
+    colour_order : str   Image format `locate()` expects: "rgb", "bgr" or
+                         "gray".  `FaceDetector` converts once, after any
+                         downscaling.
+    """
+
+    name = ""
+    colour_order = "rgb"
+
+    def locate(self, image: np.ndarray) -> np.ndarray | None:
+        """
+        Find the face in `image`.
+
+        Returns
+        -------
+        ndarray, shape (N, 2), float32, or None
+            Face points as (x, y) fractions of the image width / height,
+            or None if no face was found.
+        """
+        raise NotImplementedError
+
+    def roi_boxes(self, points: np.ndarray) -> tuple[Box | None, Box | None, Box | None]:
+        """
+        Derive the (forehead, cheek_left, cheek_right) boxes from face
+        points in pixel coordinates.  Boxes are not yet clamped to the
+        frame; degenerate boxes may be returned as None.
+        """
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """
+        Forget any state carried between frames (e.g. video-mode
+        tracking) because the next image shows a different view.
+        """
+
+    def close(self) -> None:
+        """Release any native resources."""
+
+
+# ── Landmark backends ────────────────────────────────────────────────────────
+
+
+def _landmark_box(points: np.ndarray, indices: list[int]) -> Box:
+    """Axis-aligned box around the chosen landmarks, shrunk by ROI_SHRINK."""
+    selected = points[indices]
+    x_min, y_min = selected.min(axis=0).tolist()
+    x_max, y_max = selected.max(axis=0).tolist()
+
+    # Shrink the box inward to exclude border artefacts
+    shrink_x = int((x_max - x_min) * ROI_SHRINK)
+    shrink_y = int((y_max - y_min) * ROI_SHRINK)
+    return x_min + shrink_x, y_min + shrink_y, x_max - shrink_x, y_max - shrink_y
+
+
+class FaceMeshBackend(FaceBackend):
+    """
+    MediaPipe FaceMesh (468 landmarks, 478 with iris refinement).
+
+    Parameters
+    ----------
+    refine_landmarks : bool
+        Also run the attention-based iris/lip refinement model.  The ROI
+        landmarks in `config.py` do not need it.
+    max_faces : int
+        Maximum number of faces to track simultaneously.  Only the first
+        is used.
+    """
+
+    colour_order = "rgb"
+
+    def __init__(self, refine_landmarks: bool = True, max_faces: int = 1):
+        mp = _import_mediapipe()
+        self.name = "facemesh_refined" if refine_landmarks else "facemesh"
+        self._mesh = mp.solutions.face_mesh.FaceMesh(
+            max_num_faces=max_faces,
+            refine_landmarks=refine_landmarks,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
+        )
+
+    def locate(self, image: np.ndarray) -> np.ndarray | None:
+        results = self._mesh.process(image)
+        if not results.multi_face_landmarks:
+            return None
+
+        # We only use the first (closest) face.  Fill a flat float32 buffer
+        # straight from the protobuf in one pass.
+        face_lms = results.multi_face_landmarks[0]
+        n = len(face_lms.landmark)
+        return np.fromiter(
+            (c for lm in face_lms.landmark for c in (lm.x, lm.y)),
+            dtype=np.float32,
+            count=2 * n,
+        ).reshape(n, 2)
+
+    def roi_boxes(self, points: np.ndarray) -> tuple[Box | None, Box | None, Box | None]:
+        return (
+            _landmark_box(points, FOREHEAD_LANDMARKS),
+            _landmark_box(points, CHEEK_LEFT_LANDMARKS),
+            _landmark_box(points, CHEEK_RIGHT_LANDMARKS),
+        )
+
+    def reset(self) -> None:
+        # FaceMesh tracks the face box between calls in normalised
+        # coordinates, which are wrong once the crop moves.
+        self._mesh.reset()
+
+    def close(self) -> None:
+        self._mesh.close()
+
+
+# ── Face-box backends ────────────────────────────────────────────────────────
+
+
+def _box_corners(x: float, y: float, w: float, h: float) -> np.ndarray:
+    """Four (x, y) corners of a box, clockwise from top-left."""
+    return np.array(
+        [[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype=np.float32
+    )
+
+
+class _GeometricROIBackend(FaceBackend):
+    """
+    Shared ROI geometry for backends that only return a face box: each
+    ROI is a fixed fraction of the box (see `GEOMETRIC_ROIS`).  Tracked
+    or rotated corners are handled by using their bounding box.
+    """
+
+    def roi_boxes(self, points: np.ndarray) -> tuple[Box | None, Box | None, Box | None]:
+        x_min, y_min = points.min(axis=0).tolist()
+        x_max, y_max = points.max(axis=0).tolist()
+        w, h = x_max - x_min, y_max - y_min
+        boxes = []
+        for name in ("forehead", "cheek_left", "cheek_right"):
+            fx0, fy0, fx1, fy1 = GEOMETRIC_ROIS[name]
+            boxes.append((
+                int(x_min + fx0 * w), int(y_min + fy0 * h),
+                int(x_min + fx1 * w), int(y_min + fy1 * h),
+            ))
+        return tuple(boxes)
+
+
+class BlazeFaceBackend(_GeometricROIBackend):
+    """MediaPipe short-range face detector (BlazeFace) — face box only."""
+
+    name = "blazeface"
+    colour_order = "rgb"
+
+    def __init__(self, min_detection_confidence: float = 0.5):
+        mp = _import_mediapipe()
+        self._detector = mp.solutions.face_detection.FaceDetection(
+            model_selection=0,     # Short-range model: faces within ~2 m
+            min_detection_confidence=min_detection_confidence,
+        )
+
+    def locate(self, image: np.ndarray) -> np.ndarray | None:
+        results = self._detector.process(image)
+        if not results.detections:
+            return None
+        # Detections are sorted by score — take the most confident face.
+        box = results.detections[0].location_data.relative_bounding_box
+        return _box_corners(box.xmin, box.ymin, box.width, box.height)
+
+    def close(self) -> None:
+        self._detector.close()
+
+
+class HaarCascadeBackend(_GeometricROIBackend):
+    """
+    OpenCV's bundled frontal-face Haar cascade.
+
+    Needs nothing beyond opencv-python.  Cheapest on small inputs and
+    the least robust to pose and lighting.
+    """
+
+    name = "haar"
+    colour_order = "gray"
+
+    def __init__(self, cascade: str = "haarcascade_frontalface_default.xml"):
+        path = cv2.data.haarcascades + cascade
+        self._cascade = cv2.CascadeClassifier(path)
+        if self._cascade.empty():
+            raise RuntimeError(f"Could not load Haar cascade from {path}.")
+
+    def locate(self, image: np.ndarray) -> np.ndarray | None:
+        h, w = image.shape[:2]
+        faces = self._cascade.detectMultiScale(
+            image,
+            scaleFactor=1.2,
+            minNeighbors=5,
+            minSize=(max(24, w // 6), max(24, h // 6)),
+        )
+        if len(faces) == 0:
+            return None
+        # Largest face is the one closest to the camera
+        x, y, fw, fh = max(faces, key=lambda f: f[2] * f[3])
+        return _box_corners(x / w, y / h, fw / w, fh / h)
+
+
+# ── Registry ─────────────────────────────────────────────────────────────────
+
+# name → (class, constructor kwargs).  Keeping the class visible lets
+# callers query `colour_order` without constructing (and loading) a model.
+BACKENDS = {
+    "facemesh_refined": (FaceMeshBackend, {"refine_landmarks": True}),
+    "facemesh":         (FaceMeshBackend, {"refine_landmarks": False}),
+    "blazeface":        (BlazeFaceBackend, {}),
+    "haar":             (HaarCascadeBackend, {}),
+}
+
+
+def _lookup(name: str) -> tuple[type, dict]:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown face backend '{name}'. Choose from {list(BACKENDS)}.")
+    return BACKENDS[name]
+
+
+def backend_colour_order(name: str) -> str:
+    """Image format ("rgb", "bgr" or "gray") the named backend expects."""
+    return _lookup(name)[0].colour_order
+
+
+def create_backend(name: str, max_faces: int = 1) -> FaceBackend:
+    """Instantiate a backend by registry name."""
+    cls, kwargs = _lookup(name)
+    if cls is FaceMeshBackend:
+        kwargs = {**kwargs, "max_faces": max_faces}   # Only FaceMesh tracks several faces
+    backend = cls(**kwargs)
+    logger.info("Face backend '%s' initialised.", name)
+    return backend
@@ -1,10 +1,12 @@
 """
 face/detector.py — Face detection & skin-ROI extraction
 ========================================================
-Uses Google's MediaPipe Face Mesh (468 landmarks) to:
+Uses a pluggable face backend (by default Google's MediaPipe Face Mesh,
+see `face/backends.py`) to:
   1. Detect the face in the current frame.
   2. Compute normalised landmark positions.
-  3. Extract rectangular ROIs for the *forehead* and both *cheeks*.
+  3. Locate rectangular ROIs for the *forehead* and both *cheeks* and
+     sample their mean colour (no pixel crops are kept).
 
 Why these regions?
 ------------------
@@ -12,175 +14,385 @@ The forehead and cheeks are relatively flat, well-lit skin surfaces with
 high blood-vessel density.  They produce the strongest rPPG signal while
 being less susceptible to motion artefacts than the nose or chin.
 
+Detection stride
+----------------
+With `detect_stride > 1` the backend only runs on every N-th frame (or
+sooner, whenever tracking confidence drops).  In between, landmarks are
+propagated by `face.tracker.LandmarkTracker`, which costs a fraction of
+full inference.  The default stride of 1 runs the backend on every frame.
+
+Downscaled inference
+--------------------
+With `downscale=True` the backend runs on a resized copy of the frame
+whose scale is chosen so that the face found in the *previous* frame
+spans about `DETECTION_TARGET_FACE_PX` pixels.  Backends return
+normalised coordinates, so landmarks map straight back onto the original
+frame and
+ROI colours are always sampled at full resolution.  Inference cost then
+follows the face size rather than the frame size.
+
+Input colour order
+------------------
+`detect()` accepts BGR (OpenCV's convention, the default) or RGB frames.
+Callers that control decoding — e.g. `camera.decode.FrameDecoder` —
+should ask for `input_colour_order` so no full-frame conversion is needed
+before the backend runs.
+
+ROI selection
+-------------
+`detect(rois=...)` samples only the named ROIs; the others come back as
+None.  The rPPG pipeline names the ROIs it has not pruned for low SNR
+(`RPPGPipeline.active_rois`), so poor regions cost nothing per frame.
+
 ROI shrinking
 -------------
-Each bounding box is shrunk inward by `ROI_SHRINK` (default 15 %) on all
-sides.  This eliminates edge pixels that may fall on hair, ear lobes, or
+Each landmark bounding box is shrunk inward by `ROI_SHRINK` (default
+15 %) on all sides.  This eliminates edge pixels that may fall on hair, ear lobes, or
 shadows, which would dilute the pulse signal.
 """
 
-from dataclasses import dataclass, field
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Collection
+import itertools
+import math
+import multiprocessing
+import threading
 import cv2
 import numpy as np
-# NOTE: mediapipe is imported LAZILY inside FaceDetector.__init__(), not here.
+# NOTE: mediapipe is imported LAZILY when a backend is constructed, not here.
 # This lets the FastAPI server boot and serve /health, /metadata, etc.
 # even if mediapipe is not yet installed.  A clear error with install
 # instructions is raised only when you actually try to start a scan.
+from face.backends import Box, FaceBackend, backend_colour_order, create_backend
+from face.tracker import LandmarkTracker
 from utils.logger import get_logger
 from config import (
-    FOREHEAD_LANDMARKS,
-    CHEEK_LEFT_LANDMARKS,
-    CHEEK_RIGHT_LANDMARKS,
-    ROI_SHRINK,
+    FACE_BACKEND,
+    DETECTION_STRIDE,
+    TRACKING_MIN_CONFIDENCE,
+    DETECTION_DOWNSCALE,
+    DETECTION_TARGET_FACE_PX,
+    DETECTION_MIN_SCALE,
+    PIPELINE_DETECT_WORKERS,
+    PIPELINE_DETECT_EXECUTOR,
 )
 
 logger = get_logger("face.detector")
 
+# cvtColor codes for (input order, wanted order)
+_CONVERSIONS = {
+    ("bgr", "rgb"): cv2.COLOR_BGR2RGB,
+    ("rgb", "bgr"): cv2.COLOR_RGB2BGR,
+    ("bgr", "gray"): cv2.COLOR_BGR2GRAY,
+    ("rgb", "gray"): cv2.COLOR_RGB2GRAY,
+}
+
+
+@dataclass(slots=True)
+class ROIStats:
+    """
+    Colour statistics of one skin ROI in one frame.
+
+    Only these few numbers are kept — never the pixels themselves — so a
+    live session holds kilobytes per frame instead of image crops.
+    """
+    mean_rgb: tuple[float, float, float]   # Spatial mean of R, G, B in [0, 255]
+    pixel_count: int                       # Number of pixels averaged
+    bbox: tuple[int, int, int, int]        # (x_min, y_min, x_max, y_max) in pixels
+
 
-@dataclass
+@dataclass(slots=True)
 class FaceROIs:
     """Container returned by the detector for a single frame."""
-    forehead: np.ndarray | None = None   # Cropped BGR image of the forehead
-    cheek_left: np.ndarray | None = None
-    cheek_right: np.ndarray | None = None
-    landmarks: list = field(default_factory=list)  # Raw (x, y) pixel coords
+    forehead: ROIStats | None = None
+    cheek_left: ROIStats | None = None
+    cheek_right: ROIStats | None = None
+    landmarks: np.ndarray | None = None   # (N, 2) int16 pixel coords (x, y)
     face_detected: bool = False
+    tracked: bool = False                 # True if landmarks were propagated, not inferred
+
+    @property
+    def face_bbox(self) -> tuple[int, int, int, int] | None:
+        """Tight (x_min, y_min, x_max, y_max) box around all landmarks."""
+        if self.landmarks is None or len(self.landmarks) == 0:
+            return None
+        x_min, y_min = self.landmarks.min(axis=0).tolist()
+        x_max, y_max = self.landmarks.max(axis=0).tolist()
+        return x_min, y_min, x_max, y_max
+
+    def mapped(self, scale: float, offset: tuple[int, int]) -> "FaceROIs":
+        """
+        Copy with landmarks and ROI boxes moved from a scaled crop into
+        the original frame: `original = point / scale + offset`.  Colour
+        statistics are unchanged.
+        """
+        if scale == 1.0 and offset == (0, 0):
+            return self
+        ox, oy = offset
+
+        def box(stats: ROIStats | None) -> ROIStats | None:
+            if stats is None:
+                return None
+            x_min, y_min, x_max, y_max = stats.bbox
+            return ROIStats(
+                mean_rgb=stats.mean_rgb,
+                pixel_count=stats.pixel_count,
+                bbox=(round(x_min / scale) + ox, round(y_min / scale) + oy,
+                      round(x_max / scale) + ox, round(y_max / scale) + oy),
+            )
+
+        landmarks = None
+        if self.landmarks is not None:
+            landmarks = np.rint(self.landmarks / scale + (ox, oy)).astype(np.int16)
+        return FaceROIs(
+            forehead=box(self.forehead),
+            cheek_left=box(self.cheek_left),
+            cheek_right=box(self.cheek_right),
+            landmarks=landmarks,
+            face_detected=self.face_detected,
+            tracked=self.tracked,
+        )
+
+
+def _input_order(backend_order: str) -> str:
+    # Frames always carry colour (ROIs are sampled from them), so a gray
+    # backend is fed from BGR.
+    return "rgb" if backend_order == "rgb" else "bgr"
+
+
+def preferred_input_order(backend: str = FACE_BACKEND) -> str:
+    """`FaceDetector.input_colour_order` for a backend name, without loading it."""
+    return _input_order(backend_colour_order(backend))
 
 
 class FaceDetector:
     """
-    Wraps MediaPipe FaceMesh and exposes a simple `detect(frame)` method.
+    Wraps a face backend and exposes a simple `detect(frame)` method.
 
     Parameters
     ----------
     max_faces : int
         Maximum number of faces to track simultaneously.  For rPPG we
         only need the closest / largest face, so default is 1.
+    detect_stride : int
+        Run full backend inference at most every N frames and track
+        landmarks in between.  1 disables tracking.
+    min_tracking_confidence : float
+        Tracker inlier ratio below which the backend is re-run early.
+    downscale : bool
+        Run landmark inference on a downscaled copy sized from the last
+        known face box (ROIs are still sampled at full resolution).
+    backend : str | FaceBackend
+        Registry name from `face.backends.BACKENDS`, or a ready instance.
     """
 
-    def __init__(self, max_faces: int = 1):
-        # ── Lazy import of mediapipe ──────────────────────────────────────
-        # Intentionally done here (not at module level) so the rest of the
-        # application can start even when mediapipe is missing.  The error
-        # below lists every available 0.10.x wheel for Python 3.11 / Windows.
-        try:
-            import mediapipe as mp
-        except ImportError:
-            raise ImportError(
-                "\n"
-                "╔══════════════════════════════════════════════════════════════╗\n"
-                "║  mediapipe is not installed.                                ║\n"
-                "║                                                              ║\n"
-                "║  Run ONE of these in your activated .venv:                   ║\n"
-                "║                                                              ║\n"
-                "║    pip install mediapipe                   ← latest          ║\n"
-                "║    pip install mediapipe==0.10.32          ← last 0.10.x     ║\n"
-                "║                                                              ║\n"
-                "║  Known 0.10.x versions (Python 3.11, Windows):              ║\n"
-                "║    0.10.5  0.10.7  0.10.8  0.10.9  0.10.10  0.10.11        ║\n"
-                "║    0.10.13 0.10.14 0.10.18 0.10.20 0.10.21  0.10.30        ║\n"
-                "║    0.10.31 0.10.32                                           ║\n"
-                "║                                                              ║\n"
-                "║  After installing, restart:  python main.py                  ║\n"
-                "╚══════════════════════════════════════════════════════════════╝\n"
-            )
-
-        # MediaPipe FaceMesh solution object
-        self._mp_face_mesh = mp.solutions.face_mesh.FaceMesh(
-            max_num_faces=max_faces,
-            refine_landmarks=True,       # Uses iris landmarks for extra accuracy
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
+    def __init__(
+        self,
+        max_faces: int = 1,
+        detect_stride: int = DETECTION_STRIDE,
+        min_tracking_confidence: float = TRACKING_MIN_CONFIDENCE,
+        downscale: bool = DETECTION_DOWNSCALE,
+        backend: str | FaceBackend = FACE_BACKEND,
+    ):
+        if isinstance(backend, str):
+            backend = create_backend(backend, max_faces=max_faces)
+        self._backend = backend
+
+        self.detect_stride = max(1, detect_stride)
+        self._min_tracking_confidence = min_tracking_confidence
+        self._tracker = LandmarkTracker()
+        self._frames_since_detection = 0
+        self.downscale = downscale
+        self._last_face_size: float | None = None   # Longest face-box side (px)
+        self._small_bgr: np.ndarray | None = None   # Reused resize buffer (input order)
+        self._convert_buf: np.ndarray | None = None # Reused colour-conversion buffer
+        logger.info(
+            "FaceDetector initialised (backend=%s, stride=%d).",
+            self._backend.name, self.detect_stride,
         )
-        logger.info("MediaPipe FaceMesh initialised (max_faces=%d).", max_faces)
+
+    @property
+    def backend_name(self) -> str:
+        return self._backend.name
+
+    @property
+    def input_colour_order(self) -> str:
+        """Frame colour order ("rgb" or "bgr") that avoids a conversion."""
+        return _input_order(self._backend.colour_order)
+
+    @property
+    def last_face_size(self) -> float | None:
+        """Longest face-box side (px) in the last frame, None without a face."""
+        return self._last_face_size
 
     # ── Public API ───────────────────────────────────────────────────────────
 
-    def detect(self, frame_bgr: np.ndarray) -> FaceROIs:
+    def detect(
+        self,
+        frame: np.ndarray,
+        colour_order: str = "bgr",
+        rois: Collection[str] | None = None,
+    ) -> FaceROIs:
         """
-        Run face-mesh inference on a single BGR frame and extract ROIs.
+        Locate the face in a single frame and sample its ROIs.
+
+        Landmarks come from backend inference on keyframes and from the
+        landmark tracker in between (see `detect_stride`).
 
         Parameters
         ----------
-        frame_bgr : np.ndarray
-            The raw webcam frame in OpenCV BGR format (H×W×3, uint8).
+        frame : np.ndarray
+            The raw frame (H×W×3, uint8).
+        colour_order : str
+            "bgr" (OpenCV convention) or "rgb".
+        rois : collection of str, optional
+            ROI names to sample (default: all three).
 
         Returns
         -------
         FaceROIs
-            Dataclass carrying the three ROI crops and a detection flag.
+            Landmarks, per-ROI colour statistics (always RGB) and a
+            detection flag.
         """
-        h, w = frame_bgr.shape[:2]
-
-        # MediaPipe expects RGB input
-        frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        results = self._mp_face_mesh.process(frame_rgb)
-
-        roi = FaceROIs()
-
-        if not results.multi_face_landmarks:
+        gray = None
+        if self.detect_stride > 1:
+            gray = cv2.cvtColor(frame, _CONVERSIONS[(colour_order, "gray")])
+
+            # ── Tracked frame ────────────────────────────────────────────
+            if self._tracker.is_active and self._frames_since_detection < self.detect_stride:
+                tracked = self._tracker.track(gray)
+                if tracked is not None and tracked[1] >= self._min_tracking_confidence:
+                    self._frames_since_detection += 1
+                    self._update_face_size(tracked[0])
+                    roi = self._build_rois(frame, colour_order, tracked[0], rois)
+                    roi.tracked = True
+                    return roi
+
+        # ── Keyframe: full backend inference ──────────────────────────────
+        self._frames_since_detection = 1
+        landmarks = self._infer_landmarks(frame, colour_order)
+
+        if landmarks is None:
             # No face in frame — return empty ROIs
-            return roi
-
-        roi.face_detected = True
+            self._tracker.clear()
+            self._last_face_size = None
+            return FaceROIs()
+
+        self._update_face_size(landmarks)
+        if gray is not None:
+            self._tracker.reset(gray, landmarks)
+        else:
+            self._tracker.clear()   # Stale if the stride is raised again later
+        return self._build_rois(frame, colour_order, landmarks, rois)
+
+    def reset_tracking(self) -> None:
+        """
+        Forget the tracked landmarks, e.g. because the next frame covers a
+        different window of the scene; the next `detect()` runs the backend
+        from scratch.
+        """
+        self._tracker.clear()
+        self._backend.reset()
 
-        # We only use the first (closest) face
-        face_lms = results.multi_face_landmarks[0]
+    def close(self) -> None:
+        """Release backend resources."""
+        self._backend.close()
+        logger.info("Face backend '%s' closed.", self._backend.name)
 
-        # Convert normalised landmarks to pixel coordinates
-        landmarks_px: list[tuple[int, int]] = []
-        for lm in face_lms.landmark:
-            landmarks_px.append((int(lm.x * w), int(lm.y * h)))
-        roi.landmarks = landmarks_px
+    # ── Private helpers ──────────────────────────────────────────────────────
 
-        # Extract the three ROIs
-        roi.forehead = self._extract_roi(frame_bgr, landmarks_px, FOREHEAD_LANDMARKS, h, w)
-        roi.cheek_left = self._extract_roi(frame_bgr, landmarks_px, CHEEK_LEFT_LANDMARKS, h, w)
-        roi.cheek_right = self._extract_roi(frame_bgr, landmarks_px, CHEEK_RIGHT_LANDMARKS, h, w)
+    def _infer_landmarks(self, frame: np.ndarray, colour_order: str) -> np.ndarray | None:
+        """
+        Run the backend on one frame and return (N, 2) float32 pixel
+        coords of the face points, or None if no face was found.
+        """
+        h, w = frame.shape[:2]
+
+        # Optionally shrink the frame before inference.  Backend points are
+        # normalised, so they map back to full resolution for free.
+        scale = self._inference_scale() if self.downscale else 1.0
+        source = frame
+        if scale < 1.0:
+            size = (max(1, round(w * scale)), max(1, round(h * scale)))
+            if self._small_bgr is None or self._small_bgr.shape[1::-1] != size:
+                self._small_bgr = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            cv2.resize(frame, size, dst=self._small_bgr, interpolation=cv2.INTER_LINEAR)
+            source = self._small_bgr
+
+        points = self._backend.locate(self._to_backend_format(source, colour_order))
+        if points is None:
+            return None
 
-        return roi
+        points *= np.array([w, h], dtype=np.float32)
+        return points
 
-    def close(self) -> None:
-        """Release MediaPipe resources."""
-        self._mp_face_mesh.close()
-        logger.info("FaceMesh closed.")
+    def _to_backend_format(self, image: np.ndarray, colour_order: str) -> np.ndarray:
+        """Convert an image into the backend's colour order (reusing a buffer)."""
+        order = self._backend.colour_order
+        if order == colour_order:
+            return image
+        shape = image.shape[:2] if order == "gray" else image.shape
+        if self._convert_buf is None or self._convert_buf.shape != shape:
+            self._convert_buf = np.empty(shape, dtype=np.uint8)
+        return cv2.cvtColor(image, _CONVERSIONS[(colour_order, order)], dst=self._convert_buf)
 
-    # ── Private helpers ──────────────────────────────────────────────────────
+    def _inference_scale(self) -> float:
+        """
+        Pick the downscale factor for the next inference from the face
+        size seen last.  Scales are snapped to 1/8 steps so the resize
+        buffers (and MediaPipe's input size) change rarely.  With no face
+        to go on, the frame is searched at full resolution.
+        """
+        if self._last_face_size is None or self._last_face_size <= 0:
+            return 1.0
+        scale = DETECTION_TARGET_FACE_PX / self._last_face_size
+        scale = min(1.0, max(DETECTION_MIN_SCALE, scale))
+        return math.ceil(scale * 8) / 8
+
+    def _update_face_size(self, landmarks: np.ndarray) -> None:
+        """Remember the longest side of the face box for scale selection."""
+        extent = landmarks.max(axis=0) - landmarks.min(axis=0)
+        self._last_face_size = float(extent.max())
+
+    def _build_rois(
+        self,
+        frame: np.ndarray,
+        colour_order: str,
+        landmarks: np.ndarray,
+        rois: Collection[str] | None = None,
+    ) -> FaceROIs:
+        """Cast float landmarks to compact int16 and sample the selected ROIs."""
+        landmarks_px = landmarks.astype(np.int16)
+        boxes = dict(zip(("forehead", "cheek_left", "cheek_right"),
+                         self._backend.roi_boxes(landmarks_px)))
+        if rois is not None:
+            boxes = {name: box if name in rois else None for name, box in boxes.items()}
+        rgb = colour_order == "rgb"
+
+        return FaceROIs(
+            forehead=self._roi_stats(frame, boxes["forehead"], rgb),
+            cheek_left=self._roi_stats(frame, boxes["cheek_left"], rgb),
+            cheek_right=self._roi_stats(frame, boxes["cheek_right"], rgb),
+            landmarks=landmarks_px,
+            face_detected=True,
+        )
 
     @staticmethod
-    def _extract_roi(
-        frame: np.ndarray,
-        landmarks: list[tuple[int, int]],
-        roi_landmark_indices: list[int],
-        frame_h: int,
-        frame_w: int,
-    ) -> np.ndarray | None:
+    def _roi_stats(frame: np.ndarray, box: Box | None, rgb: bool = False) -> ROIStats | None:
         """
-        Given a set of landmark indices that define the corners of a region,
-        compute the axis-aligned bounding box, shrink it inward, and return
-        the cropped sub-image.
+        Clamp an ROI box to the frame and return the mean colour of the
+        pixels inside it.
 
+        The mean is taken over a *view* of the frame — no crop is copied.
         Returns None if the resulting ROI has zero area (e.g. landmarks
         collapsed to a line).
         """
-        # Gather the (x, y) pixel positions for the chosen landmarks
-        points = [landmarks[i] for i in roi_landmark_indices]
-        xs = [p[0] for p in points]
-        ys = [p[1] for p in points]
-
-        x_min, x_max = min(xs), max(xs)
-        y_min, y_max = min(ys), max(ys)
-
-        # Shrink the box inward to exclude border artefacts
-        roi_w = x_max - x_min
-        roi_h = y_max - y_min
-        shrink_x = int(roi_w * ROI_SHRINK)
-        shrink_y = int(roi_h * ROI_SHRINK)
-
-        x_min += shrink_x
-        x_max -= shrink_x
-        y_min += shrink_y
-        y_max -= shrink_y
+        if box is None:
+            return None
+        frame_h, frame_w = frame.shape[:2]
+        x_min, y_min, x_max, y_max = box
 
         # Clamp to frame boundaries
         x_min = max(0, x_min)
@@ -192,4 +404,165 @@ class FaceDetector:
         if x_max <= x_min or y_max <= y_min:
             return None
 
-        return frame[y_min:y_max, x_min:x_max].copy()
\ No newline at end of file
+        # cv2.mean returns per-channel means in the frame's channel order
+        c0, c1, c2, _ = cv2.mean(frame[y_min:y_max, x_min:x_max])
+        return ROIStats(
+            mean_rgb=(c0, c1, c2) if rgb else (c2, c1, c0),
+            pixel_count=(x_max - x_min) * (y_max - y_min),
+            bbox=(x_min, y_min, x_max, y_max),
+        )
+
+
+# ── Executor workers ─────────────────────────────────────────────────────────
+
+# Detectors per worker thread (or per process — each process has its own
+# copy of this module): one per stream, so concurrent scans sharing a worker
+# keep their own tracking state, plus idle spares whose loaded model the
+# next stream reuses.  FaceDetector is stateful and not safe to share
+# between threads.
+_worker_local = threading.local()
+# Safety net for streams never released: beyond this many live streams a
+# worker closes the least recently used detector
+_MAX_WORKER_STREAMS = 8
+# Idle detectors a worker keeps for the next streams
+_MAX_WORKER_SPARES = 1
+_stream_ids = itertools.count(1)
+
+
+def new_stream_id() -> int:
+    """A fresh `stream` for `detect_in_worker` — one per scan or clip."""
+    return next(_stream_ids)
+
+
+def _worker_state() -> tuple[OrderedDict, list]:
+    """`(detectors by stream, spare detectors)` of the calling worker."""
+    if not hasattr(_worker_local, "detectors"):
+        _worker_local.detectors = OrderedDict()
+        _worker_local.spares = []
+    return _worker_local.detectors, _worker_local.spares
+
+
+def _stream_detector(stream: int | None) -> list:
+    """`[detector, view]` of `stream` in the calling worker, set up on first use."""
+    detectors, spares = _worker_state()
+    entry = detectors.get(stream)
+    if entry is None:
+        entry = detectors[stream] = [spares.pop() if spares else FaceDetector(), None]
+        while len(detectors) > _MAX_WORKER_STREAMS:
+            _, (stale, _) = detectors.popitem(last=False)
+            logger.warning("Closing the detector of an unreleased stream.")
+            stale.close()
+    detectors.move_to_end(stream)
+    return entry
+
+
+def _release_in_worker(stream: int) -> None:
+    """Return `stream`'s detector to the spares, reset to the config defaults."""
+    detectors, spares = _worker_state()
+    entry = detectors.pop(stream, None)
+    if entry is None:
+        return
+    detector = entry[0]
+    if len(spares) >= _MAX_WORKER_SPARES:
+        detector.close()
+        return
+    detector.reset_tracking()
+    detector.detect_stride = max(1, DETECTION_STRIDE)
+    detector.downscale = DETECTION_DOWNSCALE
+    detector._frames_since_detection = 0
+    detector._last_face_size = None
+    spares.append(detector)
+
+
+def detect_in_worker(item: tuple, colour_order: str = "bgr", stream: int | None = None) -> tuple:
+    """
+    Run `FaceDetector.detect` with a detector private to the calling
+    thread or process and to `stream`, created on first use with the
+    config defaults.
+
+    Module-level so it can be submitted to a `ProcessPoolExecutor`.
+
+    Parameters
+    ----------
+    item : (tag, frame[, view[, rois[, settings]]])
+        The tag (e.g. a capture timestamp) is passed through untouched so
+        results can be matched up after a multi-stage pipeline.  `view`
+        is any hashable describing the frame's geometry (crop window,
+        decode scale); when it changes, tracking restarts.  `rois` names
+        the ROIs to sample (default: all).  `settings` is a
+        `(detect_stride, downscale)` pair applied to the worker's
+        detector from this frame on (see api/scheduler.py).
+    stream : int
+        Identifies the frame sequence (`new_stream_id()`), so a long-lived
+        worker never carries tracking or settings over from another scan.
+
+    Returns
+    -------
+    (tag, rois, face_size)   `face_size` is `last_face_size` after this frame.
+    """
+    tag, frame, *rest = item
+    view = rest[0] if rest else None
+    entry = _stream_detector(stream)
+    detector = entry[0]
+    if view is not None and view != entry[1]:
+        entry[1] = view
+        detector.reset_tracking()
+    if len(rest) > 2 and rest[2] is not None:
+        stride, detector.downscale = rest[2]
+        detector.detect_stride = max(1, stride)
+    rois = detector.detect(frame, colour_order, rest[1] if len(rest) > 1 else None)
+    return tag, rois, detector.last_face_size
+
+
+def _warm_worker() -> None:
+    """Lane initializer: load the backend once and keep it as the first spare."""
+    _worker_state()[1].append(FaceDetector())
+
+
+# ── Shared detect lanes ──────────────────────────────────────────────────────
+#
+# Spawning a worker process re-imports OpenCV and the face backend and
+# loads its model — seconds per process.  PIPELINE_DETECT_WORKERS
+# single-worker executors ("lanes") are therefore kept for the server's
+# lifetime and shared by all scans.  A stream is pinned to one lane, so
+# its frames reach one detector in order: the tracker sees every frame
+# and a detection stride of N means one inference per N frames.
+
+_lanes: list[Executor | None] = []
+_lanes_lock = threading.Lock()
+
+
+def _new_lane(index: int) -> Executor:
+    if PIPELINE_DETECT_EXECUTOR == "process":
+        # spawn, not fork: the server is multi-threaded
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_warm_worker)
+    if PIPELINE_DETECT_EXECUTOR == "thread":
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"detect-{index}",
+                                  initializer=_warm_worker)
+    raise ValueError(f"Unknown PIPELINE_DETECT_EXECUTOR '{PIPELINE_DETECT_EXECUTOR}'.")
+
+
+def detect_lane(stream: int) -> Executor:
+    """The shared single-worker executor that runs every frame of `stream`."""
+    with _lanes_lock:
+        if not _lanes:
+            _lanes.extend([None] * max(1, PIPELINE_DETECT_WORKERS))
+        index = stream % len(_lanes)
+        lane = _lanes[index]
+        # A worker that died breaks a process pool for good: start a new one
+        if lane is None or getattr(lane, "_broken", False):
+            lane = _lanes[index] = _new_lane(index)
+        return lane
+
+
+def release_stream(stream: int) -> None:
+    """
+    Free `stream`'s detector in its lane once its last frame has been
+    submitted (the lane runs tasks in order); the detector becomes the
+    lane's spare for the next stream.
+    """
+    try:
+        detect_lane(stream).submit(_release_in_worker, stream)
+    except RuntimeError:
+        pass        # Lane shut down with the interpreter
@@ -0,0 +1,171 @@
+"""
+face/tracker.py — Cheap landmark propagation between detections
+=================================================================
+Full FaceMesh inference is by far the most expensive per-frame step, yet
+during a seated scan the face barely moves between consecutive frames.
+`LandmarkTracker` lets the detector run FaceMesh only on *keyframes* and
+carry the landmark set forward in between.
+
+How it works
+------------
+1. On a keyframe, pick up to `max_features` strong corners
+   (`cv2.goodFeaturesToTrack`) inside the face bounding box — eyes,
+   brows and nostrils track far better than the flat skin the ROIs sit on.
+2. On each following frame, follow those corners with pyramidal
+   Lucas–Kanade optical flow and reject points that fail a
+   forward–backward consistency check.  Only a padded window around the
+   keyframe's face box is handed to OpenCV, so pyramid construction
+   scales with face size rather than frame size.
+3. Fit a similarity transform (translation + rotation + uniform scale)
+   to the surviving points with RANSAC and apply it to *all* landmarks.
+
+The tracker reports a confidence in [0, 1]: the fraction of the
+keyframe's features that are still RANSAC inliers.  The detector falls
+back to full inference as soon as it drops below the configured floor.
+"""
+
+import cv2
+import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger("face.tracker")
+
+# Lucas–Kanade parameters — a small window is enough for the few pixels
+# of motion expected between frames of a seated scan.
+_LK_PARAMS = dict(
+    winSize=(21, 21),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+)
+
+# Forward–backward error (pixels) above which a tracked point is dropped
+_FB_MAX_ERROR = 1.0
+
+# Padding around the keyframe face box (fraction of box size) that bounds
+# the search window for all tracked frames until the next keyframe
+_WINDOW_PAD = 0.3
+
+
+class LandmarkTracker:
+    """
+    Propagates a landmark set from the last keyframe to later frames.
+
+    Parameters
+    ----------
+    max_features : int
+        Maximum number of corners tracked per keyframe.
+    """
+
+    def __init__(self, max_features: int = 60):
+        self._max_features = max_features
+        self._window: tuple[int, int, int, int] | None = None   # (x0, y0, x1, y1)
+        self._prev_gray: np.ndarray | None = None  # Previous frame, cropped to window
+        self._features: np.ndarray | None = None   # (K, 1, 2) float32, window coords
+        self._landmarks: np.ndarray | None = None  # (N, 2) float32 pixel coords
+        self._initial_count = 0
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    @property
+    def is_active(self) -> bool:
+        """True when a keyframe has been set and tracking can continue."""
+        return self._landmarks is not None
+
+    def reset(self, gray: np.ndarray, landmarks: np.ndarray) -> None:
+        """
+        Start tracking from a freshly detected keyframe.
+
+        Parameters
+        ----------
+        gray      : ndarray, shape (H, W)   uint8 grayscale keyframe.
+        landmarks : ndarray, shape (N, 2)   Detected landmark pixel coords.
+        """
+        h, w = gray.shape[:2]
+        x_min, y_min = landmarks.min(axis=0)
+        x_max, y_max = landmarks.max(axis=0)
+        pad_x = (x_max - x_min) * _WINDOW_PAD
+        pad_y = (y_max - y_min) * _WINDOW_PAD
+        x0, y0 = max(0, int(x_min - pad_x)), max(0, int(y_min - pad_y))
+        x1, y1 = min(w, int(x_max + pad_x) + 1), min(h, int(y_max + pad_y) + 1)
+        if x1 - x0 < 8 or y1 - y0 < 8:
+            self.clear()
+            return
+
+        window = gray[y0:y1, x0:x1]
+        features = cv2.goodFeaturesToTrack(
+            window,
+            maxCorners=self._max_features,
+            qualityLevel=0.01,
+            minDistance=5,
+        )
+        if features is None or len(features) < 4:
+            # Too little texture to track reliably — force re-detection.
+            logger.debug("Too few trackable corners on keyframe; tracking disabled.")
+            self.clear()
+            return
+
+        self._window = (x0, y0, x1, y1)
+        self._prev_gray = window
+        self._features = features.astype(np.float32)
+        self._landmarks = landmarks.astype(np.float32)
+        self._initial_count = len(features)
+
+    def track(self, gray: np.ndarray) -> tuple[np.ndarray, float] | None:
+        """
+        Propagate the landmarks onto a new frame.
+
+        Returns
+        -------
+        (landmarks, confidence) or None
+            Updated (N, 2) float32 landmark coords and the inlier ratio,
+            or None if tracking was lost entirely.
+        """
+        if not self.is_active:
+            return None
+
+        x0, y0, x1, y1 = self._window
+        window = gray[y0:y1, x0:x1]
+        if window.shape != self._prev_gray.shape:
+            # Frame size changed under us — cannot continue this track.
+            self.clear()
+            return None
+
+        fwd, st_fwd, _ = cv2.calcOpticalFlowPyrLK(
+            self._prev_gray, window, self._features, None, **_LK_PARAMS
+        )
+        back, st_back, _ = cv2.calcOpticalFlowPyrLK(
+            window, self._prev_gray, fwd, None, **_LK_PARAMS
+        )
+
+        fb_error = np.linalg.norm((self._features - back).reshape(-1, 2), axis=1)
+        good = (st_fwd.ravel() == 1) & (st_back.ravel() == 1) & (fb_error < _FB_MAX_ERROR)
+        if good.sum() < 4:
+            self.clear()
+            return None
+
+        # Fit in full-frame coordinates so the transform applies directly
+        # to the landmarks.
+        offset = np.array([x0, y0], dtype=np.float32)
+        transform, inliers = cv2.estimateAffinePartial2D(
+            self._features[good] + offset, fwd[good] + offset, method=cv2.RANSAC,
+            ransacReprojThreshold=2.0,
+        )
+        if transform is None:
+            self.clear()
+            return None
+
+        inlier_mask = inliers.ravel().astype(bool)
+        self._landmarks = cv2.transform(self._landmarks[None], transform)[0]
+        self._features = fwd[good][inlier_mask]
+        self._prev_gray = window
+
+        confidence = len(self._features) / self._initial_count
+        return self._landmarks, confidence
+
+    def clear(self) -> None:
+        """Drop all tracking state (e.g. after the face is lost)."""
+        self._window = None
+        self._prev_gray = None
+        self._features = None
+        self._landmarks = None
+        self._initial_count = 0
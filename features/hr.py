@@ -18,6 +18,13 @@ The final HR estimate is the *average* of both methods, weighted by a
 simple confidence heuristic (spectral SNR for FFT, peak regularity for
 peak-detection).  If one method fails its weight is set to 0.
 
+Batches
+-------
+`estimate_hr_batch` takes a ``(B, N)`` stack of pulses sharing one
+sampling rate; spectra, harmonic correction and fusion run vectorised
+across the stack.  The single-pulse functions are thin wrappers, so both
+paths give identical numbers.
+
 Clipping
 --------
 The result is hard-clipped to [30, 200] BPM — physiologically
@@ -50,85 +57,90 @@ def estimate_hr_fft(pulse: np.ndarray, fs: float) -> tuple[float, float]:
     hr_bpm     : float   Estimated heart rate in BPM.
     confidence : float   Spectral SNR in [0, 1] (higher = more confident).
     """
+    hr_bpm, snr = estimate_hr_fft_batch(pulse[None, :], fs)
+    return float(hr_bpm[0]), float(snr[0])
+
+
+def estimate_hr_fft_batch(pulses: np.ndarray, fs: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    `estimate_hr_fft` for a stack of equally long pulses, in one pass.
+
+    Parameters
+    ----------
+    pulses : ndarray, shape (B, N)   Bandpass-filtered pulse waveforms.
+    fs     : float                   Common sampling frequency (Hz).
+
+    Returns
+    -------
+    hr_bpm, confidence : ndarray, shape (B,)
+    """
     # Zero-pad to next power of 2 for efficient FFT
-    n_fft = max(1024, 1 << (len(pulse) - 1).bit_length())   # next power of 2 ≥ len
+    n = pulses.shape[-1]
+    n_fft = max(1024, 1 << (n - 1).bit_length())   # next power of 2 ≥ len
     freqs = np.fft.rfftfreq(n_fft, d=1.0 / fs)
-    spectrum = np.abs(np.fft.rfft(pulse, n=n_fft)) ** 2      # power spectrum
+    spectrum = np.abs(np.fft.rfft(pulses, n=n_fft, axis=-1)) ** 2   # power spectra, (B, F)
 
     # Restrict to cardiac band
     cardiac_mask = (freqs >= BP_LOW_HZ) & (freqs <= BP_HIGH_HZ)
+    batch = pulses.shape[0]
     if not cardiac_mask.any():
-        return 72.0, 0.0   # Fallback
-
-    cardiac_power = spectrum.copy()
-    cardiac_power[~cardiac_mask] = 0.0
+        return np.full(batch, 72.0), np.zeros(batch)   # Fallback
 
     # Dominant frequency
-    peak_idx = np.argmax(cardiac_power)
+    rows = np.arange(batch)
+    peak_idx = np.argmax(np.where(cardiac_mask, spectrum, 0.0), axis=-1)
+    peak_power = spectrum[rows, peak_idx]
     dominant_freq = freqs[peak_idx]   # Hz
-    hr_bpm = dominant_freq * 60.0     # convert to BPM
-    
-    # Harmonic/Subharmonic detection and correction
-    # Issue 1: If HR too low (<45 BPM), likely missing beats - check for 2x harmonic
-    if hr_bpm < 45.0:
-        # Check if double frequency (2x) is in cardiac band
-        harmonic_freq = dominant_freq * 2.0
-        if BP_LOW_HZ <= harmonic_freq <= BP_HIGH_HZ:
-            harmonic_idx = np.argmin(np.abs(freqs - harmonic_freq))
-            # If 2x harmonic has significant power (>15% of peak), use it instead
-            if spectrum[harmonic_idx] > 0.15 * spectrum[peak_idx]:
-                dominant_freq = harmonic_freq
-                hr_bpm = dominant_freq * 60.0
-                logger.info("Low HR detected, using 2x harmonic: %.1f Hz (%.1f BPM)", dominant_freq, hr_bpm)
-    
-    # Issue 2: If HR too high (>120 BPM), likely detecting harmonic - check for subharmonic
-    elif hr_bpm > 120.0:
-        # Check if subharmonic (half frequency) is in cardiac band
-        subharmonic_freq = dominant_freq / 2.0
-        if BP_LOW_HZ <= subharmonic_freq <= BP_HIGH_HZ:
-            subharmonic_idx = np.argmin(np.abs(freqs - subharmonic_freq))
-            # If subharmonic has significant power (>20% of peak), use it instead
-            if spectrum[subharmonic_idx] > 0.2 * spectrum[peak_idx]:
-                dominant_freq = subharmonic_freq
-                hr_bpm = dominant_freq * 60.0
-                logger.info("High HR detected, using subharmonic: %.1f Hz (%.1f BPM)", dominant_freq, hr_bpm)
+    df = freqs[1] - freqs[0]
 
-    # Confidence: ratio of peak power to total cardiac-band power (spectral SNR)
-    total_cardiac = spectrum[cardiac_mask].sum()
-    if total_cardiac > 0:
-        snr = spectrum[peak_idx] / total_cardiac   # ∈ (0, 1]
-    else:
-        snr = 0.0
+    def bin_power(freq: np.ndarray) -> np.ndarray:
+        idx = np.clip(np.rint(freq / df).astype(np.intp), 0, len(freqs) - 1)
+        return spectrum[rows, idx]
 
-    hr_bpm = float(np.clip(hr_bpm, HR_MIN_BPM, HR_MAX_BPM))
-    return hr_bpm, float(snr)
+    # Harmonic/Subharmonic detection and correction
+    # Issue 1: If HR too low (<45 BPM), likely missing beats - use the 2x
+    # harmonic if it is in band and carries >15% of the peak power
+    harmonic = dominant_freq * 2.0
+    use_harmonic = (
+        (dominant_freq * 60.0 < 45.0)
+        & (harmonic >= BP_LOW_HZ) & (harmonic <= BP_HIGH_HZ)
+        & (bin_power(harmonic) > 0.15 * peak_power)
+    )
+    # Issue 2: If HR too high (>120 BPM), likely detecting harmonic - use
+    # the subharmonic if it is in band and carries >20% of the peak power
+    subharmonic = dominant_freq / 2.0
+    use_subharmonic = (
+        (dominant_freq * 60.0 > 120.0)
+        & (subharmonic >= BP_LOW_HZ) & (subharmonic <= BP_HIGH_HZ)
+        & (bin_power(subharmonic) > 0.2 * peak_power)
+    )
+    corrected = np.where(use_harmonic, harmonic, np.where(use_subharmonic, subharmonic, dominant_freq))
+    if use_harmonic.any() or use_subharmonic.any():
+        logger.info("HR corrected to harmonic in %d / subharmonic in %d of %d pulses.",
+                    use_harmonic.sum(), use_subharmonic.sum(), batch)
 
+    # Confidence: ratio of peak power to total cardiac-band power (spectral SNR)
+    total_cardiac = spectrum[:, cardiac_mask].sum(axis=-1)
+    snr = np.divide(peak_power, total_cardiac, out=np.zeros(batch), where=total_cardiac > 0)   # ∈ (0, 1]
 
-def estimate_hr_peaks(pulse: np.ndarray, fs: float) -> tuple[float, float]:
-    """
-    Estimate heart rate from inter-peak intervals in the time domain.
+    hr_bpm = np.clip(corrected * 60.0, HR_MIN_BPM, HR_MAX_BPM)
+    return hr_bpm, snr
 
-    Parameters
-    ----------
-    pulse : ndarray, shape (N,)   Bandpass-filtered pulse waveform.
-    fs    : float                 Sampling frequency (Hz).
 
-    Returns
-    -------
-    hr_bpm     : float   Estimated heart rate in BPM.
-    confidence : float   Regularity score in [0, 1].
-    """
+def _find_beats(pulse: np.ndarray, fs: float) -> np.ndarray:
+    """Indices of heartbeat peaks in a filtered pulse."""
     # Adaptive prominence: use 0.35× the signal range for balanced detection
     # High enough to avoid false peaks, low enough to detect real heartbeats
     prominence_threshold = 0.35 * (pulse.max() - pulse.min())
     peaks, _ = find_peaks(pulse, prominence=prominence_threshold, distance=int(fs * 0.3))
     # distance guard: minimum 0.3 s between peaks  →  max 200 BPM
+    return peaks
 
-    if len(peaks) < 2:
-        return 72.0, 0.0   # Fallback — not enough peaks
 
-    # Inter-peak intervals in seconds
-    rr_intervals = np.diff(peaks) / fs   # shape (num_peaks - 1,)
+def _peak_hr(rr_intervals: np.ndarray) -> tuple[float, float]:
+    """(BPM, regularity confidence) from RR intervals in seconds."""
+    if len(rr_intervals) < 1:
+        return 72.0, 0.0   # Fallback — not enough peaks
 
     # Median is more robust than mean to outlier intervals
     median_rr = np.median(rr_intervals)
@@ -143,6 +155,24 @@ def estimate_hr_peaks(pulse: np.ndarray, fs: float) -> tuple[float, float]:
     return hr_bpm, confidence
 
 
+def estimate_hr_peaks(pulse: np.ndarray, fs: float) -> tuple[float, float]:
+    """
+    Estimate heart rate from inter-peak intervals in the time domain.
+
+    Parameters
+    ----------
+    pulse : ndarray, shape (N,)   Bandpass-filtered pulse waveform.
+    fs    : float                 Sampling frequency (Hz).
+
+    Returns
+    -------
+    hr_bpm     : float   Estimated heart rate in BPM.
+    confidence : float   Regularity score in [0, 1].
+    """
+    # Inter-peak intervals in seconds
+    return _peak_hr(np.diff(_find_beats(pulse, fs)) / fs)
+
+
 def estimate_hr(pulse: np.ndarray, fs: float) -> dict:
     """
     Fuse FFT and peak-detection HR estimates into a single best estimate.
@@ -157,33 +187,48 @@ def estimate_hr(pulse: np.ndarray, fs: float) -> dict:
         confidence_peaks: float
         rr_intervals    : list[float]   Raw RR intervals (seconds) from peak detection.
     """
-    hr_fft, conf_fft = estimate_hr_fft(pulse, fs)
-    hr_peaks, conf_peaks = estimate_hr_peaks(pulse, fs)
+    return estimate_hr_batch(pulse[None, :], fs)[0]
 
-    # Also extract RR intervals for HRV (use same parameters as peak detection)
-    prominence_threshold = 0.35 * (pulse.max() - pulse.min())
-    peaks, _ = find_peaks(pulse, prominence=prominence_threshold, distance=int(fs * 0.3))
-    rr_intervals = list(np.diff(peaks) / fs) if len(peaks) >= 2 else []
 
-    # Weighted average
-    total_conf = conf_fft + conf_peaks
-    if total_conf > 0:
-        hr_bpm = (hr_fft * conf_fft + hr_peaks * conf_peaks) / total_conf
-    else:
-        hr_bpm = 72.0   # Default resting HR if both methods fail
+def estimate_hr_batch(pulses: np.ndarray, fs: float) -> list[dict]:
+    """
+    `estimate_hr` for a stack of equally long pulses sampled at `fs`.
 
-    hr_bpm = float(np.clip(hr_bpm, HR_MIN_BPM, HR_MAX_BPM))
+    The spectral estimate and the fusion run vectorised over the batch;
+    peak picking (`scipy.signal.find_peaks`) is inherently per signal.
+    """
+    hr_fft, conf_fft = estimate_hr_fft_batch(pulses, fs)
 
-    logger.info(
-        "HR estimate: %.1f BPM  (FFT=%.1f [conf=%.2f], Peaks=%.1f [conf=%.2f])",
-        hr_bpm, hr_fft, conf_fft, hr_peaks, conf_peaks,
+    # One peak search per pulse gives both the peak HR and the RR
+    # intervals for HRV
+    rr_intervals = [np.diff(_find_beats(pulse, fs)) / fs for pulse in pulses]
+    hr_peaks, conf_peaks = np.array([_peak_hr(rr) for rr in rr_intervals]).reshape(-1, 2).T
+
+    # Weighted average
+    total_conf = conf_fft + conf_peaks
+    hr_bpm = np.divide(
+        hr_fft * conf_fft + hr_peaks * conf_peaks, total_conf,
+        out=np.full(len(pulses), 72.0),   # Default resting HR if both methods fail
+        where=total_conf > 0,
     )
+    hr_bpm = np.clip(hr_bpm, HR_MIN_BPM, HR_MAX_BPM)
 
-    return {
-        "hr_bpm": round(hr_bpm, 1),
-        "hr_fft": round(hr_fft, 1),
-        "hr_peaks": round(hr_peaks, 1),
-        "confidence_fft": round(conf_fft, 3),
-        "confidence_peaks": round(conf_peaks, 3),
-        "rr_intervals": [round(x, 4) for x in rr_intervals],
-    }
+    if len(pulses) == 1:
+        logger.info(
+            "HR estimate: %.1f BPM  (FFT=%.1f [conf=%.2f], Peaks=%.1f [conf=%.2f])",
+            hr_bpm[0], hr_fft[0], conf_fft[0], hr_peaks[0], conf_peaks[0],
+        )
+    else:
+        logger.info("HR estimated for %d pulses (median %.1f BPM).", len(pulses), np.median(hr_bpm))
+
+    results = []
+    for i, rr in enumerate(rr_intervals):
+        results.append({
+            "hr_bpm": round(float(hr_bpm[i]), 1),
+            "hr_fft": round(float(hr_fft[i]), 1),
+            "hr_peaks": round(float(hr_peaks[i]), 1),
+            "confidence_fft": round(float(conf_fft[i]), 3),
+            "confidence_peaks": round(float(conf_peaks[i]), 3),
+            "rr_intervals": [round(float(x), 4) for x in rr],
+        })
+    return results
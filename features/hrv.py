@@ -57,52 +57,76 @@ def compute_hrv(rr_intervals: list[float]) -> dict:
     are available.
     """
     num_beats = len(rr_intervals)
-
-    if num_beats < HRV_MIN_PEAKS:
+    if num_beats < max(HRV_MIN_PEAKS, 2):
         logger.warning(
             "Only %d RR intervals available (need %d for HRV). Returning None values.",
             num_beats,
             HRV_MIN_PEAKS,
         )
-        return {
-            "sdnn_ms": None,
-            "rmssd_ms": None,
-            "pnn50": None,
-            "mean_rr_ms": None,
-            "num_beats": num_beats,
-            "valid": False,
-        }
-
-    # Convert to milliseconds for standard reporting
-    rr_ms = np.array(rr_intervals) * 1000.0   # seconds → ms
-
-    # ── SDNN ──────────────────────────────────────────────────────────────
-    # Simple standard deviation of the NN interval series.
-    sdnn_ms = float(np.std(rr_ms, ddof=1))   # ddof=1 for sample std
-
-    # ── Mean RR ───────────────────────────────────────────────────────────
-    mean_rr_ms = float(np.mean(rr_ms))
-
-    # ── RMSSD ─────────────────────────────────────────────────────────────
-    # Successive differences: ΔRR_i = RR_{i+1} − RR_i
-    successive_diffs = np.diff(rr_ms)                        # shape (N-1,)
-    rmssd_ms = float(np.sqrt(np.mean(successive_diffs ** 2)))
-
-    # ── pNN50 ─────────────────────────────────────────────────────────────
-    # Fraction of successive differences whose absolute value exceeds 50 ms.
-    count_above_50 = np.sum(np.abs(successive_diffs) > 50.0)
-    pnn50 = float(count_above_50 / len(successive_diffs) * 100.0)
-
-    logger.info(
-        "HRV — SDNN=%.1f ms, RMSSD=%.1f ms, pNN50=%.1f%%, mean_RR=%.1f ms (%d beats)",
-        sdnn_ms, rmssd_ms, pnn50, mean_rr_ms, num_beats,
-    )
-
-    return {
-        "sdnn_ms": round(sdnn_ms, 2),
-        "rmssd_ms": round(rmssd_ms, 2),
-        "pnn50": round(pnn50, 2),
-        "mean_rr_ms": round(mean_rr_ms, 2),
-        "num_beats": num_beats,
-        "valid": True,
-    }
+
+    # One code path for the maths: a batch of one
+    result = compute_hrv_batch([rr_intervals])[0]
+    if result["valid"]:
+        logger.info(
+            "HRV — SDNN=%.1f ms, RMSSD=%.1f ms, pNN50=%.1f%%, mean_RR=%.1f ms (%d beats)",
+            result["sdnn_ms"], result["rmssd_ms"], result["pnn50"], result["mean_rr_ms"], num_beats,
+        )
+    return result
+
+
+def compute_hrv_batch(rr_lists: list[list[float]]) -> list[dict]:
+    """
+    `compute_hrv` for many recordings at once.
+
+    The RR series are packed into one NaN-padded ``(B, K)`` matrix and
+    every metric is a single NaN-aware reduction over it, so the cost is
+    a few array passes regardless of the number of recordings.
+
+    Returns
+    -------
+    list[dict]   One `compute_hrv`-style dict per input, in order.
+    """
+    counts = np.array([len(rr) for rr in rr_lists], dtype=np.intp)
+    width = int(counts.max()) if len(counts) else 0
+    rr_ms = np.full((len(rr_lists), max(width, 1)), np.nan)
+    for i, rr in enumerate(rr_lists):
+        rr_ms[i, :len(rr)] = rr
+    rr_ms *= 1000.0   # seconds → ms
+
+    valid = counts >= max(HRV_MIN_PEAKS, 2)
+    results = []
+    if valid.any():
+        # Padding NaNs fall out of every nan-reduction; each row keeps
+        # exactly its own intervals and successive differences.
+        block = rr_ms[valid]
+        n = counts[valid]
+        mean_rr_ms = np.nanmean(block, axis=1)
+        sdnn_ms = np.sqrt(np.nansum((block - mean_rr_ms[:, None]) ** 2, axis=1) / (n - 1))
+        diffs = np.diff(block, axis=1)
+        rmssd_ms = np.sqrt(np.nanmean(diffs ** 2, axis=1))
+        pnn50 = (np.abs(diffs) > 50.0).sum(axis=1) / (n - 1) * 100.0
+        metrics = iter(zip(sdnn_ms, rmssd_ms, pnn50, mean_rr_ms))
+
+    for count, ok in zip(counts.tolist(), valid.tolist()):
+        if not ok:
+            results.append({
+                "sdnn_ms": None,
+                "rmssd_ms": None,
+                "pnn50": None,
+                "mean_rr_ms": None,
+                "num_beats": count,
+                "valid": False,
+            })
+            continue
+        sdnn, rmssd, pnn, mean_rr = next(metrics)
+        results.append({
+            "sdnn_ms": round(float(sdnn), 2),
+            "rmssd_ms": round(float(rmssd), 2),
+            "pnn50": round(float(pnn), 2),
+            "mean_rr_ms": round(float(mean_rr), 2),
+            "num_beats": count,
+            "valid": True,
+        })
+
+    logger.info("HRV computed for %d recordings (%d with enough beats).", len(results), int(valid.sum()))
+    return results
@@ -54,11 +54,11 @@ const api = {
     return res.json();
   },
   
-  async sendFrame(frameData, progress) {
+  async sendFrame(frameData, progress, crop = null) {
     const res = await fetch(`${API_BASE}/scan/frame`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ frame: frameData, progress_percent: progress }),
+      body: JSON.stringify({ frame: frameData, progress_percent: progress, crop }),
     });
     if (!res.ok) throw new Error('Failed to send frame');
     return res.json();
@@ -391,13 +391,25 @@ function Step2_Scanning({ onComplete, onBack }) {
       }
       
       // Start backend scan session
-      await api.startScan('pos', scanDuration);
+      const started = await api.startScan('pos', scanDuration);
       console.log('Scan initialization successful');
       
       const startTime = Date.now();
       const duration = scanDuration * 1000; // Convert to milliseconds
       let lastFrameTime = 0;
-      const FRAME_INTERVAL = 200; // Send frame every 200ms
+      // Upload settings; the server adjusts them to its load and our face size
+      let frameInterval = 200;  // ms between frames
+      let jpegQuality = 0.8;
+      let maxWidth = null;      // Downscale the canvas to this width (null = camera size)
+      let cropRect = null;      // Face region to upload (null = whole frame)
+      const applyHints = (hints) => {
+        if (!hints) return;
+        frameInterval = hints.frame_interval_ms ?? frameInterval;
+        jpegQuality = hints.jpeg_quality ?? jpegQuality;
+        maxWidth = hints.max_width ?? maxWidth;
+        cropRect = hints.crop ?? null;
+      };
+      applyHints(started.hints);
       
       // Track progress and send frames to backend
       pollIntervalRef.current = setInterval(async () => {
@@ -412,21 +424,32 @@ function Step2_Scanning({ onComplete, onBack }) {
           setMessage('⚠️ Face not detected - please stay in frame');
         }
         
-        // Capture and send frame to backend every 200ms
+        // Capture and send a frame every `frameInterval` ms
         const now = Date.now();
-        if (videoRef.current && now - lastFrameTime >= FRAME_INTERVAL) {
+        if (videoRef.current && now - lastFrameTime >= frameInterval) {
           lastFrameTime = now;
           try {
+            const video = videoRef.current;
+            const frameWidth = video.videoWidth;
+            const frameHeight = video.videoHeight;
+            const scale = maxWidth ? Math.min(1, maxWidth / frameWidth) : 1;
+            // Upload only the face region once the server suggests one
+            const x = cropRect ? Math.max(0, Math.min(cropRect.x, frameWidth - 1)) : 0;
+            const y = cropRect ? Math.max(0, Math.min(cropRect.y, frameHeight - 1)) : 0;
+            const w = cropRect ? Math.min(cropRect.width, frameWidth - x) : frameWidth;
+            const h = cropRect ? Math.min(cropRect.height, frameHeight - y) : frameHeight;
             const canvas = document.createElement('canvas');
-            canvas.width = videoRef.current.videoWidth;
-            canvas.height = videoRef.current.videoHeight;
+            canvas.width = Math.max(1, Math.round(w * scale));
+            canvas.height = Math.max(1, Math.round(h * scale));
             const ctx = canvas.getContext('2d');
-            ctx.drawImage(videoRef.current, 0, 0);
-            const frameData = canvas.toDataURL('image/jpeg', 0.8);
+            ctx.drawImage(video, x, y, w, h, 0, 0, canvas.width, canvas.height);
+            const frameData = canvas.toDataURL('image/jpeg', jpegQuality);
+            const crop = { x, y, scale: canvas.width / w, frame_width: frameWidth, frame_height: frameHeight };
             
             // Send frame to backend (non-blocking)
-            api.sendFrame(frameData, currentProgress)
+            api.sendFrame(frameData, currentProgress, crop)
               .then(response => {
+                applyHints(response.hints);
                 console.log(`Frame sent successfully - Progress: ${currentProgress.toFixed(1)}%`);
               })
               .catch(err => {
@@ -491,7 +514,7 @@ function Step2_Scanning({ onComplete, onBack }) {
           // Start polling after a brief delay
           setTimeout(() => pollForResults(), 1000);
         }
-      }, 100); // Update every 100ms for smooth progress
+      }, 50); // Tick every 50ms: smooth progress and a fine-grained frame interval
       
     } catch (err) {
       setScanning(false);
@@ -235,19 +235,33 @@ class BPEstimator:
             {"systolic": float, "diastolic": float, "unit": "mmHg"}
         """
         X = np.array([[hr, rmssd, sdnn, pnn50, age, gender_male, bmi]])
-        preds = self._model.predict(X)[0]   # shape (2,)
+        result = self.predict_batch(X)[0]
+        logger.info("BP estimate: %s/%s mmHg", result["systolic"], result["diastolic"])
+        return result
 
-        systolic = float(np.clip(round(preds[0], 1), 70, 220))
-        diastolic = float(np.clip(round(preds[1], 1), 40, 140))
+    def predict_batch(self, features: np.ndarray) -> list[dict]:
+        """
+        Estimate BP for many subjects in one model call.
 
-        # Enforce systolic > diastolic
-        if systolic <= diastolic:
-            systolic = diastolic + 15.0
+        Parameters
+        ----------
+        features : ndarray, shape (B, 7)
+            Rows of (hr, rmssd, sdnn, pnn50, age, gender_male, bmi) in the
+            units of `predict`.
+
+        Returns
+        -------
+        list[dict]   One `predict`-style dict per row.
+        """
+        preds = self._model.predict(np.asarray(features, dtype=np.float64))   # shape (B, 2)
 
-        logger.info("BP estimate: %s/%s mmHg", systolic, diastolic)
+        systolic = np.clip(np.round(preds[:, 0], 1), 70, 220)
+        diastolic = np.clip(np.round(preds[:, 1], 1), 40, 140)
+
+        # Enforce systolic > diastolic
+        systolic = np.where(systolic <= diastolic, diastolic + 15.0, systolic)
 
-        return {
-            "systolic": systolic,
-            "diastolic": diastolic,
-            "unit": "mmHg",
-        }
+        return [
+            {"systolic": float(sys_), "diastolic": float(dia), "unit": "mmHg"}
+            for sys_, dia in zip(systolic, diastolic)
+        ]
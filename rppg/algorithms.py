@@ -1,9 +1,11 @@
 """
-rppg/algorithms.py — POS & CHROM rPPG signal extraction
-========================================================
-Two well-established chrominance-based algorithms that convert a sequence
-of mean R, G, B values sampled from a skin ROI into a quasi-periodic
-pulse signal.
+rppg/algorithms.py — rPPG signal extraction algorithms
+=======================================================
+Algorithms that convert a sequence of mean R, G, B values sampled from a
+skin ROI into a quasi-periodic pulse signal.  POS and CHROM are described
+in detail below; GREEN, LGI, PBV and ICA are documented at their
+functions.  All are registered in `ALGORITHMS` with a cost class and the
+shortest trace they need.
 
 ───────────────────────────────────────────────────────────────────────
 POS  (Plane-Orthogonal-to-Skin)
@@ -42,10 +44,45 @@ dynamic scaling factor  α  chosen to minimise residual motion noise.
 
     α  = std(X) / std(Y)       (equalise power)
     S  = X − α·Y               (pulse signal)
+
+───────────────────────────────────────────────────────────────────────
+Registry
+───────────────────────────────────────────────────────────────────────
+    name    cost       min trace   method
+    pos     cheap      5 s         projection orthogonal to skin tone
+    chrom   cheap      5 s         chrominance difference
+    green   cheap      5 s         green channel (Verkruysse 2008)
+    lgi     moderate   5 s         skin-tone axis removed (Pilz 2018)
+    pbv     moderate   5 s         pulse-signature projection (de Haan 2014)
+    ica     heavy      10 s        FastICA source separation (Poh 2010)
+
+Use cheap methods on live / high-load paths and the heavier ones for
+offline re-scoring; `benchmark_algorithms.py` measures throughput and
+accuracy on your hardware.  To add a method, implement it with the
+signature `fn(rgb (..., T, 3), normalised=False) -> (..., T)` and add an
+`AlgorithmSpec` to `ALGORITHMS`.
+
+───────────────────────────────────────────────────────────────────────
+Batching
+───────────────────────────────────────────────────────────────────────
+All algorithms accept ``(..., T, 3)`` arrays: a single trace, a stack of
+per-ROI / per-patch traces, or a batch of recordings.  Every step is a
+reduction or broadcast along the trailing axes, so a whole batch runs in
+one pass with no Python loop per signal.  A single float64 work buffer
+is allocated per call and the remaining steps operate on it in place.
+
+Shared normalisation
+--------------------
+The unit-mean buffer is only read after it is built, so callers running
+several algorithms over one trace build it once with
+`normalise_channels()` and pass it with ``normalised=True``.
 """
 
+from dataclasses import dataclass
+from typing import Callable
 import numpy as np
 from utils.logger import get_logger
+from config import BP_LOW_HZ, BP_HIGH_HZ
 
 logger = get_logger("rppg.algorithms")
 
@@ -72,22 +109,70 @@ def extract_mean_rgb(roi: np.ndarray) -> tuple[float, float, float]:
     return float(r_mean), float(g_mean), float(b_mean)
 
 
+# ── Shared helpers ───────────────────────────────────────────────────────────
+
+
+def _unit_mean_channels(rgb_sequence: np.ndarray, name: str) -> np.ndarray:
+    """
+    Validate a ``(..., T, 3)`` colour trace and return a float64 *work
+    buffer* in which every channel has been divided by its temporal mean.
+
+    This is the only full-size allocation made by POS / CHROM — every
+    later step either reduces over this buffer or overwrites it in place.
+    """
+    rgb_sequence = np.asarray(rgb_sequence)
+    if rgb_sequence.ndim < 2 or rgb_sequence.shape[-1] != 3:
+        raise ValueError(
+            f"{name} expects an array of shape (..., T, 3), got {rgb_sequence.shape}."
+        )
+    if rgb_sequence.shape[-2] < 2:
+        raise ValueError(f"{name} requires at least 2 frames.")
+
+    # One copy — always float64 so the in-place maths below is exact.
+    C = np.array(rgb_sequence, dtype=np.float64, copy=True)
+    channel_mean = C.mean(axis=-2, keepdims=True)   # shape (..., 1, 3)
+    channel_mean += 1e-8
+    C /= channel_mean
+    return C
+
+
+def normalise_channels(rgb_sequence: np.ndarray) -> np.ndarray:
+    """
+    The unit-mean float64 buffer every algorithm starts from, for reuse
+    across algorithms via ``normalised=True``.  Treat it as read-only.
+    """
+    return _unit_mean_channels(rgb_sequence, "normalise_channels")
+
+
+def _standardise_(signal: np.ndarray) -> np.ndarray:
+    """Zero-mean, unit-variance along the last (time) axis, in place."""
+    signal -= signal.mean(axis=-1, keepdims=True)
+    std = signal.std(axis=-1, keepdims=True)
+    std += 1e-8
+    signal /= std
+    return signal
+
+
 # ── POS Algorithm ────────────────────────────────────────────────────────────
 
 
-def pos_algorithm(rgb_sequence: np.ndarray) -> np.ndarray:
+def pos_algorithm(rgb_sequence: np.ndarray, normalised: bool = False) -> np.ndarray:
     """
     Plane-Orthogonal-to-Skin (POS) rPPG extraction.
 
     Parameters
     ----------
-    rgb_sequence : ndarray, shape (T, 3)
-        Each row is [R, G, B] mean values for one frame.
+    rgb_sequence : ndarray, shape (..., T, 3)
+        Each row is [R, G, B] mean values for one frame.  Any number of
+        leading batch axes (patches, ROIs, recordings) is allowed and all
+        traces are processed in one vectorised pass.
+    normalised : bool
+        True if `rgb_sequence` comes from `normalise_channels()`.
 
     Returns
     -------
-    pulse : ndarray, shape (T,)
-        Extracted pulse signal (zero-mean, unit variance).
+    pulse : ndarray, shape (..., T)
+        Extracted pulse signal (zero-mean, unit variance per trace).
 
     Notes
     -----
@@ -95,73 +180,70 @@ def pos_algorithm(rgb_sequence: np.ndarray) -> np.ndarray:
     simplicity.  In a streaming application you would tile this into
     overlapping windows of ~10 s.
     """
-    T = rgb_sequence.shape[0]
-    if T < 2:
-        raise ValueError("POS requires at least 2 frames.")
-
-    R = rgb_sequence[:, 0]
-    G = rgb_sequence[:, 1]
-    B = rgb_sequence[:, 2]
-
     # ── Step 1: Normalise each channel to unit mean ──────────────────────
     # Avoids numerical issues when means are very different in magnitude.
-    R_norm = R / (R.mean() + 1e-8)
-    G_norm = G / (G.mean() + 1e-8)
-    B_norm = B / (B.mean() + 1e-8)
-
-    # Stack into (3, T) for vectorised maths
-    C = np.vstack([R_norm, G_norm, B_norm])   # shape (3, T)
+    C = rgb_sequence if normalised else _unit_mean_channels(rgb_sequence, "POS")   # (..., T, 3)
 
     # ── Step 2: Covariance-like matrix  ───────────────────────────────────
     # We use the outer product of the mean colour vector with itself to
     # estimate the static skin-tone direction, following Wang et al.
-    mean_colour = C.mean(axis=1)                          # shape (3,)
-    mean_colour /= (np.linalg.norm(mean_colour) + 1e-8)  # unit vector
+    e1 = C.mean(axis=-2)                                   # shape (..., 3)
+    e1 /= np.linalg.norm(e1, axis=-1, keepdims=True) + 1e-8   # unit vectors
 
     # ── Step 3: Orthonormal basis construction ────────────────────────────
     # e1 is aligned with the mean skin tone.
-    e1 = mean_colour.copy()
-
     # e2 is chosen in the red-green plane, orthogonal to e1.
-    # Start with an arbitrary vector not parallel to e1.
-    arbitrary = np.array([1.0, 0.0, 0.0])
-    if abs(np.dot(e1, arbitrary)) > 0.9:
-        arbitrary = np.array([0.0, 1.0, 0.0])
+    # Start with an arbitrary vector not parallel to e1 — [1, 0, 0] unless
+    # e1 is nearly aligned with red, in which case [0, 1, 0].
+    arbitrary = np.zeros_like(e1)
+    near_red = np.abs(e1[..., 0]) > 0.9
+    arbitrary[..., 0] = ~near_red
+    arbitrary[..., 1] = near_red
 
     # Gram–Schmidt to get e2 ⊥ e1
-    e2 = arbitrary - np.dot(arbitrary, e1) * e1
-    e2 /= (np.linalg.norm(e2) + 1e-8)
+    e2 = arbitrary
+    e2 -= np.einsum("...c,...c->...", arbitrary, e1)[..., None] * e1
+    e2 /= np.linalg.norm(e2, axis=-1, keepdims=True) + 1e-8
 
     # e3 = e1 × e2 — the direction orthogonal to the skin plane
     e3 = np.cross(e1, e2)
-    e3 /= (np.linalg.norm(e3) + 1e-8)
+    e3 /= np.linalg.norm(e3, axis=-1, keepdims=True) + 1e-8
 
     # ── Step 4: Project onto the orthogonal (pulse) direction ─────────────
     # The pulse signal lives along e3 (orthogonal to skin-tone plane)
-    pulse = e3 @ C   # shape (T,)
+    pulse = np.einsum("...tc,...c->...t", C, e3)           # shape (..., T)
 
     # ── Step 5: Normalise ─────────────────────────────────────────────────
-    pulse = (pulse - pulse.mean()) / (pulse.std() + 1e-8)
-
-    return pulse
+    return _standardise_(pulse)
 
 
 # ── CHROM Algorithm ──────────────────────────────────────────────────────────
 
+# Chrominance projections (De Haan & Jeanne coefficients), one column each
+# for X and Y so both channels come out of a single matrix product.
+_CHROM_PROJECTION = np.array([
+    [3.0, 1.5],
+    [-1.5, 1.5],
+    [-1.5, -3.0],
+])
 
-def chrom_algorithm(rgb_sequence: np.ndarray) -> np.ndarray:
+
+def chrom_algorithm(rgb_sequence: np.ndarray, normalised: bool = False) -> np.ndarray:
     """
     Chrominance-based (CHROM) rPPG extraction.
 
     Parameters
     ----------
-    rgb_sequence : ndarray, shape (T, 3)
-        Each row is [R, G, B] mean values for one frame.
+    rgb_sequence : ndarray, shape (..., T, 3)
+        Each row is [R, G, B] mean values for one frame.  Leading batch
+        axes are processed together in one vectorised pass.
+    normalised : bool
+        True if `rgb_sequence` comes from `normalise_channels()`.
 
     Returns
     -------
-    pulse : ndarray, shape (T,)
-        Extracted pulse signal (zero-mean, unit variance).
+    pulse : ndarray, shape (..., T)
+        Extracted pulse signal (zero-mean, unit variance per trace).
 
     Algorithm
     ---------
@@ -173,31 +255,233 @@ def chrom_algorithm(rgb_sequence: np.ndarray) -> np.ndarray:
     4. Pulse signal  S = X − α·Y.
     5. Normalise S to zero-mean, unit-variance.
     """
-    if rgb_sequence.shape[0] < 2:
-        raise ValueError("CHROM requires at least 2 frames.")
-
-    R = rgb_sequence[:, 0]
-    G = rgb_sequence[:, 1]
-    B = rgb_sequence[:, 2]
-
     # Normalise to unit mean
-    R_n = R / (R.mean() + 1e-8)
-    G_n = G / (G.mean() + 1e-8)
-    B_n = B / (B.mean() + 1e-8)
+    C = rgb_sequence if normalised else _unit_mean_channels(rgb_sequence, "CHROM")
 
-    # Chrominance channels (De Haan & Jeanne coefficients)
-    X = 3.0 * R_n - 1.5 * G_n - 1.5 * B_n
-    Y = 1.5 * R_n + 1.5 * G_n - 3.0 * B_n
+    # Chrominance channels — shape (..., T, 2), then split into views
+    XY = C @ _CHROM_PROJECTION
+    X = XY[..., 0]
+    Y = XY[..., 1]
 
     # Dynamic scaling to cancel motion artefacts
-    std_x = X.std() + 1e-8
-    std_y = Y.std() + 1e-8
-    alpha = std_x / std_y
+    alpha = (X.std(axis=-1, keepdims=True) + 1e-8) / (Y.std(axis=-1, keepdims=True) + 1e-8)
+
+    # Pulse = chrominance difference, written over X
+    Y *= alpha
+    X -= Y
+
+    # Normalise (copy out of the strided view so the result is contiguous)
+    return _standardise_(np.ascontiguousarray(X))
+
+
+# ── GREEN ────────────────────────────────────────────────────────────────────
+
+
+def green_algorithm(rgb_sequence: np.ndarray, normalised: bool = False) -> np.ndarray:
+    """
+    Green-channel rPPG (Verkruysse et al., Optics Express, 2008).
 
-    # Pulse = chrominance difference
-    S = X - alpha * Y
+    Haemoglobin absorbs green light most strongly, so the green channel
+    alone carries a usable pulse under steady lighting — but nothing
+    cancels motion or illumination changes.  The signal is inverted so
+    that systole (more blood, less reflected green) is a peak.
 
-    # Normalise
-    S = (S - S.mean()) / (S.std() + 1e-8)
+    Parameters / Returns as for `pos_algorithm`.
+    """
+    C = rgb_sequence if normalised else _unit_mean_channels(rgb_sequence, "GREEN")
+    return _standardise_(-C[..., 1])
+
+
+# ── LGI ──────────────────────────────────────────────────────────────────────
+
+
+def lgi_algorithm(rgb_sequence: np.ndarray, normalised: bool = False) -> np.ndarray:
+    """
+    Local Group Invariance (Pilz et al., CVPR Workshops, 2018).
+
+    The dominant direction of the colour samples (first principal axis of
+    Xᵀ X, i.e. the skin tone under the current illumination) is projected
+    out; the pulse is the green component of what remains:
+
+        S = principal eigenvector of Xᵀ X,  Y = X (I − S Sᵀ),  pulse = Y_G
+
+    One 3 × 3 eigen-decomposition per trace, batched.
+
+    Parameters / Returns as for `pos_algorithm`.
+    """
+    C = rgb_sequence if normalised else _unit_mean_channels(rgb_sequence, "LGI")
+    gram = np.einsum("...tc,...td->...cd", C, C)             # (..., 3, 3)
+    _, vectors = np.linalg.eigh(gram)
+    s = vectors[..., :, -1]                                  # Largest eigenvalue last
+    # Y_G = X_G − (X · s) s_G — only the green column of the projection is needed
+    pulse = C[..., 1] - np.einsum("...tc,...c->...t", C, s) * s[..., None, 1]
+    return _standardise_(pulse)
+
+
+# ── PBV ──────────────────────────────────────────────────────────────────────
+
+# Relative pulse amplitude in normalised R, G, B for skin under white
+# light (de Haan & van Leest, 2014, for a standard RGB camera)
+_PBV_SIGNATURE = np.array([0.33, 0.77, 0.53])
+_PBV_SIGNATURE = _PBV_SIGNATURE / np.linalg.norm(_PBV_SIGNATURE)
+
+
+def pbv_algorithm(rgb_sequence: np.ndarray, normalised: bool = False) -> np.ndarray:
+    """
+    Blood-volume pulse signature (de Haan & van Leest, Physiol. Meas., 2014).
+
+    The pulse changes the three normalised channels in a known ratio,
+    the pulse signature `pbv`.  The projection that keeps a unit response
+    along that signature while minimising total variance (everything
+    else is noise) is  w ∝ Q⁻¹ · pbv,  with  Q  the channel covariance:
+
+        pulse = (C − 1) · Q⁻¹ pbv / (pbvᵀ Q⁻¹ pbv)
+
+    One batched 3 × 3 solve per trace.  The signature is the published
+    camera average; it is not estimated from the trace, where motion
+    would dominate it.
+
+    Parameters / Returns as for `pos_algorithm`.
+    """
+    C = rgb_sequence if normalised else _unit_mean_channels(rgb_sequence, "PBV")
+    centred = C - 1.0                                        # Unit mean → zero mean
+    Q = np.einsum("...tc,...td->...cd", centred, centred)    # (..., 3, 3)
+    Q += 1e-12 * np.eye(3)                                   # Keep flat traces solvable
+    pbv = np.broadcast_to(_PBV_SIGNATURE, Q.shape[:-1])
+    w = np.linalg.solve(Q, pbv[..., None])[..., 0]           # (..., 3)
+    w /= np.einsum("...c,...c->...", pbv, w)[..., None] + 1e-12
+    return _standardise_(np.einsum("...tc,...c->...t", centred, w))
+
+
+# ── ICA ──────────────────────────────────────────────────────────────────────
 
-    return S
+_ICA_MAX_ITER = 200
+_ICA_TOL = 1e-6
+
+
+def _inv_sqrt_sym(M: np.ndarray) -> np.ndarray:
+    """M^(-1/2) for a stack of symmetric positive semi-definite 3 × 3 matrices."""
+    d, E = np.linalg.eigh(M)
+    d = np.maximum(d, 1e-12)
+    return (E * (1.0 / np.sqrt(d))[..., None, :]) @ np.swapaxes(E, -1, -2)
+
+
+def _band_peak_ratio(sources: np.ndarray, fps: float) -> np.ndarray:
+    """Peak / total spectral power of each source in the cardiac band, (..., K)."""
+    n_fft = max(1024, 1 << (sources.shape[-2] - 1).bit_length())
+    freqs = np.fft.rfftfreq(n_fft, d=1.0 / fps)
+    band = (freqs >= BP_LOW_HZ) & (freqs <= BP_HIGH_HZ)
+    power = np.abs(np.fft.rfft(sources, n=n_fft, axis=-2)[..., band, :]) ** 2
+    return power.max(axis=-2) / (power.sum(axis=-2) + 1e-12)
+
+
+def ica_algorithm(rgb_sequence: np.ndarray, normalised: bool = False, fps: float | None = None) -> np.ndarray:
+    """
+    Blind source separation with ICA (Poh et al., Optics Express, 2010).
+
+    The z-scored channels are whitened and unmixed into three independent
+    sources with symmetric FastICA (log-cosh contrast), run for all
+    traces of a batch at once; each trace stops iterating once its own
+    unmixing matrix has converged.  The pulse is the source with the
+    most concentrated cardiac-band spectrum (needs `fps`), or without
+    `fps` the source most correlated with the green channel.  It is
+    sign-aligned with `green_algorithm`.
+
+    Iterative (up to 200 FastICA steps), so an order of magnitude slower
+    than the projection methods, and it needs a longer trace for stable
+    higher-order statistics.
+
+    Parameters / Returns as for `pos_algorithm`, plus
+    fps : float   Sampling rate, used to pick the pulse source.
+    """
+    C = rgb_sequence if normalised else _unit_mean_channels(rgb_sequence, "ICA")
+    batch_shape, n = C.shape[:-2], C.shape[-2]
+    Z = C.reshape(-1, n, 3) - C.reshape(-1, n, 3).mean(axis=-2, keepdims=True)
+    Z /= Z.std(axis=-2, keepdims=True) + 1e-8
+
+    # Symmetric whitening: X = Z K with K = cov^(-1/2)
+    X = Z @ _inv_sqrt_sym(np.einsum("btc,btd->bcd", Z, Z) / n)    # (B, T, 3)
+
+    W = np.tile(np.eye(3), (len(X), 1, 1))
+    active = np.arange(len(X))
+    for _ in range(_ICA_MAX_ITER):
+        Xa, Wa = X[active], W[active]
+        G = np.tanh(Xa @ np.swapaxes(Wa, -1, -2))            # g(sources), (b, T, 3)
+        g_prime = (1.0 - G * G).mean(axis=-2)                # (b, 3)
+        W_new = np.swapaxes(G, -1, -2) @ Xa / n - g_prime[..., None] * Wa
+        W_new = _inv_sqrt_sym(W_new @ np.swapaxes(W_new, -1, -2)) @ W_new
+        W[active] = W_new
+        # A trace has converged when none of its unmixing vectors turned
+        change = np.abs(np.abs(np.einsum("bij,bij->bi", W_new, Wa)) - 1.0).max(axis=-1)
+        active = active[change >= _ICA_TOL]
+        if not len(active):
+            break
+
+    sources = X @ np.swapaxes(W, -1, -2)                     # (B, T, 3), unit variance
+    green_corr = np.einsum("btk,bt->bk", sources, Z[..., 1]) / n
+    score = _band_peak_ratio(sources, fps) if fps else np.abs(green_corr)
+    best = score.argmax(axis=-1)
+    pulse = np.take_along_axis(sources, best[:, None, None], axis=-1)[..., 0]
+    sign = np.sign(np.take_along_axis(green_corr, best[:, None], axis=-1) + 1e-12)
+    return _standardise_(-sign * pulse).reshape(batch_shape + (n,))
+
+
+# ── Registry ─────────────────────────────────────────────────────────────────
+
+# Relative cost classes, cheapest first (see benchmark_algorithms.py):
+#   "cheap"     one fixed projection per sample
+#   "moderate"  plus a 3 × 3 decomposition / solve per trace
+#   "heavy"     iterative per trace
+COST_CLASSES = ("cheap", "moderate", "heavy")
+
+
+@dataclass(frozen=True)
+class AlgorithmSpec:
+    name: str
+    fn: Callable[..., np.ndarray]   # (rgb (..., T, 3), normalised=False[, fps]) → (..., T)
+    cost: str                       # One of COST_CLASSES
+    min_seconds: float              # Shortest valid trace it needs (whole-trace methods)
+    description: str
+    uses_fps: bool = False          # `fn` takes the sampling rate as `fps=`
+
+    def run(self, rgb: np.ndarray, fps: float, normalised: bool = False) -> np.ndarray:
+        """Apply the algorithm, passing `fps` if it uses it."""
+        if self.uses_fps:
+            return self.fn(rgb, normalised=normalised, fps=fps)
+        return self.fn(rgb, normalised=normalised)
+
+    def check_window(self, samples: int, fps: float) -> None:
+        """Raise ValueError if `samples` at `fps` is too short for this algorithm."""
+        if samples < self.min_seconds * fps:
+            raise ValueError(
+                f"{self.name.upper()} needs at least {self.min_seconds:g} s of valid "
+                f"samples, got {samples / fps:.1f} s."
+            )
+
+
+ALGORITHMS = {
+    spec.name: spec for spec in (
+        AlgorithmSpec("pos", pos_algorithm, "cheap", 5.0, "Plane-orthogonal-to-skin projection"),
+        AlgorithmSpec("chrom", chrom_algorithm, "cheap", 5.0, "Chrominance difference X − αY"),
+        AlgorithmSpec("green", green_algorithm, "cheap", 5.0, "Inverted green channel"),
+        AlgorithmSpec("lgi", lgi_algorithm, "moderate", 5.0, "Skin-tone axis projected out (LGI)"),
+        AlgorithmSpec("pbv", pbv_algorithm, "moderate", 5.0, "Blood-volume-pulse signature projection"),
+        AlgorithmSpec("ica", ica_algorithm, "heavy", 10.0, "FastICA source with the cleanest pulse spectrum",
+                      uses_fps=True),
+    )
+}
+
+
+def get_algorithm(name: str) -> AlgorithmSpec:
+    """Look up an algorithm by registry name."""
+    if name not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm '{name}'. Choose from {list(ALGORITHMS)}.")
+    return ALGORITHMS[name]
+
+
+def algorithms_up_to(cost: str) -> list[str]:
+    """Names of the algorithms no more expensive than `cost`."""
+    if cost not in COST_CLASSES:
+        raise ValueError(f"Unknown cost class '{cost}'. Choose from {list(COST_CLASSES)}.")
+    limit = COST_CLASSES.index(cost)
+    return [name for name, spec in ALGORITHMS.items() if COST_CLASSES.index(spec.cost) <= limit]
@@ -0,0 +1,280 @@
+"""
+rppg/archive.py — Append-only archive of raw colour traces
+============================================================
+Vitals are derived from the per-frame ROI colour means; keeping those
+means lets any later algorithm change be replayed over past scans
+instead of asking users to rescan.  A scan's `RawTrace` holds:
+
+    timestamps   (T,)       float32   seconds since the first frame
+    samples      (T, R, 3)  float16 | float32   mean R, G, B per ROI
+                            (NaN where the ROI was unavailable)
+    face_mask    (T,)       bool      face detected in the frame
+
+with R = 3 ROIs in `ROI_NAMES` order.  That is 24 bytes per frame in
+float16 — about 16 kB for a 45 s scan at 15 FPS.
+
+On-disk layout
+--------------
+    segment-000000.bin   Traces appended back to back.  Each trace is
+                         four 16-byte-aligned columns: baseline (R, 3)
+                         float32, timestamps, samples, face mask.
+    index.bin            One fixed-size `INDEX_DTYPE` record per trace
+                         (segment, offset, frames, …); the trace id is
+                         the record number.
+
+A segment is closed once it reaches TRACE_SEGMENT_BYTES.  Data is written
+before its index record, so a crash can leave unreferenced bytes in a
+segment but never an index entry pointing at missing data.
+
+float16 keeps only ~3 significant digits, far too few for raw 0–255
+means whose pulse component is a fraction of a level.  float16 samples
+therefore store the deviation from the trace's per-ROI mean colour (the
+baseline), where the precision is ~0.01 levels; float32 samples are
+stored as-is with a zero baseline.
+
+Reading
+-------
+Segments and the index are memory-mapped, so `load()` returns views into
+the page cache with no copy and no parsing — replaying thousands of
+scans costs one sequential read of the bytes actually touched.  Only
+`RawTrace.rgb` (for float16) and `mean_rgb()` allocate.
+
+One process appends at a time; any number may read.
+"""
+
+import os
+import threading
+import warnings
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+import numpy as np
+from utils.logger import get_logger
+from config import TRACE_ARCHIVE_DIR, TRACE_ARCHIVE_DTYPE, TRACE_SEGMENT_BYTES
+
+logger = get_logger("rppg.archive")
+
+# ROI order of the middle axis of `RawTrace.samples`
+ROI_NAMES = ("forehead", "cheek_left", "cheek_right")
+
+INDEX_DTYPE = np.dtype([
+    ("segment",    "<u4"),
+    ("frames",     "<u4"),
+    ("offset",     "<u8"),      # Byte offset of the trace in its segment
+    ("started_at", "<f8"),      # Unix time of the first frame
+    ("fps",        "<f4"),      # Sampling rate the scan was analysed at
+    ("rois",       "u1"),
+    ("dtype",      "u1"),       # Index into _SAMPLE_DTYPES
+    ("reserved",   "V2"),
+])
+
+_SAMPLE_DTYPES = (np.dtype("<f2"), np.dtype("<f4"))
+
+_ALIGN = 16
+
+
+def _aligned(n: int) -> int:
+    return -(-n // _ALIGN) * _ALIGN
+
+
+@dataclass
+class RawTrace:
+    """One scan's colour trace (arrays may be read-only archive views)."""
+    timestamps: np.ndarray      # (T,) float32, seconds since the first frame
+    samples: np.ndarray         # (T, R, 3) float16 / float32, minus `baseline`
+    baseline: np.ndarray        # (R, 3) float32
+    face_mask: np.ndarray       # (T,) bool
+    fps: float
+    started_at: float           # Unix time of the first frame
+
+    @property
+    def frames(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """(T, R, 3) float32 mean colours — a view when stored as float32."""
+        if self.samples.dtype == np.float32 and not self.baseline.any():
+            return self.samples
+        return self.samples.astype(np.float32) + self.baseline
+
+    def mean_rgb(self) -> np.ndarray:
+        """
+        (T, 3) float64 average over the available ROIs per frame, NaN
+        where none was — the sample `RPPGPipeline.add_frame` buffers.
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)   # All-NaN frames
+            return np.nanmean(self.rgb.astype(np.float64), axis=1)
+
+
+class TraceArchive:
+    """
+    Parameters
+    ----------
+    directory     : str   Holds the segments and the index (created if missing).
+    sample_dtype  : str   "float16" or "float32" for newly appended traces.
+    segment_bytes : int   Size at which a new segment is started.
+    """
+
+    def __init__(
+        self,
+        directory: str = TRACE_ARCHIVE_DIR,
+        sample_dtype: str = TRACE_ARCHIVE_DTYPE,
+        segment_bytes: int = TRACE_SEGMENT_BYTES,
+    ):
+        dtype = np.dtype(sample_dtype).newbyteorder("<")
+        if dtype not in _SAMPLE_DTYPES:
+            raise ValueError(f"sample_dtype must be float16 or float32, got '{sample_dtype}'.")
+        os.makedirs(directory, exist_ok=True)
+        self._dir = directory
+        self._dtype_code = _SAMPLE_DTYPES.index(dtype)
+        self._segment_bytes = segment_bytes
+        self._index_path = os.path.join(directory, "index.bin")
+        self._lock = threading.Lock()
+        self._maps: dict[int, np.memmap] = {}
+        self._index: np.ndarray = np.empty(0, INDEX_DTYPE)
+
+        # Drop a partially written trailing index record
+        size = os.path.getsize(self._index_path) if os.path.exists(self._index_path) else 0
+        if size % INDEX_DTYPE.itemsize:
+            with open(self._index_path, "r+b") as f:
+                f.truncate(size - size % INDEX_DTYPE.itemsize)
+            logger.warning("Trace index had a partial record; truncated.")
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self.index())
+
+    def index(self) -> np.ndarray:
+        """Memory-mapped `INDEX_DTYPE` records of every archived trace."""
+        with self._lock:
+            return self._refresh_index()
+
+    def append(self, trace: RawTrace) -> int:
+        """Write a trace; returns its id."""
+        rgb = np.asarray(trace.rgb, dtype=np.float32)
+        frames, rois = rgb.shape[:2]
+        dtype = _SAMPLE_DTYPES[self._dtype_code]
+        if dtype == np.float16:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)   # All-NaN ROIs
+                baseline = np.nan_to_num(np.nanmean(rgb, axis=0)).astype(np.float32)
+            samples = (rgb - baseline).astype(dtype)
+        else:
+            baseline = np.zeros((rois, 3), np.float32)
+            samples = rgb
+        columns = (
+            baseline,
+            np.asarray(trace.timestamps, dtype="<f4"),
+            samples,
+            np.asarray(trace.face_mask, dtype=np.uint8),
+        )
+        blob = bytearray()
+        for column in columns:
+            data = np.ascontiguousarray(column).tobytes()
+            blob += data + bytes(_aligned(len(data)) - len(data))
+
+        with self._lock:
+            index = self._refresh_index()
+            segment = int(index["segment"][-1]) if len(index) else 0
+            offset = _aligned(self._segment_size(segment))
+            if offset and offset + len(blob) > self._segment_bytes:
+                segment, offset = segment + 1, 0
+            with open(self._segment_path(segment), "ab") as f:
+                f.write(bytes(offset - f.tell()))    # Alignment padding
+                f.write(blob)
+
+            record = np.zeros(1, INDEX_DTYPE)
+            for name, value in (("segment", segment), ("frames", frames), ("offset", offset),
+                                ("started_at", trace.started_at), ("fps", trace.fps),
+                                ("rois", rois), ("dtype", self._dtype_code)):
+                record[name] = value
+            with open(self._index_path, "ab") as f:
+                f.write(record.tobytes())
+            trace_id = len(index)
+
+        logger.info("Archived trace %d (%d frames, %d bytes).", trace_id, frames, len(blob))
+        return trace_id
+
+    def load(self, trace_id: int) -> RawTrace:
+        """
+        A trace as zero-copy read-only views into the archive.
+
+        Raises
+        ------
+        KeyError  If there is no trace with this id.
+        """
+        with self._lock:
+            index = self._refresh_index()
+            if not 0 <= trace_id < len(index):
+                raise KeyError(f"No archived trace {trace_id}.")
+            entry = index[trace_id]
+            frames, rois = int(entry["frames"]), int(entry["rois"])
+            dtype = _SAMPLE_DTYPES[entry["dtype"]]
+            shapes = ((np.float32, (rois, 3)), (np.float32, (frames,)),
+                      (dtype, (frames, rois, 3)), (np.uint8, (frames,)))
+            size = sum(_aligned(np.dtype(d).itemsize * int(np.prod(s))) for d, s in shapes)
+            data = self._segment_map(int(entry["segment"]), int(entry["offset"]) + size)
+
+        views = []
+        position = int(entry["offset"])
+        for column_dtype, shape in shapes:
+            nbytes = np.dtype(column_dtype).itemsize * int(np.prod(shape))
+            views.append(data[position:position + nbytes].view(column_dtype).reshape(shape))
+            position += _aligned(nbytes)
+        baseline, timestamps, samples, mask = views
+        return RawTrace(
+            timestamps=timestamps,
+            samples=samples,
+            baseline=baseline,
+            face_mask=mask.view(bool),
+            fps=float(entry["fps"]),
+            started_at=float(entry["started_at"]),
+        )
+
+    def iter_traces(self, ids: Iterable[int] | None = None) -> Iterator[tuple[int, RawTrace]]:
+        """(id, trace) for the given ids, or every trace in archive order."""
+        for trace_id in (range(len(self)) if ids is None else ids):
+            yield trace_id, self.load(trace_id)
+
+    # ── Private ──────────────────────────────────────────────────────────────
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self._dir, f"segment-{segment:06d}.bin")
+
+    def _segment_size(self, segment: int) -> int:
+        path = self._segment_path(segment)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def _refresh_index(self) -> np.ndarray:
+        """Re-map the index if other appends have grown it."""
+        size = os.path.getsize(self._index_path) if os.path.exists(self._index_path) else 0
+        count = size // INDEX_DTYPE.itemsize
+        if count != len(self._index):
+            self._index = (np.memmap(self._index_path, dtype=INDEX_DTYPE, mode="r", shape=(count,))
+                           if count else np.empty(0, INDEX_DTYPE))
+        return self._index
+
+    def _segment_map(self, segment: int, needed: int) -> np.memmap:
+        """Byte view of a segment covering at least `needed` bytes."""
+        data = self._maps.get(segment)
+        if data is None or len(data) < needed:
+            data = np.memmap(self._segment_path(segment), dtype=np.uint8, mode="r")
+            self._maps[segment] = data
+        return data
+
+
+# ── Shared instance ──────────────────────────────────────────────────────────
+
+_shared: TraceArchive | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_archive() -> TraceArchive:
+    """Process-wide archive that scans append to."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = TraceArchive()
+        return _shared
@@ -0,0 +1,191 @@
+"""
+rppg/monitor.py — Early abort of scans that cannot succeed
+===========================================================
+A scan with the face mostly out of frame, or with no pulse in the
+signal, would otherwise run its full duration — every frame captured,
+uploaded, decoded and detected — only for `extract_pulse()` to fail at
+the end.  `ScanMonitor` watches the pipeline frame by frame, at a cost
+of a few scalar updates per frame plus one short spectrum per second,
+and raises `ScanAborted` with an actionable reason as soon as the scan
+is bound to fail:
+
+* **Usable time** — a frame is usable when it has a face sample and the
+  face moved less than SCAN_MAX_MOTION face-widths per second.  Once
+  the usable post-warm-up time plus all the time left cannot reach
+  SCAN_MIN_USABLE_FRACTION of the scan's signal target, the scan aborts,
+  blaming whichever of face absence or motion cost more frames.
+* **Gaps** — a run of unusable frames longer than SCAN_MAX_GAP_SECONDS.
+* **Spectral SNR** — every second the last ROI_QUALITY_WINDOW_SECONDS of
+  the averaged trace is projected with ROI_QUALITY_ALGORITHM and scored
+  (rppg/roi_quality.py).  Single windows of pure noise often score as
+  well as a weak pulse, so the test is on the median of the last
+  SCAN_SNR_PATIENCE_SECONDS of scores: below SCAN_MIN_SNR_DB there is no
+  pulse to find (noise has a median near −3.4 dB, a usable pulse > 0 dB).
+
+The monitor only observes — the pipeline's buffers are never changed.
+"""
+
+from collections import deque
+import numpy as np
+from face.detector import FaceROIs
+from rppg.algorithms import get_algorithm
+from rppg.filters import bandpass_filter
+from rppg.pipeline import RPPGPipeline, signal_target
+from rppg.roi_quality import spectral_snr
+from utils.logger import get_logger
+from config import (
+    ROI_QUALITY_ALGORITHM,
+    ROI_QUALITY_WINDOW_SECONDS,
+    SCAN_MIN_USABLE_FRACTION,
+    SCAN_MAX_GAP_SECONDS,
+    SCAN_MAX_MOTION,
+    SCAN_MIN_SNR_DB,
+    SCAN_SNR_PATIENCE_SECONDS,
+)
+
+logger = get_logger("rppg.monitor")
+
+# Seconds between rolling-SNR evaluations
+_SNR_INTERVAL = 1.0
+
+
+class ScanAborted(ValueError):
+    """The scan cannot succeed; `reason` is a short machine-readable code."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class ScanMonitor:
+    """
+    Parameters
+    ----------
+    duration_seconds : float   The scan's maximum duration (None if unknown,
+                               e.g. an upload: no usable-time check).
+    algorithm        : str     The scan's algorithm (its `min_seconds`
+                               is a floor on the usable time needed).
+    """
+
+    def __init__(self, duration_seconds: float | None, algorithm: str = "pos"):
+        self._duration = duration_seconds
+        self._required = get_algorithm(algorithm).min_seconds
+        if duration_seconds is not None:
+            self._required = max(self._required,
+                                 SCAN_MIN_USABLE_FRACTION * signal_target(duration_seconds))
+        self._spec = get_algorithm(ROI_QUALITY_ALGORITHM)
+
+        self._last_time: float | None = None
+        self._last_centre: np.ndarray | None = None
+        self._usable = 0.0          # Post-warm-up seconds, by cause below
+        self._no_face = 0.0
+        self._moving = 0.0
+        self._gap = 0.0             # Current run of unusable time
+        self._longest_gap = 0.0
+        self._frames = 0
+        self._snr_db: float | None = None
+        self._snr_history: deque[float] = deque(maxlen=max(1, round(SCAN_SNR_PATIENCE_SECONDS / _SNR_INTERVAL)))
+        self._next_snr = 0.0
+
+    def update(self, pipeline: RPPGPipeline, rois: FaceROIs) -> None:
+        """
+        Account for the frame just added to `pipeline`.
+
+        Raises
+        ------
+        ScanAborted  If the scan can no longer succeed.
+        """
+        now = pipeline.elapsed_seconds
+        dt = 0.0 if self._last_time is None else max(now - self._last_time, 0.0)
+        self._last_time = now
+        self._frames += 1
+
+        # ── Motion: face-box centre speed in face widths per second ─────
+        speed = 0.0
+        box = rois.face_bbox if rois.face_detected else None
+        if box is not None:
+            centre = np.array([(box[0] + box[2]) / 2.0, (box[1] + box[3]) / 2.0])
+            size = max(box[2] - box[0], box[3] - box[1], 1)
+            if self._last_centre is not None and dt > 0:
+                speed = float(np.hypot(*(centre - self._last_centre))) / size / dt
+            self._last_centre = centre
+        else:
+            self._last_centre = None
+
+        if pipeline.warmup_seconds is None:
+            return
+
+        # ── Usable time and gaps ────────────────────────────────────────
+        _, last = pipeline.recent_samples(0.0)
+        has_sample = len(last) > 0 and not np.isnan(last[-1]).any()
+        if not has_sample:
+            self._no_face += dt
+        elif speed > SCAN_MAX_MOTION:
+            self._moving += dt
+        else:
+            self._usable += dt
+            self._gap = 0.0
+        if not has_sample or speed > SCAN_MAX_MOTION:
+            self._gap += dt
+            self._longest_gap = max(self._longest_gap, self._gap)
+
+        if self._gap > SCAN_MAX_GAP_SECONDS:
+            face = not has_sample
+            self._abort(
+                "face_lost" if face else "motion",
+                f"{'Face lost' if face else 'Too much movement'} for {self._gap:.0f} s. "
+                + ("Keep your face in the frame." if face else "Hold still during the scan."),
+            )
+
+        remaining = float("inf") if self._duration is None else max(self._duration - now, 0.0)
+        if self._usable + remaining < self._required:
+            face = self._no_face >= self._moving
+            lost = self._no_face if face else self._moving
+            self._abort(
+                "face_absent" if face else "motion",
+                f"Only {self._usable:.0f} s of usable signal is possible, "
+                f"{self._required:.0f} s needed: "
+                + (f"no face for {lost:.0f} s. Keep your face centred and well lit."
+                   if face else f"moving for {lost:.0f} s. Hold still during the scan."),
+            )
+
+        # ── Rolling spectral SNR ────────────────────────────────────────
+        if now >= self._next_snr and pipeline.signal_seconds >= ROI_QUALITY_WINDOW_SECONDS:
+            self._next_snr = now + _SNR_INTERVAL
+            self._update_snr(pipeline)
+
+    def summary(self) -> dict:
+        """Quality counters of the scan so far, for the result payload."""
+        total = self._usable + self._no_face + self._moving
+        return {
+            "usable_seconds": round(self._usable, 1),
+            "no_face_seconds": round(self._no_face, 1),
+            "motion_seconds": round(self._moving, 1),
+            "usable_ratio": round(self._usable / total, 3) if total > 0 else None,
+            "longest_gap_seconds": round(self._longest_gap, 1),
+            "snr_db": None if self._snr_db is None else round(self._snr_db, 1),
+        }
+
+    # ── Private ──────────────────────────────────────────────────────────────
+
+    def _update_snr(self, pipeline: RPPGPipeline) -> None:
+        times, samples = pipeline.recent_samples(ROI_QUALITY_WINDOW_SECONDS)
+        valid = ~np.isnan(samples).any(axis=1)
+        if valid.sum() < 0.8 * len(samples) or times[-1] <= times[0]:
+            return
+        fps = (len(times) - 1) / (times[-1] - times[0])       # Measured, not nominal
+        pulse = bandpass_filter(self._spec.run(samples[valid], fps), fps)
+        self._snr_db = float(spectral_snr(pulse, fps))
+        self._snr_history.append(self._snr_db)
+
+        median = float(np.median(self._snr_history))
+        if len(self._snr_history) == self._snr_history.maxlen and median < SCAN_MIN_SNR_DB:
+            self._abort(
+                "no_pulse",
+                f"No pulse found in the signal for {SCAN_SNR_PATIENCE_SECONDS:.0f} s "
+                f"(median SNR {median:.1f} dB). Improve the lighting on your face and hold still.",
+            )
+
+    def _abort(self, reason: str, message: str) -> None:
+        logger.warning("Scan aborted after %d frames (%s): %s", self._frames, reason, message)
+        raise ScanAborted(reason, message)
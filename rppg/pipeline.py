@@ -3,29 +3,67 @@ rppg/pipeline.py — End-to-end rPPG → Heart Rate pipeline
 =========================================================
 Orchestrates the full signal-processing chain:
 
-    ROI crops  →  mean RGB  →  rPPG algorithm  →  bandpass filter
-               →  peak detection  →  Heart Rate (BPM)
+    ROI mean RGB  →  rPPG algorithm  →  bandpass filter
+                 →  peak detection  →  Heart Rate (BPM)
 
 This module accumulates per-frame RGB samples into a growing buffer,
 and once enough data is collected (controlled by `SCAN_DURATION_SECONDS`)
 it runs the algorithm and returns a clean pulse waveform ready for
 downstream HRV and HR analysis.
+
+Alongside the averaged samples it keeps each ROI's mean colour, the
+frame timestamps and the face-presence mask; `raw_trace()` packages
+them for the trace archive (rppg/archive.py), and `from_trace()` rebuilds
+a pipeline from an archived trace for re-analysis.
+
+Warm-up
+-------
+The first frames are discarded while the face settles and the camera's
+auto-exposure converges.  The warm-up is measured on the frame
+timestamps — frame counts mean different durations at 15 FPS capture
+and ~5 FPS uploads — and lasts WARMUP_MIN_SECONDS to WARMUP_MAX_SECONDS.
+With WARMUP_ADAPTIVE it ends at the start of the first trailing window
+of WARMUP_WINDOW_SECONDS whose brightness trend (least-squares slope) is
+below WARMUP_MAX_DRIFT of the mean per second: exposure ramps are
+monotonic, while the pulse is a ~0.2 % oscillation with almost no trend
+over a window.
+
+With ROI_QUALITY_ENABLED each ROI is scored as the scan runs and poor
+ROIs are pruned (`active_rois`); the pulse is then an SNR-weighted
+combination of per-ROI pulses — see rppg/roi_quality.py.
 """
 
+import bisect
+import time
 import numpy as np
 from face.detector import FaceROIs
-from rppg.algorithms import extract_mean_rgb, pos_algorithm, chrom_algorithm
+from rppg.archive import RawTrace, ROI_NAMES
+from rppg.algorithms import ALGORITHMS, get_algorithm   # ALGORITHMS re-exported
 from rppg.filters import bandpass_filter
-from config import CAMERA_FPS, WARMUP_FRAMES
+from rppg.roi_quality import ROIQuality, fuse_pulses
+from config import (
+    CAMERA_FPS,
+    WARMUP_MIN_SECONDS,
+    WARMUP_MAX_SECONDS,
+    WARMUP_ADAPTIVE,
+    WARMUP_WINDOW_SECONDS,
+    WARMUP_MAX_DRIFT,
+    ROI_QUALITY_ENABLED,
+    ROI_QUALITY_INTERVAL_SECONDS,
+    ROI_QUALITY_WINDOW_SECONDS,
+)
 from utils.logger import get_logger
 
 logger = get_logger("rppg.pipeline")
 
-# Supported algorithm names → callable
-_ALGORITHMS = {
-    "pos":   pos_algorithm,
-    "chrom": chrom_algorithm,
-}
+
+def signal_target(duration_seconds: float) -> float:
+    """
+    Post-warm-up signal a scan of `duration_seconds` collects: what it
+    held with the longest warm-up.  A scan stops once it has this much,
+    so an early warm-up end shortens the scan, not the signal.
+    """
+    return max(duration_seconds - WARMUP_MAX_SECONDS, 0.0)
 
 
 class RPPGPipeline:
@@ -36,58 +74,145 @@ class RPPGPipeline:
     Parameters
     ----------
     fps       : float   Camera sampling rate (frames per second).
-    algorithm : str     One of 'pos' or 'chrom'.
+    algorithm : str     A name in `ALGORITHMS` (rppg/algorithms.py).
     """
 
     def __init__(self, fps: float = CAMERA_FPS, algorithm: str = "pos"):
-        if algorithm not in _ALGORITHMS:
-            raise ValueError(
-                f"Unknown algorithm '{algorithm}'. Choose from {list(_ALGORITHMS)}."
-            )
         self._fps = fps
-        self._algo_fn = _ALGORITHMS[algorithm]
-        self._algo_name = algorithm
+        self._spec = get_algorithm(algorithm)     # Raises ValueError if unknown
 
         # Ring buffer: list of (R, G, B) tuples, one per frame
         self._rgb_buffer: list[tuple[float, float, float]] = []
         self._frame_count = 0   # Total frames seen (including warmup)
+        self._warmup_end: int | None = None   # First post-warmup frame, once known
+
+        # Raw trace for the archive: per-ROI means (ROI_NAMES order, NaN if
+        # missing), frame times and face presence, one entry per frame
+        self._roi_buffer: list[tuple[float, ...]] = []
+        self._timestamps: list[float] = []
+        self._face_mask: list[bool] = []
+        self._started_at: float | None = None     # Unix time of the first frame
+
+        # Per-ROI quality scoring / pruning (None when disabled)
+        self._quality = ROIQuality() if ROI_QUALITY_ENABLED else None
+        self._next_score: float | None = None     # Capture time of the next ROI scoring
         logger.info("RPPGPipeline created — algo=%s, fps=%.1f", algorithm, fps)
 
     # ── Public API ───────────────────────────────────────────────────────────
 
-    def add_frame(self, rois: FaceROIs) -> None:
+    @property
+    def algorithm(self) -> str:
+        return self._spec.name
+
+    @property
+    def fps(self) -> float:
+        """Sampling rate used by `extract_pulse()`."""
+        return self._fps
+
+    @fps.setter
+    def fps(self, value: float) -> None:
+        # Frame sources with a variable rate (uploaded frames, dropped
+        # frames) set the measured rate once the scan is over.
+        if value <= 0:
+            raise ValueError(f"fps must be positive, got {value}.")
+        self._fps = float(value)
+
+    @property
+    def warmup_frames(self) -> int:
+        """Frames discarded as warm-up (every frame so far until it ends)."""
+        return len(self._rgb_buffer) if self._warmup_end is None else self._warmup_end
+
+    @property
+    def warmup_seconds(self) -> float | None:
+        """Length of the warm-up, None while it is still running."""
+        if self._warmup_end is None:
+            return None
+        return self._timestamps[self._warmup_end] - self._timestamps[0]
+
+    @property
+    def signal_seconds(self) -> float:
+        """Capture time covered since the warm-up ended."""
+        if self._warmup_end is None:
+            return 0.0
+        return self._timestamps[-1] - self._timestamps[self._warmup_end]
+
+    @property
+    def elapsed_seconds(self) -> float:
+        """Capture time covered so far, warm-up included."""
+        return self._timestamps[-1] - self._timestamps[0] if self._timestamps else 0.0
+
+    def recent_samples(self, seconds: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        `(times, samples)` of the post-warm-up frames in the last `seconds`:
+        timestamps (N,) and averaged colours (N, 3), NaN rows included.
+        """
+        start = bisect.bisect_left(self._timestamps, self._timestamps[-1] - seconds) if self._timestamps else 0
+        start = max(start, self.warmup_frames)
+        return (np.array(self._timestamps[start:], dtype=np.float64),
+                np.array(self._rgb_buffer[start:], dtype=np.float64).reshape(-1, 3))
+
+    @property
+    def active_rois(self) -> tuple[str, ...]:
+        """ROIs still worth sampling — pass to `FaceDetector.detect(rois=…)`."""
+        return self._quality.active if self._quality is not None else ROI_NAMES
+
+    def roi_quality(self) -> dict | None:
+        """Per-ROI SNR, pruning and fusion weights (None when disabled)."""
+        return self._quality.summary() if self._quality is not None else None
+
+    def add_frame(self, rois: FaceROIs, timestamp: float | None = None) -> None:
         """
         Feed one frame's ROIs into the buffer.
 
         We average the mean-RGB values from all available ROIs (forehead,
         left cheek, right cheek) to get a more robust single-frame sample.
-        If no ROI is available (face not detected), the frame is skipped.
+        Pruned ROIs are left out of the average (but still archived if
+        sampled).  If no ROI is available (face not detected), the frame
+        is skipped.
+
+        `timestamp` is the frame's capture time in seconds on any
+        monotonic clock (default: arrival time).
         """
         self._frame_count += 1
+        if self._started_at is None:
+            self._started_at = time.time()
+        self._timestamps.append(time.monotonic() if timestamp is None else timestamp)
+        self._face_mask.append(bool(rois.face_detected))
 
         # During the warmup period we still accumulate data — the caller
         # should gate on `is_ready()` before calling `extract_pulse()`.
         samples: list[tuple[float, float, float]] = []
-        for roi in (rois.forehead, rois.cheek_left, rois.cheek_right):
-            if roi is not None and roi.size > 0:
-                samples.append(extract_mean_rgb(roi))
+        per_roi: list[float] = []
+        active = self.active_rois
+        for name in ROI_NAMES:
+            roi = getattr(rois, name)
+            if roi is not None and roi.pixel_count > 0:
+                if name in active:
+                    samples.append(roi.mean_rgb)
+                per_roi.extend(roi.mean_rgb)
+            else:
+                per_roi.extend((float("nan"),) * 3)
+        self._roi_buffer.append(tuple(per_roi))
 
         if not samples:
             # No valid ROI this frame — append NaN placeholder so time
             # alignment stays consistent, then interpolate later.
             self._rgb_buffer.append((float("nan"), float("nan"), float("nan")))
-            return
+        else:
+            # Average across available ROIs
+            r = np.mean([s[0] for s in samples])
+            g = np.mean([s[1] for s in samples])
+            b = np.mean([s[2] for s in samples])
+            self._rgb_buffer.append((float(r), float(g), float(b)))
 
-        # Average across available ROIs
-        r = np.mean([s[0] for s in samples])
-        g = np.mean([s[1] for s in samples])
-        b = np.mean([s[2] for s in samples])
-        self._rgb_buffer.append((float(r), float(g), float(b)))
+        if self._warmup_end is None:
+            self._check_warmup(len(self._rgb_buffer))
+        self._score_rois()
 
     @property
     def buffer_length(self) -> int:
         """Number of RGB samples collected so far (post-warmup)."""
-        return max(0, len(self._rgb_buffer) - WARMUP_FRAMES)
+        return len(self._rgb_buffer) - self.warmup_frames
 
     def is_ready(self, min_samples: int = 60) -> bool:
         """True once we have enough post-warmup samples to process."""
@@ -106,10 +231,45 @@ class RPPGPipeline:
         Raises
         ------
         ValueError
-            If insufficient valid (non-NaN) samples exist.
+            If insufficient valid (non-NaN) samples exist, or fewer than
+            the algorithm's `min_seconds`.
+        """
+        raw_valid = self.valid_samples()
+
+        logger.debug(
+            "Processing %d valid frames (%.1f s of data).",
+            raw_valid.shape[0],
+            raw_valid.shape[0] / self._fps,
+        )
+
+        # ── rPPG algorithm ────────────────────────────────────────────────
+        self._spec.check_window(raw_valid.shape[0], self._fps)
+
+        # Per-ROI pulses, SNR-weighted, when several ROIs were sampled throughout
+        if self._quality is not None:
+            fused = fuse_pulses(self._valid_roi_samples(), self._fps, self._spec, self.active_rois)
+            if fused is not None:
+                pulse, self._quality.fusion_weights = fused
+                return pulse
+
+        raw_pulse = self._spec.run(raw_valid, self._fps)
+
+        # ── Bandpass filter ───────────────────────────────────────────────
+        pulse = bandpass_filter(raw_pulse, self._fps)
+
+        return pulse
+
+    def valid_samples(self) -> np.ndarray:
+        """
+        The post-warmup (N, 3) RGB samples `extract_pulse()` works on.
+
+        Raises
+        ------
+        ValueError
+            If fewer than 15 valid (non-NaN) samples exist.
         """
         # Discard warmup frames
-        raw = np.array(self._rgb_buffer[WARMUP_FRAMES:], dtype=np.float64)
+        raw = np.array(self._rgb_buffer[self.warmup_frames:], dtype=np.float64)
 
         # Drop rows where any channel is NaN (face was missing)
         valid_mask = ~np.isnan(raw).any(axis=1)
@@ -120,23 +280,102 @@ class RPPGPipeline:
                 f"Only {raw_valid.shape[0]} valid frames after warmup — "
                 "need at least 15 for processing.  Keep your face visible."
             )
+        return raw_valid
 
-        logger.debug(
-            "Processing %d valid frames (%.1f s of data).",
-            raw_valid.shape[0],
-            raw_valid.shape[0] / self._fps,
-        )
+    def _valid_roi_samples(self) -> np.ndarray:
+        """(N, K, 3) colours of the active ROIs on the rows of `valid_samples()`."""
+        start = self.warmup_frames
+        raw = np.array(self._rgb_buffer[start:], dtype=np.float64)
+        rois = np.array(self._roi_buffer[start:], dtype=np.float64).reshape(len(raw), -1, 3)
+        columns = [ROI_NAMES.index(name) for name in self.active_rois]
+        return rois[~np.isnan(raw).any(axis=1)][:, columns]
 
-        # ── rPPG algorithm ────────────────────────────────────────────────
-        raw_pulse = self._algo_fn(raw_valid)
+    def _score_rois(self) -> None:
+        """
+        Score the ROIs every ROI_QUALITY_INTERVAL_SECONDS of capture time
+        over the last ROI_QUALITY_WINDOW_SECONDS, once that much signal
+        follows the warm-up.  The window's rate is measured from its
+        timestamps: `fps` is only nominal until the scan ends.
+        """
+        if (self._quality is None or self._warmup_end is None
+                or self.signal_seconds < ROI_QUALITY_WINDOW_SECONDS):
+            return
+        now = self._timestamps[-1]
+        if self._next_score is not None and now < self._next_score:
+            return
+        self._next_score = now + ROI_QUALITY_INTERVAL_SECONDS
 
-        # ── Bandpass filter ───────────────────────────────────────────────
-        pulse = bandpass_filter(raw_pulse, self._fps)
+        start = max(bisect.bisect_left(self._timestamps, now - ROI_QUALITY_WINDOW_SECONDS), self._warmup_end)
+        frames = len(self._timestamps) - start
+        if frames < 2 or now <= self._timestamps[start]:
+            return
+        fps = (frames - 1) / (now - self._timestamps[start])
+        samples = np.array(self._roi_buffer[start:], dtype=np.float64)
+        self._quality.update(samples.reshape(frames, len(ROI_NAMES), 3), fps, self._frame_count)
 
-        return pulse
+    def _check_warmup(self, n: int) -> None:
+        """End the warm-up if the first `n` frames complete it (see module docstring)."""
+        times = self._timestamps
+        now = times[n - 1]
+        elapsed = now - times[0]
+        if elapsed >= WARMUP_MAX_SECONDS:
+            self._warmup_end = n - 1
+        elif WARMUP_ADAPTIVE and elapsed >= max(WARMUP_MIN_SECONDS, WARMUP_WINDOW_SECONDS):
+            start = n - 1
+            while start > 0 and times[start - 1] >= now - WARMUP_WINDOW_SECONDS:
+                start -= 1
+            window = np.array(self._rgb_buffer[start:n], dtype=np.float64)
+            valid = ~np.isnan(window).any(axis=1)
+            if valid.sum() < max(5, 0.8 * len(window)):
+                return
+            brightness = window[valid].mean(axis=1)
+            slope = np.polyfit(np.array(times[start:n])[valid], brightness, 1)[0]
+            if abs(slope) > WARMUP_MAX_DRIFT * brightness.mean():
+                return
+            earliest = next(i for i, t in enumerate(times) if t - times[0] >= WARMUP_MIN_SECONDS)
+            self._warmup_end = max(start, earliest)
+        else:
+            return
+        logger.info("Warm-up ended after %.2f s (%d frames).", self.warmup_seconds, self._warmup_end)
+
+    def raw_trace(self) -> RawTrace:
+        """Every frame's per-ROI colours, times and face flag (incl. warm-up)."""
+        times = np.array(self._timestamps, dtype=np.float64)
+        return RawTrace(
+            timestamps=(times - times[0] if len(times) else times).astype(np.float32),
+            samples=np.array(self._roi_buffer, dtype=np.float32).reshape(-1, len(ROI_NAMES), 3),
+            baseline=np.zeros((len(ROI_NAMES), 3), np.float32),
+            face_mask=np.array(self._face_mask, dtype=bool),
+            fps=self._fps,
+            started_at=self._started_at or time.time(),
+        )
+
+    @classmethod
+    def from_trace(cls, trace: RawTrace, algorithm: str = "pos") -> "RPPGPipeline":
+        """A pipeline filled from an archived trace, ready for `extract_pulse()`."""
+        pipeline = cls(fps=trace.fps, algorithm=algorithm)
+        pipeline._rgb_buffer = [tuple(row) for row in trace.mean_rgb().tolist()]
+        pipeline._roi_buffer = [tuple(row) for row in trace.rgb.reshape(trace.frames, -1).tolist()]
+        pipeline._timestamps = trace.timestamps.tolist()
+        pipeline._face_mask = trace.face_mask.tolist()
+        pipeline._frame_count = trace.frames
+        pipeline._started_at = trace.started_at
+        for n in range(1, trace.frames + 1):        # Replay the warm-up decision
+            pipeline._check_warmup(n)
+            if pipeline._warmup_end is not None:
+                break
+        return pipeline
 
     def reset(self) -> None:
         """Clear the buffer — call between scans."""
         self._rgb_buffer.clear()
+        self._roi_buffer.clear()
+        self._timestamps.clear()
+        self._face_mask.clear()
+        self._started_at = None
         self._frame_count = 0
+        self._warmup_end = None
+        if self._quality is not None:
+            self._quality = ROIQuality()
+        self._next_score = None
         logger.info("Pipeline buffer reset.")
@@ -0,0 +1,196 @@
+"""
+rppg/roi_quality.py — Per-ROI signal quality, pruning and pulse fusion
+=======================================================================
+The forehead and both cheeks do not carry the pulse equally well: a
+fringe of hair, a shadow or a specular patch can leave one ROI mostly
+noise.  Averaging its colour into the others contaminates the pulse, and
+sampling it every frame costs detector time for nothing.
+
+`ROIQuality` scores each ROI while the scan runs:
+
+    last ROI_QUALITY_WINDOW_SECONDS of each ROI's colours
+        → ROI_QUALITY_ALGORITHM (batched over ROIs) → bandpass
+        → spectral SNR (dB) → exponential moving average
+
+An ROI whose smoothed SNR stays below ROI_PRUNE_SNR_DB — and
+ROI_PRUNE_MARGIN_DB below the best ROI — for ROI_PRUNE_PATIENCE
+evaluations in a row is pruned: it leaves `active`, the detector stops
+sampling it and the pipeline stops averaging it.  The best ROI is never
+pruned.
+
+At extraction time `fuse_pulses()` runs the scan's algorithm on every
+ROI that was sampled throughout and combines the pulses weighted by
+their whole-trace SNR, so a weak ROI is down-weighted rather than
+averaged in at full strength.
+
+Spectral SNR
+------------
+Power within ±ROI_SNR_HALF_WIDTH_HZ of the dominant cardiac-band
+frequency over the rest of the cardiac-band power — de Haan & Jeanne
+(IEEE TBME, 2013) without their harmonic term, which mostly falls above
+the bandpass.  Broadband noise scores about −7 dB, a clear pulse > 0 dB.
+"""
+
+import numpy as np
+from rppg.algorithms import AlgorithmSpec, get_algorithm
+from rppg.archive import ROI_NAMES
+from rppg.filters import bandpass_filter
+from utils.logger import get_logger
+from config import (
+    BP_LOW_HZ,
+    BP_HIGH_HZ,
+    FILTER_ORDER,
+    ROI_QUALITY_ALGORITHM,
+    ROI_QUALITY_SMOOTHING,
+    ROI_SNR_HALF_WIDTH_HZ,
+    ROI_PRUNE_SNR_DB,
+    ROI_PRUNE_MARGIN_DB,
+    ROI_PRUNE_PATIENCE,
+)
+
+logger = get_logger("rppg.roi_quality")
+
+# Least fraction of the window an ROI must be present in to be scored
+_MIN_COVERAGE = 0.8
+# Fewest rows worth scoring: filtfilt pads by 3 × the filter length
+_MIN_FRAMES = 3 * (2 * FILTER_ORDER + 1) + 1
+
+
+def spectral_snr(pulses: np.ndarray, fps: float) -> np.ndarray:
+    """
+    Spectral SNR in dB of each bandpassed pulse along the last axis.
+
+    Parameters
+    ----------
+    pulses : ndarray, shape (..., N)
+    fps    : float   Sampling rate (Hz).
+
+    Returns
+    -------
+    ndarray, shape (...,)
+    """
+    n_fft = max(1024, 1 << (pulses.shape[-1] - 1).bit_length())
+    freqs = np.fft.rfftfreq(n_fft, d=1.0 / fps)
+    band = (freqs >= BP_LOW_HZ) & (freqs <= BP_HIGH_HZ)
+    freqs = freqs[band]
+    power = np.abs(np.fft.rfft(pulses, n=n_fft, axis=-1)[..., band]) ** 2    # (..., F)
+
+    peak = freqs[np.argmax(power, axis=-1)][..., None]                       # (..., 1)
+    signal = np.where(np.abs(freqs - peak) <= ROI_SNR_HALF_WIDTH_HZ, power, 0.0).sum(axis=-1)
+    noise = power.sum(axis=-1) - signal
+    return 10.0 * np.log10((signal + 1e-12) / (noise + 1e-12))
+
+
+def fuse_pulses(
+    roi_samples: np.ndarray,
+    fps: float,
+    spec: AlgorithmSpec,
+    names: tuple[str, ...] = ROI_NAMES,
+) -> tuple[np.ndarray, dict[str, float]] | None:
+    """
+    SNR-weighted combination of per-ROI pulses.
+
+    Parameters
+    ----------
+    roi_samples : ndarray, shape (N, R, 3)   Mean RGB per frame and ROI
+                                             (NaN where not sampled).
+    spec        : the algorithm to run on each ROI.
+
+    Returns
+    -------
+    (pulse (N,), {name: weight}) — or None when fewer than two ROIs were
+    sampled in every frame, in which case averaging colours is as good.
+    """
+    complete = ~np.isnan(roi_samples).any(axis=(0, 2))
+    if complete.sum() < 2:
+        return None
+    used = [name for name, ok in zip(names, complete) if ok]
+    stack = np.moveaxis(roi_samples[:, complete], 1, 0)          # (K, N, 3)
+
+    pulses = bandpass_filter(spec.run(stack, fps), fps)          # (K, N)
+    snr_db = spectral_snr(pulses, fps)
+    weights = 10.0 ** (snr_db / 10.0)                            # Linear power ratios
+    weights /= weights.sum()
+
+    pulses -= pulses.mean(axis=-1, keepdims=True)
+    pulses /= pulses.std(axis=-1, keepdims=True) + 1e-8
+    return weights @ pulses, {name: round(float(w), 3) for name, w in zip(used, weights)}
+
+
+class ROIQuality:
+    """
+    Running per-ROI SNR and pruning state for one scan.
+
+    The caller picks the windows — the last ROI_QUALITY_WINDOW_SECONDS of
+    capture time, every ROI_QUALITY_INTERVAL_SECONDS — and passes each
+    with its measured sampling rate: frame sources such as uploads run
+    well below the nominal rate, and scoring at the wrong rate moves the
+    pulse out of the cardiac band.
+
+    Parameters
+    ----------
+    names : tuple[str, ...]   ROI names, in the sample order of `update()`.
+    """
+
+    def __init__(self, names: tuple[str, ...] = ROI_NAMES):
+        self._names = names
+        self._spec = get_algorithm(ROI_QUALITY_ALGORITHM)
+        self._snr_db = np.full(len(names), np.nan)       # Smoothed, NaN until scored
+        self._low_streak = np.zeros(len(names), dtype=np.int64)
+        self._active = np.ones(len(names), dtype=bool)
+        self._pruned_at: dict[str, int] = {}
+        self._evaluations = 0
+        self.fusion_weights: dict[str, float] | None = None   # Set by the pipeline
+
+    @property
+    def active(self) -> tuple[str, ...]:
+        """ROIs still being sampled."""
+        return tuple(name for name, on in zip(self._names, self._active) if on)
+
+    def update(self, window: np.ndarray, fps: float, frame: int) -> None:
+        """
+        Score the active ROIs over the latest `window` (W, R, 3) of colour
+        samples, captured at `fps` (measured), and prune any that have
+        stayed poor.  `frame` is the pipeline's frame count, recorded with
+        each pruning.
+        """
+        present = ~np.isnan(window).any(axis=2)                  # (W, R)
+        scored = self._active & (present.mean(axis=0) >= _MIN_COVERAGE)
+        if not scored.any():
+            return
+        rows = present[:, scored].all(axis=1)
+        if rows.sum() < max(_MIN_COVERAGE * len(window), _MIN_FRAMES):
+            return
+
+        stack = np.moveaxis(window[rows][:, scored], 1, 0)      # (K, W', 3)
+        snr = spectral_snr(bandpass_filter(self._spec.run(stack, fps), fps), fps)
+
+        previous = self._snr_db[scored]
+        self._snr_db[scored] = np.where(
+            np.isnan(previous), snr,
+            ROI_QUALITY_SMOOTHING * snr + (1.0 - ROI_QUALITY_SMOOTHING) * previous,
+        )
+        self._evaluations += 1
+
+        # ── Pruning ─────────────────────────────────────────────────────
+        best = np.nanmax(np.where(self._active, self._snr_db, np.nan))
+        low = (scored
+               & (self._snr_db < ROI_PRUNE_SNR_DB)
+               & (self._snr_db < best - ROI_PRUNE_MARGIN_DB))
+        self._low_streak = np.where(low, self._low_streak + 1, 0)
+        for i in np.flatnonzero(self._low_streak >= ROI_PRUNE_PATIENCE):
+            self._active[i] = False
+            self._pruned_at[self._names[i]] = frame
+            logger.info("ROI '%s' pruned at frame %d (SNR %.1f dB, best %.1f dB).",
+                        self._names[i], frame, self._snr_db[i], best)
+
+    def summary(self) -> dict:
+        """Smoothed SNR per ROI, pruning frames and fusion weights, for results."""
+        return {
+            "snr_db": {name: None if np.isnan(s) else round(float(s), 1)
+                       for name, s in zip(self._names, self._snr_db)},
+            "active": list(self.active),
+            "pruned_at_frame": dict(self._pruned_at),
+            "evaluations": self._evaluations,
+            "fusion_weights": self.fusion_weights,
+        }
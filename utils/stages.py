@@ -0,0 +1,227 @@
+"""
+utils/stages.py — Bounded multi-stage processing pipeline
+===========================================================
+Runs a chain of per-item stages concurrently, so throughput is set by
+the *slowest* stage instead of the sum of all of them:
+
+    submit(item) → [stage 1: N threads] → [stage 2: M processes] → sink(result)
+
+* Each stage has its own executor (`"thread"` or `"process"`) and
+  worker count.  Threads suit work that releases the GIL (OpenCV
+  decoding); processes suit Python-heavy or GIL-holding work.  A stage
+  may instead run on a long-lived shared executor (`StageSpec.executor`),
+  e.g. to keep worker processes and their loaded models across
+  pipelines; the pipeline never shuts a shared executor down.
+* Stages are linked by bounded queues of in-flight futures.  When a
+  stage falls behind, its queue fills and `submit()` blocks — back-pressure
+  flows to the producer instead of memory growing.
+* Output order always equals input order, whatever the worker counts.
+* A stage returning None drops that item (e.g. an undecodable frame).
+* The sink runs inline in the last stage's forwarding thread.
+
+`stats()` reports per-stage item counts, mean service time, peak queue
+depth and utilisation (busy time / (wall time × workers)); the stage
+closest to 100 % is the bottleneck.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+from utils.logger import get_logger
+
+logger = get_logger("utils.stages")
+
+_END = object()   # End-of-stream marker passed down the stage queues
+
+
+@dataclass
+class StageSpec:
+    """
+    Definition of one stage.
+
+    `fn` takes the previous stage's output and returns this stage's.
+    For `kind="process"` it must be picklable (a module-level function
+    or a `functools.partial` of one).
+    """
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    kind: str = "thread"          # "thread" | "process"
+    executor: Executor | None = None   # Shared executor to use instead of creating one
+
+
+def _timed(fn: Callable[[Any], Any], item: Any) -> tuple[Any, float]:
+    """Run `fn(item)` and return its result with the busy time (s)."""
+    t0 = time.perf_counter()
+    result = fn(item)
+    return result, time.perf_counter() - t0
+
+
+class _Stage:
+    """Runtime state of one stage: executor, queue and counters."""
+
+    def __init__(self, spec: StageSpec, queue_size: int):
+        self.spec = spec
+        self.workers = max(1, spec.workers)
+        self.owned = spec.executor is None
+        if spec.executor is not None:
+            self.executor: Executor = spec.executor
+        elif spec.kind == "process":
+            # spawn, not fork: the parent is multi-threaded
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        elif spec.kind == "thread":
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix=f"stage-{spec.name}",
+            )
+        else:
+            raise ValueError(f"Unknown stage kind '{spec.kind}' for stage '{spec.name}'.")
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.items = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+        self.peak_depth = 0
+
+    def put(self, item: Any) -> None:
+        """Submit `item` to this stage; blocks while its queue is full."""
+        self.queue.put(self.executor.submit(_timed, self.spec.fn, item))
+        self.peak_depth = max(self.peak_depth, self.queue.qsize())
+
+
+class StagedPipeline:
+    """
+    Parameters
+    ----------
+    stages     : list[StageSpec]   Applied in order.
+    sink       : callable          Receives each final result, in order.
+    queue_size : int               In-flight items allowed per stage.
+    """
+
+    def __init__(self, stages: list[StageSpec], sink: Callable[[Any], None], queue_size: int = 8):
+        if not stages:
+            raise ValueError("A staged pipeline needs at least one stage.")
+        self._stages = [_Stage(spec, queue_size) for spec in stages]
+        self._sink = sink
+        self._sink_seconds = 0.0
+        self._sink_items = 0
+        self._error: BaseException | None = None
+        self._cancelled = False
+        self._closed = False
+        self._started = time.perf_counter()
+        self._finished: float | None = None
+        self._forwarders = [
+            threading.Thread(target=self._forward, args=(i,), daemon=True,
+                             name=f"stage-{stage.spec.name}-fwd")
+            for i, stage in enumerate(self._stages)
+        ]
+        for thread in self._forwarders:
+            thread.start()
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def submit(self, item: Any) -> None:
+        """
+        Feed one item into the first stage (blocks under back-pressure).
+        Raises the first stage error as soon as one has occurred.
+        """
+        if self._closed:
+            raise RuntimeError("Pipeline is closed.")
+        if self._error is not None:
+            raise self._error
+        if self._cancelled:
+            return
+        self._stages[0].put(item)
+
+    def close(self) -> None:
+        """
+        Signal end of input, wait until every item has reached the sink
+        and shut the executors down.  Re-raises the first stage error.
+        """
+        if not self._closed:
+            self._closed = True
+            self._stages[0].queue.put(_END)
+        for thread in self._forwarders:
+            thread.join()
+        for stage in self._stages:
+            if stage.owned:
+                stage.executor.shutdown(wait=True, cancel_futures=True)
+        if self._finished is None:
+            self._finished = time.perf_counter()
+        if self._error is not None:
+            raise self._error
+
+    def cancel(self) -> None:
+        """Stop forwarding results; queued items are drained and discarded."""
+        self._cancelled = True
+
+    def stats(self) -> dict:
+        """Per-stage throughput and utilisation."""
+        elapsed = (self._finished or time.perf_counter()) - self._started
+        report = {}
+        for stage in self._stages:
+            report[stage.spec.name] = {
+                "kind": stage.spec.kind,
+                "workers": stage.workers,
+                "items": stage.items,
+                "dropped": stage.dropped,
+                "mean_ms": round(1000.0 * stage.busy_seconds / stage.items, 2) if stage.items else None,
+                "busy_seconds": round(stage.busy_seconds, 3),
+                "items_per_second": round(stage.items / elapsed, 2) if elapsed > 0 else 0.0,
+                "peak_queue": stage.peak_depth,
+                "utilisation": round(stage.busy_seconds / (elapsed * stage.workers), 3) if elapsed > 0 else 0.0,
+            }
+        report["sink"] = {
+            "kind": "inline",
+            "workers": 1,
+            "items": self._sink_items,
+            "mean_ms": round(1000.0 * self._sink_seconds / self._sink_items, 2) if self._sink_items else None,
+            "utilisation": round(self._sink_seconds / elapsed, 3) if elapsed > 0 else 0.0,
+        }
+        return report
+
+    # ── Private ──────────────────────────────────────────────────────────────
+
+    def _forward(self, index: int) -> None:
+        """Collect stage `index` results in order and pass them on."""
+        stage = self._stages[index]
+        downstream = self._stages[index + 1] if index + 1 < len(self._stages) else None
+        while True:
+            future = stage.queue.get()
+            if future is _END:
+                if downstream is not None:
+                    downstream.queue.put(_END)
+                return
+            # Once cancelled, spare a shared executor the work still queued
+            if self._cancelled and future.cancel():
+                continue
+            try:
+                result, busy = future.result()
+            except BaseException as e:   # Keep draining so upstream never blocks
+                if self._error is None:
+                    logger.error("Stage '%s' failed: %s", stage.spec.name, e)
+                    self._error = e
+                continue
+            stage.items += 1
+            stage.busy_seconds += busy
+            if result is None:
+                stage.dropped += 1
+                continue
+            if self._error is not None or self._cancelled:
+                continue
+            if downstream is not None:
+                downstream.put(result)
+            else:
+                t0 = time.perf_counter()
+                try:
+                    self._sink(result)
+                except BaseException as e:
+                    if self._error is None:
+                        logger.error("Pipeline sink failed: %s", e)
+                        self._error = e
+                self._sink_items += 1
+                self._sink_seconds += time.perf_counter() - t0